@@ -0,0 +1,98 @@
+"""宿主一覧のペイロードサイズ・シリアライズ時間のベンチマーク
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_host_listing --hosts 1000 --page-size 100
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from database import get_db, Base
+from database.replicas import get_read_db, get_read_session_factory
+from models import User, Host
+
+
+def _setup(host_count: int):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    user = User(name="bench", email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Host(
+            user_id=user.id,
+            title=f"宿泊先 {i}",
+            description="説明文" * 200,
+            location="東京都渋谷区",
+            property_type="apartment",
+            max_guests=4,
+            amenities=["WiFi", "キッチン", "エアコン", "洗濯機", "駐車場"],
+            house_rules=["禁煙", "ペット不可", "22時以降は静かに"],
+            photos=[f"uploads/host_{i}_{n}.jpg" for n in range(8)],
+            price_per_night=8000 + i,
+            available_dates=[{"date": f"2024-{m:02d}-{d:02d}", "available": True} for m in range(1, 13) for d in range(1, 29)],
+        )
+        for i in range(host_count)
+    ])
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = lambda: Session
+
+
+def _measure(client: TestClient, params: dict, repeat: int):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/api/hosts", params=params)
+        timings.append((time.perf_counter() - start) * 1000)
+        size = len(response.content)
+    return size, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    _setup(args.hosts)
+    client = TestClient(app)
+    cases = {
+        "full": {},
+        "card": {"view": "card"},
+        "fields=id,title,price_per_night,location": {"fields": "title,price_per_night,location"},
+    }
+
+    print(f"{'representation':<45}{'bytes/page':>12}{'ms/page (p50)':>16}")
+    for name, params in cases.items():
+        size, median_ms = _measure(client, {"limit": args.page_size, **params}, args.repeat)
+        print(f"{name:<45}{size:>12}{median_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
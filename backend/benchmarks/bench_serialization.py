@@ -0,0 +1,120 @@
+"""レスポンスシリアライズのマイクロベンチマーク
+
+FastAPI標準の経路（response_modelの検証 → jsonable_encoder → json.dumps）と
+utils.responses の経路（キャッシュ済みTypeAdapter → dump_json）を比較する。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_serialization --rows 100 --repeat 200
+"""
+import argparse
+import json
+import timeit
+from datetime import date, datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from models import Booking, Host, User
+from schemas.booking import BookingResponse
+from schemas.host import HostResponse
+from schemas.matching import MatchedHostResponse
+from services.matching_service import MatchedHost
+from utils.responses import FastJSONResponse, dump_json
+
+
+def _hosts(rows: int) -> List[Host]:
+    now = datetime.utcnow()
+    return [
+        Host(
+            id=i,
+            user_id=1,
+            title=f"宿泊先 {i}",
+            description="説明文" * 50,
+            location="東京都渋谷区",
+            property_type="apartment",
+            max_guests=4,
+            amenities=["WiFi", "キッチン", "エアコン"],
+            house_rules=["禁煙", "ペット不可"],
+            photos=[f"uploads/host_{i}_{n}.jpg" for n in range(4)],
+            price_per_night=8000.0 + i,
+            available_dates=[{"date": f"2024-01-{d:02d}", "available": True} for d in range(1, 29)],
+            is_active=True,
+            created_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def _bookings(rows: int) -> List[Booking]:
+    now = datetime.utcnow()
+    return [
+        Booking(
+            id=i,
+            guest_id=2,
+            host_id=i,
+            check_in=date(2024, 1, 1),
+            check_out=date(2024, 1, 3),
+            guests_count=2,
+            total_price=16000.0,
+            status="pending",
+            message="よろしくお願いします",
+            created_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def _matches(rows: int) -> List[MatchedHost]:
+    host_user = User(id=1, name="宿主", interests=["旅行", "料理"], rating=4.5, review_count=10)
+    return [MatchedHost(host, host_user, 72.5, "旅行の共通趣味があります。") for host in _hosts(rows)]
+
+
+def _standard_path(schema, objects) -> bytes:
+    validated = [schema.model_validate(obj) for obj in objects]
+    return json.dumps(
+        jsonable_encoder(validated),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _fast_path(schema, objects) -> bytes:
+    return dump_json(List[schema], objects)
+
+
+def _default_class_path(schema, objects) -> bytes:
+    validated = [schema.model_validate(obj) for obj in objects]
+    return FastJSONResponse(jsonable_encoder(validated)).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = {
+        "List[HostResponse]": (HostResponse, _hosts(args.rows)),
+        "List[BookingResponse]": (BookingResponse, _bookings(args.rows)),
+        "matching payload": (MatchedHostResponse, _matches(args.rows)),
+    }
+    paths = {
+        "standard": _standard_path,
+        "default class": _default_class_path,
+        "fast path": _fast_path,
+    }
+
+    print(f"{'payload':<25}" + "".join(f"{name + ' (us)':>20}" for name in paths) + f"{'speedup':>10}")
+    for name, (schema, objects) in cases.items():
+        _fast_path(schema, objects)  # TypeAdapterの生成を計測から除外
+        timings = {
+            path: min(timeit.repeat(lambda: func(schema, objects), number=1, repeat=args.repeat)) * 1e6
+            for path, func in paths.items()
+        }
+        speedup = timings["standard"] / timings["fast path"]
+        print(f"{name:<25}" + "".join(f"{timings[path]:>20.1f}" for path in paths) + f"{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
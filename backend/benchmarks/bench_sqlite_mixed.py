@@ -0,0 +1,143 @@
+"""SQLite の読み書き混在時のスループット比較（既定設定 / PRAGMA のみ / PRAGMA + シングルライター）
+
+メッセージ一覧・宿主一覧の読み取りと、メッセージ送信（send_message と同様に予約を参照してから INSERT + COMMIT）を
+複数スレッドから実行する。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_sqlite_mixed --threads 8 --seconds 5 --write-ratio 0.3
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from database.sqlite_tuning import configure_sqlite, default_pragmas
+from models import Booking, Host, Message, User
+
+PROFILES = {
+    "default": None,
+    "pragmas": {"single_writer": False},
+    "pragmas+single-writer": {"single_writer": True},
+}
+
+
+def _setup(path: str, profile: str):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=16,
+        max_overflow=0,
+    )
+    options = PROFILES[profile]
+    if options is not None:
+        configure_sqlite(engine, pragmas=default_pragmas(), **options)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    guest = User(name="guest", email="guest@example.com", password_hash="x")
+    owner = User(name="owner", email="owner@example.com", password_hash="x")
+    db.add_all([guest, owner])
+    db.flush()
+    hosts = [
+        Host(user_id=owner.id, title=f"宿泊先 {i}", description="説明文" * 50, location="東京都渋谷区",
+             property_type="apartment", max_guests=4, price_per_night=8000 + i)
+        for i in range(200)
+    ]
+    db.add_all(hosts)
+    db.flush()
+    booking = Booking(guest_id=guest.id, host_id=hosts[0].id, check_in=date(2024, 4, 1), check_out=date(2024, 4, 3),
+                      guests_count=1, total_price=8000, status="accepted")
+    db.add(booking)
+    db.commit()
+    ids = (guest.id, owner.id, booking.id)
+    db.close()
+    return engine, Session, ids
+
+
+def _worker(Session, ids, write_ratio: float, deadline: float, results: dict, lock: threading.Lock):
+    guest_id, owner_id, booking_id = ids
+    reads, writes, errors = [], [], 0
+    while time.perf_counter() < deadline:
+        db = Session()
+        start = time.perf_counter()
+        try:
+            if random.random() < write_ratio:
+                db.query(Booking).filter(Booking.id == booking_id).first()
+                db.add(Message(booking_id=booking_id, sender_id=guest_id, receiver_id=owner_id, content="こんにちは" * 10))
+                db.commit()
+                writes.append(time.perf_counter() - start)
+            else:
+                db.query(Message).filter(Message.booking_id == booking_id).order_by(Message.created_at.desc()).limit(50).all()
+                db.query(Host).filter(Host.is_active == True).limit(20).all()
+                reads.append(time.perf_counter() - start)
+        except OperationalError:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    with lock:
+        results["reads"] += reads
+        results["writes"] += writes
+        results["errors"] += errors
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)] * 1000
+
+
+def run(profile: str, threads: int, seconds: float, write_ratio: float) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine, Session, ids = _setup(os.path.join(directory, "bench.db"), profile)
+        results = {"reads": [], "writes": [], "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        workers = [
+            threading.Thread(target=_worker, args=(Session, ids, write_ratio, deadline, results, lock))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        engine.dispose()
+    return {
+        "ops_per_second": (len(results["reads"]) + len(results["writes"])) / seconds,
+        "writes_per_second": len(results["writes"]) / seconds,
+        "errors": results["errors"],
+        "read_p50_ms": statistics.median(results["reads"]) * 1000 if results["reads"] else 0.0,
+        "read_p99_ms": _percentile(results["reads"], 99),
+        "write_p50_ms": statistics.median(results["writes"]) * 1000 if results["writes"] else 0.0,
+        "write_p99_ms": _percentile(results["writes"], 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--profile", choices=list(PROFILES), action="append")
+    args = parser.parse_args()
+
+    columns = ("ops_per_second", "writes_per_second", "errors", "read_p50_ms", "read_p99_ms", "write_p50_ms", "write_p99_ms")
+    print(f"{'profile':<24}" + "".join(f"{column:>18}" for column in columns))
+    for profile in args.profile or list(PROFILES):
+        result = run(profile, args.threads, args.seconds, args.write_ratio)
+        print(f"{profile:<24}" + "".join(f"{result[column]:>18.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
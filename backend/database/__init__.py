@@ -1,3 +1,3 @@
-from .connection import engine, SessionLocal, get_db, Base
+from .connection import engine, SessionLocal, get_db, Base, get_pool_status
 
-__all__ = ["engine", "SessionLocal", "get_db", "Base"]
\ No newline at end of file
+__all__ = ["engine", "SessionLocal", "get_db", "Base", "get_pool_status"]
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""アーカイブ（コールド）テーブル
+
+完了・キャンセル済みで保持期間を過ぎた予約とそのメッセージを移すテーブル。
+PostgreSQL では archive スキーマ（マイグレーション 0003 で作成）、SQLite では
+ARCHIVE_SQLITE_PATH のファイルを archive として ATTACH する（接続ごと。テーブルがなければ作成）。
+どちらも archive.bookings / archive.messages として参照できる。
+"""
+import os
+
+from sqlalchemy import Column, Date, DateTime, Float, Boolean, Index, Integer, MetaData, String, Table, Text, event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+ARCHIVE_SCHEMA = "archive"
+# SQLite のアーカイブファイル（相対パスはカレントディレクトリ基準）
+ARCHIVE_SQLITE_PATH = os.getenv("ARCHIVE_SQLITE_PATH", "archive.db")
+
+archive_metadata = MetaData(schema=ARCHIVE_SCHEMA)
+
+archived_bookings = Table(
+    "bookings",
+    archive_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("guest_id", Integer, nullable=False, index=True),
+    Column("host_id", Integer, nullable=False, index=True),
+    Column("check_in", Date, nullable=False),
+    Column("check_out", Date, nullable=False),
+    Column("guests_count", Integer, nullable=False),
+    Column("total_price", Float, nullable=False),
+    Column("status", String(20)),
+    Column("message", Text),
+    Column("created_at", DateTime(timezone=True)),
+    Column("updated_at", DateTime(timezone=True)),
+    Column("archived_at", DateTime(timezone=True), nullable=False),
+)
+
+archived_messages = Table(
+    "messages",
+    archive_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("booking_id", Integer, nullable=False),
+    Column("sender_id", Integer, nullable=False),
+    Column("receiver_id", Integer, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("is_read", Boolean),
+    Column("created_at", DateTime(timezone=True)),
+    Column("archived_at", DateTime(timezone=True), nullable=False),
+    Index("ix_archive_messages_booking_id_created_at", "booking_id", "created_at"),
+)
+
+# SQLite で ATTACH 後に実行する DDL（テーブル名はスキーマ修飾される）
+_SQLITE_DDL = [
+    str(statement.compile(dialect=sqlite.dialect()))
+    for table in archive_metadata.sorted_tables
+    for statement in [CreateTable(table, if_not_exists=True)]
+    + [CreateIndex(index, if_not_exists=True) for index in sorted(table.indexes, key=lambda index: index.name)]
+]
+
+
+def attach_archive(dbapi_connection, path: str = ARCHIVE_SQLITE_PATH):
+    """SQLite の接続にアーカイブファイルを ATTACH し、テーブルを作成"""
+    cursor = dbapi_connection.cursor()
+    try:
+        attached = {row[1] for row in cursor.execute("PRAGMA database_list")}
+        if ARCHIVE_SCHEMA not in attached:
+            cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+        for ddl in _SQLITE_DDL:
+            cursor.execute(ddl)
+    finally:
+        cursor.close()
+
+
+def configure_sqlite_archive(engine: Engine, path: str = ARCHIVE_SQLITE_PATH):
+    """新しい接続ごとにアーカイブファイルを ATTACH"""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        attach_archive(dbapi_connection, path)
@@ -1,16 +1,80 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from database.archive import configure_sqlite_archive
+from database.pool_metrics import PoolMetrics, instrumented_pool_class, instrument_engine, pool_status
+from database.sqlite_tuning import configure_sqlite, is_file_database
 import os
 
 # データベースURL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
+# 読み取り専用のレプリカ（カンマ区切り、未設定の場合は全てプライマリ）
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# コネクションプール設定（ワーカーごとの値）
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# DB全体の接続数上限（指定時はワーカー数 WEB_CONCURRENCY で割った値をワーカーごとの上限にする）
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+# PostgreSQLのステートメントタイムアウト（ミリ秒、0で無効）
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# SQLite（ファイル）で WAL 等の PRAGMA とシングルライターを設定するか
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+
+def _pool_size():
+    """ワーカーごとのプールサイズ・オーバーフロー数を決定"""
+    pool_size, max_overflow = DB_POOL_SIZE, DB_MAX_OVERFLOW
+    if DB_MAX_CONNECTIONS:
+        per_worker = max(DB_MAX_CONNECTIONS // WEB_CONCURRENCY, 1)
+        pool_size = min(pool_size, per_worker)
+        max_overflow = max(min(max_overflow, per_worker - pool_size), 0)
+    return pool_size, max_overflow
+
+def _engine_options(url: str, metrics: PoolMetrics) -> dict:
+    """URLに応じたエンジンのオプションを作成"""
+    if "sqlite" in url:
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url:
+            return options
+    else:
+        options = {"connect_args": {}}
+        if url.startswith("postgresql") and DB_STATEMENT_TIMEOUT_MS:
+            options["connect_args"]["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    pool_size, max_overflow = _pool_size()
+    options.update(
+        poolclass=instrumented_pool_class(metrics),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return options
 
 # SQLAlchemyエンジンの作成
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+pool_metrics = PoolMetrics()
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, pool_metrics))
+instrument_engine(engine, pool_metrics)
+if SQLITE_TUNING and is_file_database(engine):
+    configure_sqlite(engine)
+# SQLite（ファイル）ではアーカイブ用のファイルを archive として ATTACH
+if is_file_database(engine):
+    configure_sqlite_archive(engine)
+
+# レプリカのエンジン（プール設定・計測はプライマリと同様にレプリカごと）
+replica_engines = []
+for _url in DATABASE_REPLICA_URLS:
+    _metrics = PoolMetrics()
+    _replica = create_engine(_url, **_engine_options(_url, _metrics))
+    instrument_engine(_replica, _metrics)
+    if SQLITE_TUNING and is_file_database(_replica):
+        configure_sqlite(_replica)
+    replica_engines.append(_replica)
 
 # セッションローカルの作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -24,4 +88,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_pool_status() -> dict:
+    """コネクションプールの状態を取得"""
+    return pool_status(engine, pool_metrics)
@@ -0,0 +1,116 @@
+"""インデックスアドバイザー
+
+アプリの代表的なクエリパターンに対して EXPLAIN（SQLiteは EXPLAIN QUERY PLAN）を実行し、
+一定行数以上のテーブルに対するフルスキャンを検出する。
+
+使い方（backend ディレクトリで実行）:
+    python -m database.index_advisor --min-rows 1000
+"""
+import argparse
+import json
+import sys
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import and_, desc, func, or_, select, text
+from sqlalchemy.engine import Engine
+
+from database.connection import engine as default_engine
+from models import Booking, Host, Message, User
+
+# (名前, ステートメント生成関数) — routers/* のクエリと同じ形にする
+QUERY_SHAPES: List[Tuple[str, Callable]] = [
+    ("hosts.list", lambda: select(Host).where(Host.is_active == True, Host.max_guests >= 2).limit(100)),
+    ("hosts.detail", lambda: select(Host).where(Host.id == 1)),
+    ("hosts.by_owner", lambda: select(Host.id).where(Host.user_id == 1)),
+    ("users.by_id", lambda: select(User).where(User.id == 1)),
+    ("users.by_email", lambda: select(User).where(User.email == "user@example.com")),
+    ("bookings.for_user", lambda: select(Booking).where(or_(
+        Booking.guest_id == 1,
+        Booking.host_id.in_(select(Host.id).where(Host.user_id == 1)),
+    ))),
+    ("bookings.detail", lambda: select(Booking).where(Booking.id == 1)),
+    ("messages.for_booking", lambda: select(Message).where(Message.booking_id == 1).order_by(Message.created_at)),
+    ("messages.last_for_booking", lambda: select(Message).where(Message.booking_id == 1).order_by(desc(Message.created_at)).limit(1)),
+    ("messages.unread_count", lambda: select(func.count()).select_from(Message).where(and_(
+        Message.booking_id == 1,
+        Message.receiver_id == 1,
+        Message.is_read == False,
+    ))),
+]
+
+
+def _table_sizes(engine: Engine) -> Dict[str, int]:
+    with engine.connect() as connection:
+        return {
+            table: connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in ("users", "hosts", "bookings", "messages")
+        }
+
+
+def _full_scans_sqlite(connection, sql: str) -> List[Tuple[str, str]]:
+    """EXPLAIN QUERY PLAN の結果からインデックスを使わないスキャンを抽出"""
+    scans = []
+    for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = row[-1]
+        words = detail.split()
+        # "SCAN hosts" はフルスキャン、"SCAN hosts USING INDEX ..." はインデックススキャン
+        if words and words[0] == "SCAN" and "USING" not in words and len(words) >= 2:
+            scans.append((words[1], detail))
+    return scans
+
+
+def _full_scans_postgresql(connection, sql: str) -> List[Tuple[str, str]]:
+    """EXPLAIN (FORMAT JSON) の結果から Seq Scan を抽出"""
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan":
+            scans.append((node.get("Relation Name"), f"Seq Scan on {node.get('Relation Name')}"))
+        for child in node.get("Plans", []):
+            walk(child)
+    walk(plan[0]["Plan"])
+    return scans
+
+
+def analyze(engine: Engine, shapes=QUERY_SHAPES, min_rows: int = 1000) -> List[dict]:
+    """クエリパターンごとに実行計画を取得し、閾値以上のテーブルのフルスキャンを返す"""
+    sizes = _table_sizes(engine)
+    if engine.dialect.name == "sqlite":
+        explain = _full_scans_sqlite
+    elif engine.dialect.name == "postgresql":
+        explain = _full_scans_postgresql
+    else:
+        raise ValueError(f"Unsupported dialect: {engine.dialect.name}")
+
+    findings = []
+    with engine.connect() as connection:
+        for name, build in shapes:
+            sql = str(build().compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            for table, detail in explain(connection, sql):
+                rows = sizes.get(table, 0)
+                if rows >= min_rows:
+                    findings.append({"query": name, "table": table, "rows": rows, "plan": detail, "sql": sql})
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rows", type=int, default=1000, help="フルスキャンを報告するテーブルの最小行数")
+    args = parser.parse_args()
+
+    findings = analyze(default_engine, min_rows=args.min_rows)
+    if not findings:
+        print(f"{len(QUERY_SHAPES)}件のクエリパターンでフルスキャンは検出されませんでした")
+        return
+
+    for finding in findings:
+        print(f"[{finding['query']}] {finding['table']} ({finding['rows']}行): {finding['plan']}")
+        print(f"    {' '.join(finding['sql'].split())}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
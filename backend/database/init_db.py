@@ -1,13 +1,21 @@
-from database.connection import engine, Base
-from models.user import User
-from models.host import Host
-from models.booking import Booking
-from models.message import Message
+import logging
+import os
+from alembic import command
+from alembic.config import Config
+
+logger = logging.getLogger(__name__)
+
+# alembic.ini のパス（実行時のカレントディレクトリに依存しない）
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
 
 def create_tables():
-    """データベーステーブルを作成"""
-    Base.metadata.create_all(bind=engine)
-    print("データベーステーブルが作成されました")
+    """Alembicのマイグレーションを最新まで適用してテーブルを作成"""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+    logger.info("データベーステーブルが作成されました")
 
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
@@ -0,0 +1,105 @@
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """コネクションプールの計測値（統計用のためロックは取らない）"""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_peak = 0
+
+    def record_wait(self, seconds: float):
+        self.wait_count += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.wait_count, 6) if self.wait_count else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "overflow_peak": self.overflow_peak,
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """接続取得の待ち時間（新規接続の確立を含む）とオーバーフローを計測するQueuePool"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start)
+        overflow = self.overflow()
+        if overflow > self.metrics.overflow_peak:
+            self.metrics.overflow_peak = overflow
+        return connection
+
+
+def instrumented_pool_class(metrics: PoolMetrics):
+    """計測値の出力先を束縛したプールクラスを生成（engine.dispose()後の再生成でも引き継がれる）"""
+    return type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"metrics": metrics})
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics):
+    """プールイベントを計測値に記録"""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.soft_invalidations += 1
+
+
+def pool_status(engine: Engine, metrics: PoolMetrics) -> dict:
+    """プールの現在状態と計測値を取得"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    status.update(metrics.snapshot())
+    return status
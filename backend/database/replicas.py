@@ -0,0 +1,194 @@
+"""読み取りレプリカへのルーティング
+
+読み取り専用のエンドポイントは get_read_db を使う。レプリカはリクエストごとにラウンドロビンで選び、
+ヘルスチェック（HealthMonitor から定期実行）や接続エラーで unhealthy になったものは除外する。
+書き込みを行ったクライアントは一定時間プライマリを参照する（read-your-writes。
+ReadYourWritesMiddleware が Cookie を付与する）。レプリカ未設定の場合は全てプライマリを参照する。
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from database.connection import engine as primary_engine, replica_engines
+
+logger = logging.getLogger(__name__)
+
+# 書き込み後にプライマリを参照する秒数（レプリケーション遅延より長くする）
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+# PostgreSQLのレプリカでこの秒数以上遅延している場合は除外（0で無効）
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10"))
+STICKY_COOKIE = "db_primary_until"
+
+# 処理中のリクエストで書き込みをコミットしたか（ミドルウェアが可変のリストを設定する）
+_write_marker: ContextVar[Optional[list]] = ContextVar("db_write_marker", default=None)
+
+
+class RoutingSession(Session):
+    """読み取りはレプリカ、flush・UPDATE/INSERT/DELETE はプライマリに送るセッション"""
+
+    def __init__(self, primary: Engine, replica: Optional[Engine] = None, **kwargs):
+        super().__init__(bind=primary, **kwargs)
+        self.primary = primary
+        self.replica = replica
+        self.force_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is None or self.force_primary or self._flushing or isinstance(clause, UpdateBase):
+            return self.primary
+        return self.replica
+
+    @contextmanager
+    def use_primary(self):
+        """ブロック内の読み取りをプライマリに送る"""
+        previous, self.force_primary = self.force_primary, True
+        try:
+            yield self
+        finally:
+            self.force_primary = previous
+
+
+def primary_reads(db: Session):
+    """レプリカを参照するセッションでも、ブロック内の読み取りをプライマリに送る"""
+    return db.use_primary() if isinstance(db, RoutingSession) else nullcontext(db)
+
+
+class ReplicaSet:
+    """レプリカの選択（ラウンドロビン）と状態管理"""
+
+    def __init__(self, primary: Engine, replicas: List[Engine], max_lag: float = DB_REPLICA_MAX_LAG_SECONDS):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.healthy: Dict[int, bool] = {index: True for index in range(len(self.replicas))}
+        self.errors: Dict[int, Optional[str]] = {index: None for index in range(len(self.replicas))}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for index, replica in enumerate(self.replicas):
+            self._watch_disconnects(index, replica)
+
+    def name(self, index: int) -> str:
+        return self.replicas[index].url.render_as_string(hide_password=True)
+
+    def _watch_disconnects(self, index: int, replica: Engine):
+        @event.listens_for(replica, "handle_error")
+        def on_error(context):
+            # 接続断は次回のヘルスチェックまで除外
+            if context.is_disconnect:
+                self.mark_unhealthy(index, str(context.original_exception))
+
+    def mark_unhealthy(self, index: int, error: str):
+        with self._lock:
+            if self.healthy.get(index):
+                logger.warning("Replica %s marked unhealthy: %s", self.name(index), error)
+            self.healthy[index] = False
+            self.errors[index] = error
+
+    def next_replica(self) -> Optional[Engine]:
+        """正常なレプリカをラウンドロビンで選択（なければNone）"""
+        candidates = [replica for index, replica in enumerate(self.replicas) if self.healthy[index]]
+        if not candidates:
+            return None
+        return candidates[next(self._counter) % len(candidates)]
+
+    def session(self, use_primary: bool = False) -> RoutingSession:
+        replica = None if use_primary else self.next_replica()
+        return RoutingSession(self.primary, replica, autocommit=False, autoflush=False)
+
+    def _check(self, replica: Engine):
+        with replica.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            if replica.dialect.name == "postgresql" and self.max_lag:
+                lag = connection.execute(
+                    text("SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+                ).scalar()
+                if lag is not None and lag > self.max_lag:
+                    raise RuntimeError(f"replication lag {lag:.1f}s")
+
+    def check(self) -> str:
+        """全レプリカに接続して状態を更新（HealthMonitor のチェックとして実行）"""
+        for index, replica in enumerate(self.replicas):
+            try:
+                self._check(replica)
+            except Exception as e:
+                self.mark_unhealthy(index, str(e))
+            else:
+                with self._lock:
+                    if not self.healthy[index]:
+                        logger.info("Replica %s recovered", self.name(index))
+                    self.healthy[index] = True
+                    self.errors[index] = None
+        healthy = sum(self.healthy.values())
+        if healthy == len(self.replicas):
+            return f"healthy: {healthy}/{len(self.replicas)} replicas"
+        failed = "; ".join(f"{self.name(index)}: {self.errors[index]}" for index in self.errors if not self.healthy[index])
+        return f"warning: {healthy}/{len(self.replicas)} replicas ({failed})"
+
+
+replica_set = ReplicaSet(primary_engine, replica_engines)
+
+
+def mark_write():
+    """処理中のリクエストが書き込みを行ったことを記録（read-your-writes 用）"""
+    marker = _write_marker.get()
+    if marker is not None:
+        marker.append(True)
+
+
+def wrote_in_request() -> bool:
+    return bool(_write_marker.get())
+
+
+def _sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+# 書き込みのコミットを検出（flush・一括UPDATE/DELETE を行ったセッションのコミット）
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False):
+        mark_write()
+
+
+def reads_from_primary(request: Request) -> bool:
+    """このリクエストの読み取りをプライマリで行うか（直近に書き込んだクライアント・リクエスト内で書き込んだ場合）"""
+    return _sticky(request) or wrote_in_request()
+
+
+def get_read_db(request: Request):
+    """読み取り専用の依存性（直近に書き込んだクライアントはプライマリ）"""
+    db = replica_set.session(use_primary=reads_from_primary(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_session_factory(request: Request) -> Callable[[], Session]:
+    """読み取り用セッションを作る関数の依存性（複数のセッションを別スレッドで並行に使う場合）"""
+    use_primary = reads_from_primary(request)
+    return lambda: replica_set.session(use_primary=use_primary)
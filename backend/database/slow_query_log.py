@@ -0,0 +1,241 @@
+"""スロークエリログ
+
+閾値を超えたSQLを、正規化した形状（フィンガープリント）ごとに集計する
+（件数・合計・p50/p99・最大、バインドパラメータの型、呼び出し元のルート）。
+EXPLAIN はフィンガープリントごとに初回のみ、リクエスト処理とは別のスレッドで
+別接続から取得する。パラメータの値は EXPLAIN にのみ使い、保持しない。
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter as CounterDict, OrderedDict, deque
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from middleware.query_counter import statement_shape
+from utils.logging_config import request_scope_var
+from utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# スロークエリとみなす実行時間（ミリ秒、0以下で無効）
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+# EXPLAIN を取得するか
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+# 集計するフィンガープリント数の上限（超えた場合は最も古く記録されたものから破棄）
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "200"))
+# パーセンタイル計算に使う直近の実行時間の件数（フィンガープリントごと）
+SLOW_QUERY_SAMPLES = int(os.getenv("SLOW_QUERY_SAMPLES", "500"))
+
+slow_queries_total = Counter("slow_queries_total", "SQL statements slower than SLOW_QUERY_THRESHOLD_MS", ("route",))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b", re.IGNORECASE)
+
+SORT_KEYS = ("total", "count", "p50", "p99", "max")
+
+
+def fingerprint(statement: str) -> str:
+    """SQLの形状に加えてリテラルを ? に置き換えたもの"""
+    return _NUMBER_LITERAL.sub("?", _STRING_LITERAL.sub("?", statement_shape(statement)))
+
+
+def parameter_types(parameters, executemany: bool = False):
+    """バインドパラメータの型名（位置指定は list、名前指定は dict）"""
+    if executemany and parameters:
+        parameters = parameters[0]
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return []
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(percent / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _current_route() -> str:
+    scope = request_scope_var.get()
+    if scope is None:
+        return "background"
+    route = getattr(scope.get("route"), "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {route}".strip()
+
+
+def explain(engine: Engine, statement: str, parameters) -> List[str]:
+    """実行計画を取得（SQLite は EXPLAIN QUERY PLAN、それ以外は EXPLAIN）"""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        conn.rollback()
+    if engine.dialect.name == "sqlite":
+        # (id, parent, notused, detail)
+        return [str(row[-1]) for row in rows]
+    return [" | ".join(str(value) for value in row) for row in rows]
+
+
+class SlowQueryStats:
+    """フィンガープリントごとの集計"""
+
+    def __init__(self, fingerprint: str, statement: str, samples: int = SLOW_QUERY_SAMPLES):
+        self.fingerprint = fingerprint
+        self.id = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+        self.statement = statement
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.durations: deque = deque(maxlen=samples)
+        self.routes: CounterDict = CounterDict()
+        self.parameter_types = None
+        self.plan: Optional[List[str]] = None
+        self.plan_error: Optional[str] = None
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+
+    def record(self, duration: float, route: str, types):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.durations.append(duration)
+        self.routes[route] += 1
+        self.parameter_types = types
+        self.last_seen = time.time()
+
+    def summary(self) -> dict:
+        durations = sorted(self.durations)
+        return {
+            "id": self.id,
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "p50_ms": round(_percentile(durations, 50) * 1000, 3),
+            "p99_ms": round(_percentile(durations, 99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "routes": dict(self.routes.most_common()),
+            "parameter_types": self.parameter_types,
+            "plan": self.plan,
+            "plan_error": self.plan_error,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+class SlowQueryLog:
+    """閾値を超えたSQLの記録と、EXPLAIN を取得するワーカースレッド"""
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.stats: "OrderedDict[str, SlowQueryStats]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._explain_queue: "queue.Queue" = queue.Queue(maxsize=100)
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def record(self, engine: Optional[Engine], statement: str, parameters, duration: float, executemany: bool = False):
+        """実行時間が閾値を超えていれば記録"""
+        if not self.enabled or duration * 1000 < self.threshold_ms:
+            return
+        key = fingerprint(statement)
+        route = _current_route()
+        with self._lock:
+            stats = self.stats.get(key)
+            is_new = stats is None
+            if is_new:
+                stats = self.stats[key] = SlowQueryStats(key, statement)
+                while len(self.stats) > self.max_fingerprints:
+                    self.stats.popitem(last=False)
+            stats.record(duration, route, parameter_types(parameters, executemany))
+        slow_queries_total.inc((route,))
+        logger.warning(
+            "Slow query %.1fms on %s [%s]: %s", duration * 1000, route, stats.id, key,
+            extra={"fingerprint_id": stats.id, "duration_ms": round(duration * 1000, 3)},
+        )
+        if is_new and self.explain and engine is not None and _EXPLAINABLE.match(statement):
+            self._enqueue_explain(stats, engine, statement, parameters[0] if executemany and parameters else parameters)
+
+    def _enqueue_explain(self, stats: SlowQueryStats, engine: Engine, statement: str, parameters):
+        try:
+            self._explain_queue.put_nowait((stats, engine, statement, parameters))
+        except queue.Full:
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_explain, name="slow-query-explain", daemon=True)
+            self._worker.start()
+
+    def _run_explain(self):
+        while True:
+            stats, engine, statement, parameters = self._explain_queue.get()
+            try:
+                stats.plan = explain(engine, statement, parameters)
+            except Exception as e:
+                stats.plan_error = f"{type(e).__name__}: {e}"
+            finally:
+                self._explain_queue.task_done()
+
+    def wait_for_explains(self):
+        """キューに積まれた EXPLAIN の完了を待つ"""
+        self._explain_queue.join()
+
+    def top(self, limit: int = 20, sort_by: str = "total") -> List[dict]:
+        """集計値の大きい順（sort_by: total / count / p50 / p99 / max）"""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            summaries = [stats.summary() for stats in self.stats.values()]
+        field = "count" if sort_by == "count" else f"{sort_by}_ms"
+        summaries.sort(key=lambda summary: summary[field], reverse=True)
+        return summaries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if slow_query_log.enabled:
+        conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("slow_query_start_time")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    if statement.lstrip()[:7].upper() == "EXPLAIN":
+        return
+    slow_query_log.record(conn.engine, statement, parameters, duration, executemany)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_start_time(exception_context):
+    # 失敗したSQLでは after_cursor_execute が呼ばれないため、接続に残った開始時刻を取り除く
+    connection = exception_context.connection
+    start_times = connection.info.get("slow_query_start_time") if connection is not None else None
+    if start_times:
+        start_times.pop()
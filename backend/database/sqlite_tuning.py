@@ -0,0 +1,123 @@
+"""SQLite（ファイル）向けの設定
+
+接続ごとに PRAGMA（WAL・synchronous・mmap・キャッシュ・ビジータイムアウト）を設定する。
+書き込みはプロセス内で1つずつ実行する（single writer）。pysqlite は最初の INSERT/UPDATE/DELETE の
+直前に BEGIN を発行するため、その直前でロックを取得し、コミット・ロールバック時に解放する。
+これにより同一ワーカー内の書き込み同士は "database is locked" で失敗せず順番待ちになる
+（ワーカー間の競合はビジータイムアウトで待つ）。
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+from utils.metrics import Counter, Histogram
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+# WAL では NORMAL でも破損しない（電源断時に直近のコミットが失われる可能性のみ）
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# 負の値はKiB単位（-65536 = 64MiB、接続ごと）
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# プロセス内の書き込みトランザクションを直列化するか
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "true").lower() == "true"
+
+_WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_LOCK_KEY = "sqlite_write_lock"
+
+sqlite_write_lock_wait_seconds = Histogram(
+    "sqlite_write_lock_wait_seconds",
+    "Time spent waiting for the SQLite single-writer lock",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+sqlite_write_lock_timeouts_total = Counter(
+    "sqlite_write_lock_timeouts_total",
+    "Writes that gave up waiting for the SQLite single-writer lock",
+)
+
+
+def default_pragmas() -> Dict[str, object]:
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+
+class WriterLock:
+    """プロセス内で書き込みトランザクションを1つに制限するロック"""
+
+    def __init__(self, timeout: float = SQLITE_BUSY_TIMEOUT_MS / 1000):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def acquire(self, info: dict):
+        if info.get(_LOCK_KEY):
+            return
+        start = time.perf_counter()
+        acquired = self._lock.acquire(timeout=self.timeout)
+        sqlite_write_lock_wait_seconds.observe(time.perf_counter() - start)
+        if not acquired:
+            sqlite_write_lock_timeouts_total.inc()
+            raise TimeoutError(f"database is locked (waited {self.timeout}s for the writer lock)")
+        info[_LOCK_KEY] = True
+
+    def release(self, info: dict):
+        if info.pop(_LOCK_KEY, False):
+            self._lock.release()
+
+
+def is_file_database(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:")
+
+
+def configure_sqlite(engine: Engine, pragmas: Optional[Dict[str, object]] = None, single_writer: bool = SQLITE_SINGLE_WRITER) -> Optional[WriterLock]:
+    """PRAGMA とシングルライターを設定（シングルライター有効時はロックを返す）"""
+    pragmas = default_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    if not single_writer:
+        return None
+
+    lock = WriterLock()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def acquire_for_write(conn, cursor, statement, parameters, context, executemany):
+        if _WRITE_STATEMENT.match(statement):
+            try:
+                lock.acquire(conn.info)
+            except TimeoutError as e:
+                # SQLite のロック待ちタイムアウトと同じ例外として扱えるようにする
+                raise exc.OperationalError(statement, parameters, sqlite3.OperationalError(str(e))) from None
+
+    # commit イベントは実際の COMMIT の直前に呼ばれる（次の書き込みとの僅かな重なりはビジータイムアウトで待つ）
+    @event.listens_for(engine, "commit")
+    def release_on_commit(conn):
+        lock.release(conn.info)
+
+    @event.listens_for(engine, "rollback")
+    def release_on_rollback(conn):
+        lock.release(conn.info)
+
+    # コミットせずに返却された接続（返却時にロールバックされる）
+    @event.listens_for(engine, "checkin")
+    def release_on_checkin(dbapi_connection, connection_record):
+        lock.release(connection_record.info)
+
+    return lock
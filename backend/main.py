@@ -1,13 +1,80 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database.init_db import create_tables
+from middleware.admission import ADMISSION_CONTROL, AdmissionMiddleware
+from middleware.loop_watchdog import LoopWatchdogMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiler import ProfilerMiddleware
+from middleware.query_counter import QueryCounterMiddleware
+from middleware.read_your_writes import ReadYourWritesMiddleware
+from middleware.request_context import RequestContextMiddleware
+from middleware.tracing import TracingMiddleware
+from database.replicas import replica_set
 from routers import auth
+from services.archive_service import ARCHIVE_INTERVAL_SECONDS, archive_periodically
+from services.health_service import health_monitor
+from services.notification_hub import NOTIFICATION_PUBSUB, notification_hub
+from services.notification_service import OUTBOX_DISPATCHER, outbox_dispatcher
+from services.task_queue import TASK_WORKERS, task_queue
+from utils.event_loop import EVENT_LOOP_WATCHDOG, loop_watchdog, monitor_event_loop
+from utils.logging_config import configure_logging
+from utils.memory_profiler import MEMORY_SNAPSHOT_INTERVAL, memory_tracker
+from utils.metrics import REGISTRY, flush_periodically
+from utils.responses import FastJSONResponse
+from utils.tracing import configure_tracing
 import os
 
-# データベーステーブルを作成
-create_tables()
+# JSON形式の構造化ログ（logs/app.log）
+configure_logging()
+# トレースのエクスポーター（既定では logs/traces.jsonl）
+configure_tracing()
 
-app = FastAPI(title="StayConnect API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # マイグレーションを最新まで適用（インポート時に行うとテストやツールの読み込みでもDBが書き換わるため）
+    await asyncio.to_thread(create_tables)
+    # 初回のヘルスチェック（/health・/ready は以降この結果を返す）
+    await health_monitor.refresh()
+    # バックグラウンドタスク（ヘルスチェックの更新・イベントループ遅延の計測・メトリクスの書き出し）
+    tasks = [
+        asyncio.create_task(health_monitor.run()),
+        asyncio.create_task(monitor_event_loop()),
+        asyncio.create_task(flush_periodically()),
+    ]
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(archive_periodically()))
+    # バックグラウンドタスクのワーカー（別プロセスで実行する場合は TASK_WORKERS=false）
+    if TASK_WORKERS:
+        tasks.append(asyncio.create_task(task_queue.run()))
+    # 予約イベントの通知の配信（別プロセスで実行する場合は OUTBOX_DISPATCHER=false）
+    if OUTBOX_DISPATCHER:
+        tasks.append(asyncio.create_task(outbox_dispatcher.run()))
+    # 他のワーカーが配信した通知をこのワーカーの WebSocket 接続に配る
+    if NOTIFICATION_PUBSUB:
+        tasks.append(asyncio.create_task(notification_hub.listen()))
+    if EVENT_LOOP_WATCHDOG:
+        loop_watchdog.start(asyncio.get_running_loop())
+    if MEMORY_SNAPSHOT_INTERVAL > 0:
+        memory_tracker.schedule(MEMORY_SNAPSHOT_INTERVAL, routes=app.routes)
+    yield
+    if EVENT_LOOP_WATCHDOG:
+        loop_watchdog.stop()
+    memory_tracker.unschedule()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    REGISTRY.write_snapshot(REGISTRY.snapshot())
+
+
+app = FastAPI(
+    title="StayConnect API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS設定
 app.add_middleware(
@@ -18,15 +85,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 書き込んだクライアントを一定時間プライマリに固定（レプリカ設定時のみ）
+if replica_set.replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+# リクエストごとのSQL件数・N+1検出
+app.add_middleware(QueryCounterMiddleware)
+# オンデマンドのプロファイル対象リクエストの追跡（停止中は素通し）
+app.add_middleware(ProfilerMiddleware)
+# イベントループをブロックしたルートの特定（EVENT_LOOP_WATCHDOG=true の場合のみ）
+if EVENT_LOOP_WATCHDOG:
+    app.add_middleware(LoopWatchdogMiddleware)
+# 過負荷時の優先度付きロードシェディング（ADMISSION_CONTROL=true の場合のみ。拒否したリクエストもメトリクス・ログに記録される）
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware)
+# ルートごとのリクエスト数・レイテンシ
+app.add_middleware(MetricsMiddleware)
+# トレースのルートスパン（traceparent の引き継ぎ）
+app.add_middleware(TracingMiddleware)
+# リクエストID・アクセスログ（最も外側）
+app.add_middleware(RequestContextMiddleware)
+
 # ルーターを追加
 app.include_router(auth.router, prefix="/api")
-from routers import users, hosts, matching, bookings, messages, health
+from routers import users, hosts, matching, bookings, messages, notifications, dashboard, health, metrics, admin
 app.include_router(users.router, prefix="/api")
 app.include_router(hosts.router)
 app.include_router(matching.router)
 app.include_router(bookings.router)
 app.include_router(messages.router)
+app.include_router(notifications.router)
+app.include_router(dashboard.router)
 app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
 
 # アップロードディレクトリの作成
 os.makedirs("uploads", exist_ok=True)
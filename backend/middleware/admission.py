@@ -0,0 +1,262 @@
+"""アドミッション制御（過負荷時の優先度付きロードシェディング）
+
+リクエストを優先度クラス（critical: 予約・認証の書き込み / authenticated: 有効なトークン付き / browse: 匿名）に分け、
+ワーカー内の同時処理数を ADMISSION_MAX_CONCURRENCY に制限する。下位のクラスほど使える枠が少なく
+（ADMISSION_CLASS_SHARES）、空きがない場合は優先度順の待ち行列に入る。
+
+待ち時間の上限はクラスごとのレイテンシ予算から実測の処理時間（指数移動平均）を引いた値で、
+処理が遅くなるほど短くなる。待ち行列の長さから推定した待ち時間が上限を超える場合は
+待たずに 503（Retry-After 付き）を返すため、過負荷時は browse から先に落ちる。
+"""
+import asyncio
+import fnmatch
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from utils.metrics import Counter, Gauge, Histogram
+from utils.security import is_valid_token
+
+# 有効・無効とワーカーごとの同時処理数
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "false").lower() == "true"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+# クラスごとの同時処理数の割合・レイテンシ予算（秒。待ち時間 + 処理時間の目安）・待ち行列の上限
+ADMISSION_CLASS_SHARES = os.getenv("ADMISSION_CLASS_SHARES", "critical=1.0,authenticated=0.9,browse=0.7")
+ADMISSION_LATENCY_BUDGETS = os.getenv("ADMISSION_LATENCY_BUDGETS", "critical=10,authenticated=3,browse=1")
+ADMISSION_MAX_QUEUE = os.getenv("ADMISSION_MAX_QUEUE", "critical=200,authenticated=100,browse=50")
+# 待ち時間の下限（秒）・Retry-After の上限（秒）
+ADMISSION_MIN_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_MIN_QUEUE_TIMEOUT", "0.05"))
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "30"))
+# critical として扱うリクエスト（"メソッド パス"、* はワイルドカード）と、制御の対象外とするパスの接頭辞
+ADMISSION_CRITICAL_ROUTES = os.getenv(
+    "ADMISSION_CRITICAL_ROUTES",
+    "POST /api/bookings*,PUT /api/bookings/*,DELETE /api/bookings/*,POST /api/auth/*,POST /api/users/login,POST /api/users/register",
+)
+ADMISSION_EXEMPT_PATHS = os.getenv("ADMISSION_EXEMPT_PATHS", "/health,/ready,/live,/metrics,/api/admin")
+
+# 優先度の高い順
+PRIORITY_CLASSES = ("critical", "authenticated", "browse")
+# 処理時間の指数移動平均の重み
+LATENCY_ALPHA = 0.1
+
+admission_requests_total = Counter(
+    "admission_requests_total",
+    "Requests by priority class and admission result (admitted / queued / shed / timeout)",
+    ("class", "result"),
+)
+admission_queue_wait_seconds = Histogram(
+    "admission_queue_wait_seconds",
+    "Time spent waiting for an admission slot",
+    ("class",),
+)
+admission_queue_length = Gauge(
+    "admission_queue_length",
+    "Requests waiting for an admission slot",
+    ("class",),
+)
+admission_queue_timeout_seconds = Gauge(
+    "admission_queue_timeout_seconds",
+    "Current adaptive queue timeout",
+    ("class",),
+    mode="max",
+)
+
+
+def _parse_mapping(spec: str) -> Dict[str, float]:
+    values = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.rsplit("=", 1)
+            values[name.strip()] = float(value)
+    return values
+
+
+class Rejected(Exception):
+    """受け付けられなかったリクエスト（retry_after は推奨する再試行までの秒数）"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """優先度付きの同時処理数の制限（イベントループ上で使用）"""
+
+    def __init__(
+        self,
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        shares: Optional[Dict[str, float]] = None,
+        budgets: Optional[Dict[str, float]] = None,
+        max_queue: Optional[Dict[str, float]] = None,
+        min_queue_timeout: float = ADMISSION_MIN_QUEUE_TIMEOUT,
+    ):
+        shares = _parse_mapping(ADMISSION_CLASS_SHARES) if shares is None else shares
+        budgets = _parse_mapping(ADMISSION_LATENCY_BUDGETS) if budgets is None else budgets
+        max_queue = _parse_mapping(ADMISSION_MAX_QUEUE) if max_queue is None else max_queue
+        self.max_concurrency = max_concurrency
+        self.limits = {name: max(1, int(max_concurrency * shares.get(name, 1.0))) for name in PRIORITY_CLASSES}
+        self.budgets = {name: budgets.get(name, 1.0) for name in PRIORITY_CLASSES}
+        self.max_queue = {name: int(max_queue.get(name, 0)) for name in PRIORITY_CLASSES}
+        self.min_queue_timeout = min_queue_timeout
+        self.active = 0
+        self.latency = 0.0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITY_CLASSES}
+
+    def _ahead(self, priority: str) -> int:
+        """同じか高い優先度で待っているリクエスト数"""
+        rank = PRIORITY_CLASSES.index(priority)
+        return sum(len(self._queues[name]) for name in PRIORITY_CLASSES[: rank + 1])
+
+    def queue_timeout(self, priority: str) -> float:
+        """待ち時間の上限（レイテンシ予算から実測の処理時間を引いた値）"""
+        return max(self.min_queue_timeout, self.budgets[priority] - self.latency)
+
+    def estimated_wait(self, priority: str) -> float:
+        """待ち行列の長さと処理時間から推定した待ち時間"""
+        return (self._ahead(priority) + 1) * self.latency / self.limits[priority]
+
+    def retry_after(self, priority: str) -> int:
+        return min(ADMISSION_MAX_RETRY_AFTER, max(1, math.ceil(self.estimated_wait(priority))))
+
+    async def acquire(self, priority: str):
+        """処理枠を取得（受け付けられない場合は Rejected）"""
+        if self.active < self.limits[priority] and self._ahead(priority) == 0:
+            self.active += 1
+            admission_requests_total.inc((priority, "admitted"))
+            return
+
+        timeout = self.queue_timeout(priority)
+        admission_queue_timeout_seconds.set(timeout, (priority,))
+        queue = self._queues[priority]
+        if len(queue) >= self.max_queue[priority] or self.estimated_wait(priority) > timeout:
+            admission_requests_total.inc((priority, "shed"))
+            raise Rejected(self.retry_after(priority))
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        admission_queue_length.inc((priority,))
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # 枠を割り当てられた直後に切断された場合は返却する
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            # タイムアウトと同時に枠を割り当てられた場合は受け付ける
+            if not waiter.done():
+                waiter.cancel()
+            if waiter in queue:
+                queue.remove(waiter)
+            admission_queue_length.dec((priority,))
+            admission_queue_wait_seconds.observe(time.monotonic() - start, (priority,))
+        if waiter.cancelled():
+            admission_requests_total.inc((priority, "timeout"))
+            raise Rejected(self.retry_after(priority))
+        admission_requests_total.inc((priority, "queued"))
+
+    def release(self, duration: Optional[float] = None):
+        """処理枠を返却し、待っているリクエストに優先度順に割り当てる"""
+        self.active -= 1
+        if duration is not None:
+            self.latency += LATENCY_ALPHA * (duration - self.latency)
+        self._wake()
+
+    def _wake(self):
+        for name in PRIORITY_CLASSES:
+            queue = self._queues[name]
+            while queue and self.active < self.limits[name]:
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self.active += 1
+                waiter.set_result(True)
+            if queue:
+                # 上位のクラスが待っている間は下位のクラスに割り当てない
+                return
+
+
+class AdmissionMiddleware:
+    """優先度クラスごとにリクエストを受け付け・待機・拒否（503 + Retry-After）するミドルウェア"""
+
+    def __init__(
+        self,
+        app,
+        controller: Optional[AdmissionController] = None,
+        critical_routes: str = ADMISSION_CRITICAL_ROUTES,
+        exempt_paths: str = ADMISSION_EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.controller = controller or AdmissionController()
+        self.critical_routes: List[str] = [route.strip() for route in critical_routes.split(",") if route.strip()]
+        self.exempt_paths = tuple(path.strip() for path in exempt_paths.split(",") if path.strip())
+
+    def classify(self, scope) -> Optional[str]:
+        """優先度クラス（対象外の場合はNone）。ルーティング前のためメソッドとパスで判定する"""
+        path = scope["path"]
+        if path.startswith(self.exempt_paths):
+            return None
+        request_line = f"{scope['method']} {path}"
+        if any(fnmatch.fnmatchcase(request_line, pattern) for pattern in self.critical_routes):
+            return "critical"
+        # 認証はクエリパラメータ token または Authorization ヘッダー（Bearer）。
+        # 不正なトークンを付けて上位のクラスに入れないよう、署名と有効期限を検証する
+        token = self._token(scope)
+        if token and is_valid_token(token):
+            return "authenticated"
+        return "browse"
+
+    @staticmethod
+    def _token(scope) -> Optional[str]:
+        query = scope.get("query_string", b"")
+        if b"token=" in query:
+            values = parse_qs(query.decode("latin-1")).get("token")
+            if values:
+                return values[0]
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, credentials = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and credentials:
+                    return credentials.strip()
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = self.classify(scope)
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(priority)
+        except Rejected as e:
+            await self._reject(send, e.retry_after)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - start)
+
+    @staticmethod
+    async def _reject(send, retry_after: int):
+        body = b'{"detail":"Service temporarily overloaded"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
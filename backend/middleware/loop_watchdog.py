@@ -0,0 +1,23 @@
+import asyncio
+
+from utils.event_loop import loop_watchdog
+
+
+class LoopWatchdogMiddleware:
+    """処理中のリクエストをタスクごとに登録し、イベントループのブロック元ルートを特定できるようにする"""
+
+    def __init__(self, app, watchdog=loop_watchdog):
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        self.watchdog.active[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.active.pop(task, None)
@@ -0,0 +1,50 @@
+import time
+
+from utils.metrics import Counter, Gauge, Histogram, route_label
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "Total HTTP requests",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being processed",
+)
+
+
+class MetricsMiddleware:
+    """ルートごとのリクエスト数・レイテンシ・処理中リクエスト数を記録するミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            # ルーティング後は scope["route"] にマッチしたルートが入る
+            route = route_label(scope)
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - start, (method, route))
+            http_requests_total.inc((method, route, str(status_code)))
@@ -0,0 +1,26 @@
+from utils.profiler import profiler as default_profiler
+
+
+class ProfilerMiddleware:
+    """プロファイル対象のリクエストの開始・終了をプロファイラーに通知するミドルウェア
+
+    プロファイラー停止中は属性参照のみで素通しする。
+    """
+
+    def __init__(self, app, profiler=default_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.profiler.session is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.track_request(scope["path"])
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
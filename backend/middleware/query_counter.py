@@ -0,0 +1,153 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 同一形状のSQLがこの回数以上実行されたらN+1の疑いとして警告
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5"))
+# 1リクエストのクエリ数がこの値を超えたら警告
+QUERY_COUNT_WARNING = int(os.getenv("QUERY_COUNT_WARNING", "30"))
+
+_IN_CLAUSE = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """SQLの形状（IN句のパラメータ数・空白の違いを除いたもの）"""
+    return _WHITESPACE.sub(" ", _IN_CLAUSE.sub("(?)", statement)).strip()
+
+
+class QueryStats:
+    """実行されたSQLの件数・時間・形状ごとの回数"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int = QUERY_N_PLUS_ONE_THRESHOLD):
+        """閾値以上繰り返された形状（N+1の疑い）"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries, {self.duration * 1000:.1f}ms"]
+        lines += [f"  {count}x {shape}" for shape, count in self.shapes.most_common()]
+        return "\n".join(lines)
+
+
+# リクエスト単位の集計先
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+# プロセス全体の集計先（テストのクエリ数検証用）
+_global_stats: List[QueryStats] = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None or _global_stats:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for stats in _global_stats:
+        stats.record(statement, duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_start_time(exception_context):
+    # 失敗したSQLでは after_cursor_execute が呼ばれないため、接続に残った開始時刻を取り除く
+    connection = exception_context.connection
+    start_times = connection.info.get("query_start_time") if connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """処理中のリクエストのクエリ集計を取得"""
+    return _request_stats.get()
+
+
+class assert_max_queries(ContextDecorator):
+    """ブロック内（またはデコレートした関数内）のクエリ数が上限以下であることを検証
+
+        with assert_max_queries(3):
+            client.get("/api/hosts")
+    """
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.stats = QueryStats()
+
+    def __enter__(self) -> QueryStats:
+        self.stats = QueryStats()
+        _global_stats.append(self.stats)
+        return self.stats
+
+    def __exit__(self, exc_type, exc, traceback):
+        _global_stats.remove(self.stats)
+        if exc_type is None and self.stats.count > self.max_queries:
+            raise AssertionError(
+                f"Expected at most {self.max_queries} queries, got {self.stats.report()}"
+            )
+        return False
+
+
+class QueryCounterMiddleware:
+    """リクエストごとのSQL件数・時間を Server-Timing ヘッダーとログに出力し、N+1を検出するミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope, stats: QueryStats):
+        route = f"{scope['method']} {scope['path']}"
+        repeated = stats.repeated_shapes()
+        for shape, count in repeated:
+            logger.warning("N+1 suspected on %s: %d x %s", route, count, shape)
+        if stats.count > QUERY_COUNT_WARNING:
+            logger.warning("%s executed %d queries (%.1fms)", route, stats.count, stats.duration * 1000)
+        else:
+            logger.debug("%s executed %d queries (%.1fms)", route, stats.count, stats.duration * 1000)
@@ -0,0 +1,31 @@
+import time
+
+from database.replicas import DB_READ_YOUR_WRITES_SECONDS, STICKY_COOKIE, _write_marker
+
+
+class ReadYourWritesMiddleware:
+    """書き込みをコミットしたリクエストのレスポンスに、一定時間プライマリを参照させる Cookie を付与するミドルウェア"""
+
+    def __init__(self, app, seconds: float = DB_READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = []
+        token = _write_marker.set(marker)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and marker:
+                until = time.time() + self.seconds
+                cookie = f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(self.seconds) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message.setdefault("headers", []).append((b"set-cookie", cookie.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _write_marker.reset(token)
@@ -0,0 +1,68 @@
+import logging
+import os
+import re
+import time
+import uuid
+
+from utils.logging_config import debug_sampled_var, request_id_var, request_scope_var, sample_debug
+
+logger = logging.getLogger("access")
+
+# リクエストごとのアクセスログ（INFO）を出力するか
+LOG_ACCESS = os.getenv("LOG_ACCESS", "true").lower() == "true"
+
+# 受け付ける X-Request-ID（ログへの注入を防ぐため英数字と一部記号のみ）
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestContextMiddleware:
+    """リクエストIDの採番（X-Request-ID の引き継ぎ）とログ用コンテキストの設定"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        tokens = (
+            request_id_var.set(request_id),
+            request_scope_var.set(scope),
+            debug_sampled_var.set(sample_debug(scope["path"])),
+        )
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if LOG_ACCESS:
+                logger.info(
+                    "%s %s %d",
+                    scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    },
+                )
+            for var, token in zip((request_id_var, request_scope_var, debug_sampled_var), tokens):
+                var.reset(token)
@@ -0,0 +1,48 @@
+from utils.metrics import route_label
+from utils.tracing import STATUS_ERROR, tracer
+
+
+class TracingMiddleware:
+    """リクエストのルートスパンを開始し、traceparent を引き継ぐミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        span = tracer.start_request(traceparent, method, {
+            "http.request.method": method,
+            "url.path": scope["path"],
+        })
+        if not span.sampled:
+            # サンプリング対象外でも下流へはトレースIDを伝播する
+            with tracer.use_span(span):
+                await self.app(scope, receive, send)
+            return
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+            await send(message)
+
+        with tracer.use_span(span, end_on_exit=False):
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # ルーティング後にパステンプレートでスパン名を確定する
+                route = route_label(scope)
+                span.name = f"{method} {route}"
+                span.set_attribute("http.route", route)
+                span.end()
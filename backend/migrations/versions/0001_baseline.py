@@ -0,0 +1,97 @@
+"""baseline: create_all で作成していた既存テーブル
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2024-01-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # create_all で作成済みのDBでもそのまま適用できるよう、存在するテーブルは作成しない
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("email", sa.String(length=255), nullable=False),
+            sa.Column("password_hash", sa.String(length=255), nullable=False),
+            sa.Column("interests", sa.JSON(), nullable=True),
+            sa.Column("location", sa.String(length=255), nullable=True),
+            sa.Column("bio", sa.Text(), nullable=True),
+            sa.Column("profile_image", sa.String(length=500), nullable=True),
+            sa.Column("rating", sa.Float(), nullable=True),
+            sa.Column("review_count", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not _has_table("hosts"):
+        op.create_table(
+            "hosts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("title", sa.String(length=200), nullable=False),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column("location", sa.String(length=255), nullable=False),
+            sa.Column("property_type", sa.String(length=50), nullable=False),
+            sa.Column("max_guests", sa.Integer(), nullable=False),
+            sa.Column("amenities", sa.JSON(), nullable=True),
+            sa.Column("house_rules", sa.JSON(), nullable=True),
+            sa.Column("photos", sa.JSON(), nullable=True),
+            sa.Column("price_per_night", sa.Float(), nullable=False),
+            sa.Column("available_dates", sa.JSON(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_hosts_id", "hosts", ["id"])
+
+    if not _has_table("bookings"):
+        op.create_table(
+            "bookings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("guest_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("host_id", sa.Integer(), sa.ForeignKey("hosts.id"), nullable=False),
+            sa.Column("check_in", sa.Date(), nullable=False),
+            sa.Column("check_out", sa.Date(), nullable=False),
+            sa.Column("guests_count", sa.Integer(), nullable=False),
+            sa.Column("total_price", sa.Float(), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=True),
+            sa.Column("message", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_bookings_id", "bookings", ["id"])
+
+    if not _has_table("messages"):
+        op.create_table(
+            "messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("booking_id", sa.Integer(), sa.ForeignKey("bookings.id"), nullable=False),
+            sa.Column("sender_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("receiver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("is_read", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_messages_id", "messages", ["id"])
+
+
+def downgrade():
+    op.drop_table("messages")
+    op.drop_table("bookings")
+    op.drop_table("hosts")
+    op.drop_table("users")
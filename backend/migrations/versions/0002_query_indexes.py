@@ -0,0 +1,34 @@
+"""外部キー・クエリパターン用のインデックスを追加
+
+Revision ID: 0002_query_indexes
+Revises: 0001_baseline
+Create Date: 2024-01-15 00:00:01
+"""
+from alembic import op
+
+revision = "0002_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+# (インデックス名, テーブル, 列)
+INDEXES = [
+    ("ix_hosts_user_id", "hosts", ["user_id"]),
+    ("ix_hosts_is_active_max_guests", "hosts", ["is_active", "max_guests"]),
+    ("ix_bookings_guest_id", "bookings", ["guest_id"]),
+    ("ix_bookings_host_id_status", "bookings", ["host_id", "status"]),
+    ("ix_messages_sender_id", "messages", ["sender_id"]),
+    ("ix_messages_receiver_id", "messages", ["receiver_id"]),
+    ("ix_messages_booking_id_created_at", "messages", ["booking_id", "created_at"]),
+    ("ix_messages_booking_id_receiver_id_is_read", "messages", ["booking_id", "receiver_id", "is_read"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,146 @@
+"""messages の月次パーティション化とアーカイブテーブル（PostgreSQLのみ）
+
+SQLite では何もしない（アーカイブは ATTACH したファイルに作成する。database/archive.py を参照）。
+
+Revision ID: 0003_message_partitions
+Revises: 0002_query_indexes
+Create Date: 2024-01-15 00:00:02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_message_partitions"
+down_revision = "0002_query_indexes"
+branch_labels = None
+depends_on = None
+
+# パーティションを作成する将来の月数（以降はアーカイブジョブが作成する）
+MONTHS_AHEAD = 3
+
+MESSAGE_INDEXES = [
+    ("ix_messages_sender_id", ["sender_id"]),
+    ("ix_messages_receiver_id", ["receiver_id"]),
+    ("ix_messages_booking_id_created_at", ["booking_id", "created_at"]),
+    ("ix_messages_booking_id_receiver_id_is_read", ["booking_id", "receiver_id", "is_read"]),
+]
+
+
+def _create_archive_tables():
+    op.execute("CREATE SCHEMA IF NOT EXISTS archive")
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("guest_id", sa.Integer(), nullable=False, index=True),
+        sa.Column("host_id", sa.Integer(), nullable=False, index=True),
+        sa.Column("check_in", sa.Date(), nullable=False),
+        sa.Column("check_out", sa.Date(), nullable=False),
+        sa.Column("guests_count", sa.Integer(), nullable=False),
+        sa.Column("total_price", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+        schema="archive",
+    )
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("booking_id", sa.Integer(), nullable=False),
+        sa.Column("sender_id", sa.Integer(), nullable=False),
+        sa.Column("receiver_id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+        schema="archive",
+    )
+    op.create_index("ix_archive_messages_booking_id_created_at", "messages", ["booking_id", "created_at"], schema="archive")
+
+
+def _partition_messages():
+    bind = op.get_bind()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('messages', 'id')")).scalar()
+
+    op.execute("ALTER TABLE messages RENAME TO messages_unpartitioned")
+    for name, _ in MESSAGE_INDEXES + [("ix_messages_id", None)]:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    # パーティションキーは主キーに含める必要がある
+    op.execute(f"""
+        CREATE TABLE messages (
+            id integer NOT NULL DEFAULT nextval('{sequence}'),
+            booking_id integer NOT NULL REFERENCES bookings (id),
+            sender_id integer NOT NULL REFERENCES users (id),
+            receiver_id integer NOT NULL REFERENCES users (id),
+            content text NOT NULL,
+            is_read boolean,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY messages.id")
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+    # 既存データの最古の月から MONTHS_AHEAD か月先まで
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date := date_trunc('month', coalesce((SELECT min(created_at) FROM messages_unpartitioned), now()));
+        BEGIN
+            WHILE month <= date_trunc('month', now()) + interval '{MONTHS_AHEAD} months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                    'messages_' || to_char(month, '"y"YYYY"m"MM'), month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO messages (id, booking_id, sender_id, receiver_id, content, is_read, created_at)
+        SELECT id, booking_id, sender_id, receiver_id, content, is_read, coalesce(created_at, now())
+        FROM messages_unpartitioned
+    """)
+    op.execute("DROP TABLE messages_unpartitioned")
+    for name, columns in MESSAGE_INDEXES:
+        op.create_index(name, "messages", columns)
+
+
+def _unpartition_messages():
+    bind = op.get_bind()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('messages', 'id')")).scalar()
+
+    op.execute("ALTER TABLE messages RENAME TO messages_partitioned")
+    op.execute(f"""
+        CREATE TABLE messages (
+            id integer PRIMARY KEY DEFAULT nextval('{sequence}'),
+            booking_id integer NOT NULL REFERENCES bookings (id),
+            sender_id integer NOT NULL REFERENCES users (id),
+            receiver_id integer NOT NULL REFERENCES users (id),
+            content text NOT NULL,
+            is_read boolean,
+            created_at timestamptz DEFAULT now()
+        )
+    """)
+    op.execute("INSERT INTO messages SELECT * FROM messages_partitioned")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY messages.id")
+    op.execute("DROP TABLE messages_partitioned CASCADE")
+    op.create_index("ix_messages_id", "messages", ["id"])
+    for name, columns in MESSAGE_INDEXES:
+        op.create_index(name, "messages", columns)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    _partition_messages()
+    _create_archive_tables()
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_table("messages", schema="archive")
+    op.drop_table("bookings", schema="archive")
+    op.execute("DROP SCHEMA IF EXISTS archive")
+    _unpartition_messages()
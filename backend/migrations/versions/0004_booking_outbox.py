@@ -0,0 +1,53 @@
+"""予約イベントのアウトボックスとアプリ内通知
+
+Revision ID: 0004_booking_outbox
+Revises: 0003_message_partitions
+Create Date: 2024-01-15 00:00:03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_booking_outbox"
+down_revision = "0003_message_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("event_type", sa.String(length=50), nullable=False),
+        sa.Column("aggregate_id", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("recipients", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("pending_channels", sa.JSON(), nullable=True),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_outbox_events_id", "outbox_events", ["id"])
+    op.create_index("ix_outbox_events_status_available_at", "outbox_events", ["status", "available_at"])
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(length=50), nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("event_id", "user_id", name="uq_notifications_event_id_user_id"),
+    )
+    op.create_index("ix_notifications_id", "notifications", ["id"])
+    op.create_index("ix_notifications_user_id_is_read", "notifications", ["user_id", "is_read"])
+
+
+def downgrade():
+    op.drop_table("notifications")
+    op.drop_table("outbox_events")
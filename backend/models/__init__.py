@@ -2,5 +2,7 @@ from .user import User
 from .host import Host
 from .booking import Booking
 from .message import Message
+from .outbox import OutboxEvent
+from .notification import Notification
 
-__all__ = ["User", "Host", "Booking", "Message"]
\ No newline at end of file
+__all__ = ["User", "Host", "Booking", "Message", "OutboxEvent", "Notification"]
@@ -1,13 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Date, ForeignKey, Index
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from database.connection import Base
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # 宿主ごとの予約一覧・ステータス絞り込み（host_id単体の検索も兼ねる）
+        Index("ix_bookings_host_id_status", "host_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    guest_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    guest_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     host_id = Column(Integer, ForeignKey("hosts.id"), nullable=False)
     check_in = Column(Date, nullable=False)
     check_out = Column(Date, nullable=False)
@@ -16,7 +21,7 @@ class Booking(Base):
     status = Column(String(20), default="pending")  # "pending", "confirmed", "cancelled", "completed"
     message = Column(Text, nullable=True)  # 予約時のメッセージ
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=lambda: datetime.now(timezone.utc))
     
     # リレーション
     guest = relationship("User", foreign_keys=[guest_id])
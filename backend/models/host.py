@@ -1,13 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from database.connection import Base
 
 class Host(Base):
     __tablename__ = "hosts"
+    __table_args__ = (
+        # 一覧検索（is_active + max_guests）
+        Index("ix_hosts_is_active_max_guests", "is_active", "max_guests"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     location = Column(String(255), nullable=False)
@@ -20,6 +25,6 @@ class Host(Base):
     available_dates = Column(JSON, default=list)  # 利用可能日程
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=lambda: datetime.now(timezone.utc))  
   # リレーション
     user = relationship("User", back_populates="hosts")
\ No newline at end of file
@@ -1,15 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database.connection import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # 予約ごとのメッセージ一覧・最新メッセージ（booking_id単体の検索も兼ねる）
+        Index("ix_messages_booking_id_created_at", "booking_id", "created_at"),
+        # 予約ごとの未読数
+        Index("ix_messages_booking_id_receiver_id_is_read", "booking_id", "receiver_id", "is_read"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False)
-    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
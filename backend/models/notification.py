@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from database.connection import Base
+
+class Notification(Base):
+    """アプリ内通知"""
+    __tablename__ = "notifications"
+    __table_args__ = (
+        # 同じイベントを再配信しても通知は1件（配信は at-least-once のため）
+        UniqueConstraint("event_id", "user_id", name="uq_notifications_event_id_user_id"),
+        # ユーザーごとの通知一覧・未読数
+        Index("ix_notifications_user_id_is_read", "user_id", "is_read"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_id = Column(Integer, nullable=False)  # outbox_events.id（配信済みのイベントは削除されるため外部キーにしない）
+    type = Column(String(50), nullable=False)
+    booking_id = Column(Integer, nullable=True)
+    payload = Column(JSON, nullable=True)
+    is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+from datetime import datetime, timezone
+from database.connection import Base
+
+class OutboxEvent(Base):
+    """予約の変更イベント（変更と同じトランザクションで書き込み、services/notification_service.py が配信する）"""
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # 配信待ちのイベントの取得（status, available_at の順に絞り込み、id 順に処理する）
+        Index("ix_outbox_events_status_available_at", "status", "available_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(50), nullable=False)  # "booking.created", "booking.status_changed", "booking.cancelled"
+    aggregate_id = Column(Integer, nullable=False)  # 予約ID
+    payload = Column(JSON, nullable=False)
+    recipients = Column(JSON, nullable=False)  # 通知先のユーザーID
+    status = Column(String(20), nullable=False, default="pending")  # "pending", "dispatched", "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    # まだ送信できていない外部チャネル（アプリ内通知の作成時に設定し、送信できたチャネルを除いていく）
+    pending_channels = Column(JSON, nullable=True)
+    # 次に配信を試みる時刻（失敗時はバックオフ分先に延ばす）
+    available_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
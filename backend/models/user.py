@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from database.connection import Base
 
@@ -17,7 +18,7 @@ class User(Base):
     rating = Column(Float, default=0.0)
     review_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=lambda: datetime.now(timezone.utc))
     
     # リレーション
     hosts = relationship("Host", back_populates="user")
\ No newline at end of file
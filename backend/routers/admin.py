@@ -0,0 +1,129 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from typing import Optional
+from database.slow_query_log import slow_query_log
+from services.task_queue import task_queue
+from schemas.admin import ProfilerStart, MemoryTraceStart, MemorySnapshotCreate, MemorySchedule
+from utils.memory_profiler import memory_tracker
+from utils.profiler import profiler
+from utils.security import require_admin
+
+# 運用・調査用（ADMIN_TOKEN を設定した場合のみ有効）
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiler")
+async def get_profiler_status():
+    """プロファイラーの状態と前回の結果を取得"""
+    session = profiler.session
+    return {
+        **(session.status() if session else {"running": False}),
+        "last_result": profiler.last_result,
+    }
+
+@router.post("/profiler/start")
+async def start_profiler(params: ProfilerStart):
+    """サンプリングプロファイラーを開始（秒数指定、またはパスに一致するリクエストM件分）"""
+    try:
+        return profiler.start(
+            seconds=params.seconds,
+            requests=params.requests,
+            route=params.route,
+            interval=params.interval_ms / 1000,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.post("/profiler/stop")
+def stop_profiler():
+    """プロファイラーを停止し、collapsed stack の出力先と上位の関数を返す"""
+    if not profiler.running:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Profiler is not running")
+    return profiler.stop()
+
+@router.get("/memory")
+async def get_memory_status():
+    """tracemalloc の状態と保持しているスナップショット一覧を取得"""
+    return {**memory_tracker.status(), "last_scheduled_diff": memory_tracker.last_scheduled_diff}
+
+@router.post("/memory/start")
+async def start_memory_tracing(params: MemoryTraceStart):
+    """tracemalloc を開始（トレース中はメモリ確保のたびにコストがかかる）"""
+    memory_tracker.start(params.frames)
+    return memory_tracker.status()
+
+@router.post("/memory/stop")
+def stop_memory_tracing():
+    """tracemalloc を停止し、スナップショットを破棄"""
+    memory_tracker.stop()
+    return memory_tracker.status()
+
+@router.post("/memory/snapshots")
+def take_memory_snapshot(params: MemorySnapshotCreate):
+    """スナップショットを取得（baseline=true で差分の基準にする）"""
+    try:
+        return memory_tracker.take_snapshot(label=params.label, baseline=params.baseline)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/memory/diff")
+def get_memory_diff(
+    request: Request,
+    snapshot_id: Optional[int] = None,
+    baseline_id: Optional[int] = None,
+    group_by: str = "module",
+    limit: int = 20
+):
+    """ベースラインとの差分（group_by: module / lineno / route）"""
+    try:
+        return memory_tracker.diff(
+            snapshot_id=snapshot_id,
+            baseline_id=baseline_id,
+            group_by=group_by,
+            limit=limit,
+            routes=request.app.routes,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.post("/memory/schedule")
+async def schedule_memory_snapshots(params: MemorySchedule, request: Request):
+    """定期スナップショットを開始（直前との差分をルート単位でログに出力）"""
+    memory_tracker.schedule(params.interval_seconds, routes=request.app.routes)
+    return memory_tracker.status()
+
+@router.delete("/memory/schedule")
+def unschedule_memory_snapshots():
+    """定期スナップショットを停止"""
+    memory_tracker.unschedule()
+    return memory_tracker.status()
+
+@router.get("/slow-queries")
+def get_slow_queries(limit: int = 20, sort_by: str = "total"):
+    """閾値を超えたSQLをフィンガープリントごとに集計したもの（sort_by: total / count / p50 / p99 / max）"""
+    try:
+        top = slow_query_log.top(limit=limit, sort_by=sort_by)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "fingerprints": len(slow_query_log.stats),
+        "top": top,
+    }
+
+@router.delete("/slow-queries")
+def reset_slow_queries():
+    """スロークエリの集計をリセット"""
+    slow_query_log.reset()
+    return {"threshold_ms": slow_query_log.threshold_ms, "fingerprints": 0, "top": []}
+
+@router.get("/tasks")
+def get_task_queues(dead_letters: Optional[str] = None, limit: int = 20):
+    """バックグラウンドタスクのキューごとの件数（dead_letters=キュー名 で失敗したタスクも返す）"""
+    stats = task_queue.stats()
+    if dead_letters:
+        stats["dead_letters"] = [json.loads(raw) for raw in task_queue.backend.dead_letters(dead_letters, limit)]
+    return stats
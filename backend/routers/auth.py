@@ -1,10 +1,14 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from database.connection import get_db
-from schemas.auth import UserSignup, UserLogin, Token
+from schemas.auth import UserSignup, UserLogin, Token, AuthUser, AuthResponse
 from schemas.user import UserResponse
 from services.auth_service import AuthService
 from utils.security import verify_token
+from utils.responses import model_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -14,48 +18,39 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     user = AuthService.create_user(db, user_data)
     return user
 
-@router.post("/register")
+@router.post("/register", response_model=AuthResponse)
 async def register(user_data: UserSignup, db: Session = Depends(get_db)):
     """ユーザー登録（フロントエンド用）"""
-    print(f"受信したデータ: {user_data}")
+    logger.debug("ユーザー登録リクエスト受信", extra={"email": user_data.email})
     try:
         user = AuthService.create_user(db, user_data)
         tokens = AuthService.create_tokens(user.id)
         
-        # ユーザー情報を辞書形式に変換
-        user_dict = {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "interests": user.interests or [],
-            "location": user.location,
-            "bio": user.bio,
-            "profile_image": user.profile_image,
-            "rating": user.rating,
-            "review_count": user.review_count,
-            "created_at": user.created_at.isoformat() if user.created_at else None,
-            "updated_at": user.updated_at.isoformat() if user.updated_at else None
-        }
-        
-        return {
-            "access_token": tokens["access_token"],
-            "refresh_token": tokens["refresh_token"],
-            "user": user_dict
-        }
+        result = AuthResponse(
+            access_token=tokens["access_token"],
+            refresh_token=tokens["refresh_token"],
+            user=AuthUser.model_validate(user)
+        )
+        return model_response(AuthResponse, result)
     except Exception as e:
-        print(f"登録エラー: {e}")
+        logger.warning("登録エラー: %s", e, extra={"email": user_data.email})
         raise
 
-@router.post("/login")
-async def login(login_data: UserLogin, response: Response, db: Session = Depends(get_db)):
+@router.post("/login", response_model=AuthResponse)
+async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     """ログイン"""
-    print(f"ログインリクエスト受信: {login_data.email}")
+    logger.debug("ログインリクエスト受信", extra={"email": login_data.email})
     user = AuthService.authenticate_user(db, login_data)
-    print(f"認証成功 - ユーザーID: {user.id}")
     tokens = AuthService.create_tokens(user.id)
+    logger.info("ログイン成功", extra={"user_id": user.id})
     
-    print(f"ログイン成功 - ユーザー: {user}")
-    print(f"トークン: {tokens}")
+    result = AuthResponse(
+        access_token=tokens["access_token"],
+        refresh_token=tokens["refresh_token"],
+        token_type=tokens["token_type"],
+        user=AuthUser.model_validate(user)
+    )
+    response = model_response(AuthResponse, result)
     
     # リフレッシュトークンをhttpOnlyクッキーに設定
     response.set_cookie(
@@ -66,30 +61,7 @@ async def login(login_data: UserLogin, response: Response, db: Session = Depends
         samesite="lax",
         max_age=7 * 24 * 60 * 60  # 7日間
     )
-    
-    # ユーザー情報を辞書形式に変換
-    user_dict = {
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "interests": user.interests or [],
-        "location": user.location,
-        "bio": user.bio,
-        "profile_image": user.profile_image,
-        "rating": user.rating,
-        "review_count": user.review_count,
-        "created_at": user.created_at.isoformat() if user.created_at else None,
-        "updated_at": user.updated_at.isoformat() if user.updated_at else None
-    }
-    
-    result = {
-        "access_token": tokens["access_token"],
-        "refresh_token": tokens["refresh_token"],
-        "token_type": tokens["token_type"],
-        "user": user_dict
-    }
-    print(f"レスポンス: {result}")
-    return result
+    return response
 
 @router.post("/logout")
 async def logout(response: Response):
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from database.connection import get_db
 from models.booking import Booking
 from models.host import Host
 from schemas.booking import BookingCreate, BookingUpdate, BookingResponse
 from routers.users import get_current_user
+from utils.http_cache import entity_etag, is_not_modified, set_validators, not_modified_response
+from services.booking_service import BookingService
+from services.entity_cache import host_cache
+from services.notification_service import outbox_dispatcher
+from services.outbox_service import OutboxService, BOOKING_CREATED, BOOKING_STATUS_CHANGED, BOOKING_CANCELLED
+from utils.responses import model_response
 from models.user import User
+from schemas.user import UserSnapshot
 from typing import List
 from datetime import datetime
 
@@ -13,22 +20,17 @@ router = APIRouter(prefix="/api/bookings", tags=["bookings"])
 
 @router.get("/", response_model=List[BookingResponse])
 async def get_bookings(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """予約一覧取得"""
-    bookings = db.query(Booking).filter(
-        (Booking.guest_id == current_user.id) | 
-        (Booking.host_id.in_(
-            db.query(Host.id).filter(Host.user_id == current_user.id)
-        ))
-    ).all()
-    return bookings
+    bookings = BookingService.get_bookings_for_user(db, current_user.id)
+    return model_response(List[BookingResponse], bookings)
 
 @router.post("/", response_model=BookingResponse)
 async def create_booking(
     booking_data: BookingCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """予約申し込み"""
@@ -71,14 +73,20 @@ async def create_booking(
     )
     
     db.add(db_booking)
+    # 通知イベントは予約と同じトランザクションで記録する（配信はディスパッチャーが行う）
+    db.flush()
+    OutboxService.record_booking_event(db, BOOKING_CREATED, db_booking, host.user_id, current_user.id)
     db.commit()
+    outbox_dispatcher.notify()
     db.refresh(db_booking)
     return db_booking
 
 @router.get("/{booking_id}", response_model=BookingResponse)
 async def get_booking_detail(
     booking_id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """予約詳細取得"""
@@ -90,20 +98,25 @@ async def get_booking_detail(
         )
     
     # 権限チェック（ゲストまたは宿主のみアクセス可能）
-    host = db.query(Host).filter(Host.id == booking.host_id).first()
-    if booking.guest_id != current_user.id and host.user_id != current_user.id:
+    host = host_cache.get(db, booking.host_id)
+    if booking.guest_id != current_user.id and (host is None or host.user_id != current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this booking"
         )
     
+    # 条件付きGET（権限チェック後、シリアライズ前に判定）
+    etag = entity_etag("booking", booking)
+    if is_not_modified(request, etag, booking.updated_at):
+        return not_modified_response(etag, booking.updated_at)
+    set_validators(response, etag, booking.updated_at)
     return booking
 
 @router.put("/{booking_id}", response_model=BookingResponse)
 async def update_booking_status(
     booking_id: int,
     booking_update: BookingUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """予約ステータス更新"""
@@ -115,24 +128,32 @@ async def update_booking_status(
         )
     
     # 宿主のみステータス変更可能
-    host = db.query(Host).filter(Host.id == booking.host_id).first()
-    if host.user_id != current_user.id:
+    host = host_cache.get(db, booking.host_id)
+    if host is None or host.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only host can update booking status"
         )
     
+    previous_status = booking.status
     if booking_update.status:
         booking.status = booking_update.status
     
+    changed = booking.status != previous_status
+    if changed:
+        OutboxService.record_booking_event(
+            db, BOOKING_STATUS_CHANGED, booking, host.user_id, current_user.id, previous_status=previous_status
+        )
     db.commit()
+    if changed:
+        outbox_dispatcher.notify()
     db.refresh(booking)
     return booking
 
 @router.delete("/{booking_id}")
 async def cancel_booking(
     booking_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """予約キャンセル"""
@@ -150,7 +171,17 @@ async def cancel_booking(
             detail="Only guest can cancel booking"
         )
     
+    previous_status = booking.status
     booking.status = "cancelled"
+    changed = previous_status != "cancelled"
+    if changed:
+        host = host_cache.get(db, booking.host_id)
+        OutboxService.record_booking_event(
+            db, BOOKING_CANCELLED, booking, host.user_id if host else None, current_user.id,
+            previous_status=previous_status
+        )
     db.commit()
+    if changed:
+        outbox_dispatcher.notify()
     
     return {"message": "Booking cancelled successfully"}
\ No newline at end of file
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from typing import Callable
+from sqlalchemy.orm import Session
+from database.replicas import get_read_session_factory
+from routers.users import get_current_user
+from schemas.dashboard import DashboardResponse
+from schemas.user import UserSnapshot
+from services.dashboard_service import DashboardService
+from utils.responses import model_response
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+@router.get("/", response_model=DashboardResponse)
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    current_user: UserSnapshot = Depends(get_current_user),
+    session_factory: Callable[[], Session] = Depends(get_read_session_factory)
+):
+    """ダッシュボード取得（ユーザー情報・予約一覧・会話一覧・おすすめ宿主を1回で返す）
+
+    認証は1回のみで、各セクションは別の接続で並行に取得する。
+    """
+    dashboard = await DashboardService.build(current_user, session_factory)
+    return model_response(DashboardResponse, dashboard)
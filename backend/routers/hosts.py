@@ -1,27 +1,133 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
+from sqlalchemy.orm import Session, load_only
 from database.connection import get_db
+from database.replicas import get_read_session_factory, reads_from_primary
 from models.host import Host
 from models.user import User
-from schemas.host import HostCreate, HostUpdate, HostResponse
+from schemas.user import UserSnapshot
+from schemas.host import HostCreate, HostUpdate, HostResponse, HostCard, host_projection_model
 from routers.users import get_current_user
-from typing import List, Optional
+from services.background_tasks import process_photo
+from services.entity_cache import host_cache, parse_ids
+from services.task_queue import task_queue
+from utils.http_cache import entity_etag, list_etag, is_not_modified, set_validators, not_modified_response
+from utils.responses import dump_json, model_response
+from utils.single_flight import SingleFlight, request_key
+from typing import Callable, List, Optional, Tuple
 import shutil
 import json
 
 router = APIRouter(prefix="/api/hosts", tags=["hosts"])
 
+hosts_list_flight = SingleFlight("hosts_list")
+host_detail_flight = SingleFlight("host_detail")
+
+# カード表示で取得する列（重いTEXT/JSON列は取得せず、写真は先頭1件のみ）
+CARD_COLUMNS = (
+    Host.id,
+    Host.title,
+    Host.location,
+    Host.property_type,
+    Host.max_guests,
+    Host.price_per_night,
+    Host.photos[0].as_string().label("thumbnail"),
+    Host.updated_at,
+)
+
+def _parse_fields(fields: str) -> Tuple[str, ...]:
+    """fieldsパラメータを検証し、HostResponseのフィールド順に並べる"""
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(HostResponse.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    requested.add("id")
+    return tuple(name for name in HostResponse.model_fields if name in requested)
+
 @router.get("/", response_model=List[HostResponse])
 @router.get("", response_model=List[HostResponse])
 async def get_hosts(
+    request: Request,
     location: Optional[str] = Query(None),
     max_guests: Optional[int] = Query(None),
     skip: int = Query(0),
     limit: int = Query(100),
-    db: Session = Depends(get_db)
+    view: str = Query("full", pattern="^(full|card)$"),
+    fields: Optional[str] = Query(None, description="カンマ区切りの取得フィールド（例: id,title,price_per_night）"),
+    ids: Optional[str] = Query(None, description="カンマ区切りの宿主ID（指定時は他の検索条件を無視し、指定順に返す）"),
+    session_factory: Callable[[], Session] = Depends(get_read_session_factory)
 ):
-    """宿主一覧取得（検索・フィルタリング）"""
-    query = db.query(Host).filter(Host.is_active == True)
+    """宿主一覧取得（検索・フィルタリング）
+    
+    view=card で一覧表示用の軽量な表現、fields= で指定フィールドのみを返す。
+    いずれの場合も指定外の重い列はSELECTしない。
+    ids= を指定した場合はエンティティキャッシュを参照し、キャッシュにないものを IN クエリ1回で取得する。
+    """
+    if ids:
+        db = session_factory()
+        try:
+            return _get_hosts_by_ids(request, parse_ids(ids), view, fields, db)
+        finally:
+            db.close()
+    selected = _parse_fields(fields) if fields else None
+    
+    # 同じ条件の同時リクエストは1回の検索・シリアライズの結果を共有する
+    etag, body = await hosts_list_flight.do(
+        _flight_key(request, request_key(request)),
+        _in_session, session_factory, _search_hosts, location, max_guests, skip, limit, view, selected
+    )
+    
+    # 条件付きGET（一覧は行の削除・ページからの脱落で最終更新日時が変わらないため、ETagのみで判定する）
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    response = Response(content=body, media_type="application/json")
+    set_validators(response, etag)
+    return response
+
+def _flight_key(request: Request, key: str) -> str:
+    """集約のキー（プライマリを参照するリクエストがレプリカの結果を受け取らないよう分ける）"""
+    return f"{'primary' if reads_from_primary(request) else 'replica'}:{key}"
+
+def _in_session(session_factory: Callable[[], Session], fn: Callable, *args):
+    """fn(db, *args) を新しいセッションで実行（スレッドで実行）
+
+    集約した処理は最初のリクエストの終了後も実行され続けることがあるため、リクエストのセッションは使わず、
+    実行するスレッド内で作成・破棄する
+    """
+    db = session_factory()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+def _search_hosts(
+    db: Session,
+    location: Optional[str],
+    max_guests: Optional[int],
+    skip: int,
+    limit: int,
+    view: str,
+    selected: Optional[Tuple[str, ...]],
+) -> Tuple[str, bytes]:
+    """宿主を検索し、ETag・JSONを返す"""
+    if selected:
+        columns = [getattr(Host, name) for name in selected + ("updated_at",)]
+        query = db.query(Host).options(load_only(*columns))
+        schema = host_projection_model(selected)
+        representation = ",".join(selected)
+    elif view == "card":
+        query = db.query(*CARD_COLUMNS)
+        schema = HostCard
+        representation = "card"
+    else:
+        query = db.query(Host)
+        schema = HostResponse
+        representation = "full"
+    
+    query = query.filter(Host.is_active == True)
     
     if location:
         query = query.filter(Host.location.contains(location))
@@ -29,24 +135,73 @@ async def get_hosts(
         query = query.filter(Host.max_guests >= max_guests)
     
     hosts = query.offset(skip).limit(limit).all()
-    return hosts
+    
+    # レスポンスモデルを経由せず、行から直接シリアライズする
+    etag = list_etag(f"hosts:{representation}", hosts)
+    return etag, dump_json(List[schema], hosts)
+
+def _get_hosts_by_ids(request: Request, host_ids: List[int], view: str, fields: Optional[str], db: Session) -> Response:
+    """ids= 指定時の一覧（非公開・存在しない宿主は含めない）"""
+    found = host_cache.get_many(db, host_ids)
+    hosts = [found[host_id] for host_id in host_ids if host_id in found and found[host_id].is_active]
+
+    if fields:
+        selected = _parse_fields(fields)
+        schema = host_projection_model(selected)
+        representation = ",".join(selected)
+    elif view == "card":
+        schema = HostCard
+        representation = "card"
+    else:
+        schema = HostResponse
+        representation = "full"
+
+    etag = list_etag(f"hosts:ids:{representation}", hosts)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    if schema is HostCard:
+        # スナップショットには thumbnail がないため先頭の写真から作る
+        hosts = [
+            HostCard(**host.model_dump(include=set(HostCard.model_fields)), thumbnail=host.photos[0] if host.photos else None)
+            for host in hosts
+        ]
+    response = model_response(List[schema], hosts)
+    set_validators(response, etag)
+    return response
 
 @router.get("/{host_id}/", response_model=HostResponse)
 @router.get("/{host_id}", response_model=HostResponse)
-async def get_host_detail(host_id: int, db: Session = Depends(get_db)):
+async def get_host_detail(
+    host_id: int,
+    request: Request,
+    response: Response,
+    session_factory: Callable[[], Session] = Depends(get_read_session_factory)
+):
     """宿主詳細取得"""
-    host = db.query(Host).filter(Host.id == host_id, Host.is_active == True).first()
-    if not host:
+    # キャッシュ済みの場合はDBを参照せずにバージョンを判定できる
+    host = host_cache.peek(host_id)
+    if host is None:
+        # キャッシュミス時は同じ宿主への同時リクエストで1回の読み込みを共有する
+        host = await host_detail_flight.do(
+            _flight_key(request, f"host:{host_id}"), _in_session, session_factory, host_cache.get, host_id
+        )
+    if not host or not host.is_active:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Host not found"
         )
+    
+    etag = entity_etag("host", host)
+    if is_not_modified(request, etag, host.updated_at):
+        return not_modified_response(etag, host.updated_at)
+    set_validators(response, etag, host.updated_at)
     return host
 
 @router.post("/", response_model=HostResponse)
 async def create_host(
     host_data: HostCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """宿主情報登録"""
@@ -72,7 +227,7 @@ async def create_host(
 async def update_host(
     host_id: int,
     host_update: HostUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """宿主情報更新"""
@@ -89,13 +244,14 @@ async def update_host(
     
     db.commit()
     db.refresh(host)
+    host_cache.invalidate(host.id)
     return host
 
 @router.post("/{host_id}/upload-photos")
 async def upload_host_photos(
     host_id: int,
     files: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """宿主写真アップロード"""
@@ -124,5 +280,10 @@ async def upload_host_photos(
     current_photos = host.photos or []
     host.photos = current_photos + uploaded_files
     db.commit()
+    host_cache.invalidate(host.id)
+    
+    # 縮小・サムネイル作成はバックグラウンドで行う
+    for file_path in uploaded_files:
+        await task_queue.enqueue_or_run(process_photo, file_path)
     
     return {"message": f"{len(uploaded_files)} photos uploaded successfully", "photos": host.photos}
\ No newline at end of file
@@ -1,65 +1,41 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from database.connection import get_db
+from database.replicas import get_read_db
 from services.matching_service import MatchingService
+from services.entity_cache import host_cache, user_cache
+from schemas.matching import MatchedHostResponse
+from utils.responses import model_response
 from routers.users import get_current_user
 from models.user import User
+from schemas.user import UserSnapshot
 from typing import List, Dict, Any
 
 router = APIRouter(prefix="/api/matching", tags=["matching"])
 
-@router.get("/hosts")
+@router.get("/hosts", response_model=List[MatchedHostResponse])
 async def get_matched_hosts(
     limit: int = Query(20, le=50),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> List[Dict[str, Any]]:
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
     """マッチング率順の宿主一覧取得"""
     matched_hosts = MatchingService.get_matched_hosts(db, current_user.id, limit)
     
-    # レスポンス用にデータを整形
-    result = []
-    for item in matched_hosts:
-        host = item["host"]
-        host_user = item["host_user"]
-        
-        result.append({
-            "id": host.id,
-            "title": host.title,
-            "description": host.description,
-            "location": host.location,
-            "property_type": host.property_type,
-            "max_guests": host.max_guests,
-            "price_per_night": host.price_per_night,
-            "photos": host.photos or [],
-            "available_dates": host.available_dates or [],
-            "host_user": {
-                "id": host_user.id,
-                "name": host_user.name,
-                "interests": host_user.interests or [],
-                "rating": host_user.rating,
-                "review_count": host_user.review_count
-            },
-            "match_rate": item["match_rate"],
-            "match_reason": item["match_reason"]
-        })
-    
-    return result
+    # 中間の辞書を作らず、マッチング結果の属性から直接シリアライズする
+    return model_response(List[MatchedHostResponse], matched_hosts)
 
 @router.get("/rate/{host_id}")
 async def calculate_match_rate(
     host_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """特定の宿主とのマッチング率計算"""
-    from models.host import Host
-    
-    host = db.query(Host).filter(Host.id == host_id).first()
+    host = host_cache.get(db, host_id)
     if not host:
         return {"error": "Host not found"}
     
-    host_user = db.query(User).filter(User.id == host.user_id).first()
+    host_user = user_cache.get(db, host.user_id)
     if not host_user:
         return {"error": "Host user not found"}
     
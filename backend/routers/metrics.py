@@ -0,0 +1,86 @@
+import asyncio
+
+from fastapi import APIRouter, Response
+
+from database import get_pool_status
+from utils.cache import cache_stats
+from utils.metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, render
+
+router = APIRouter(tags=["metrics"])
+
+# コネクションプール（ワーカーごとの累積値は合算、現在値は pid ごと）
+_POOL_COUNTERS = ("connects", "checkouts", "checkins", "invalidations", "soft_invalidations", "timeouts", "wait_seconds_total")
+_POOL_GAUGES = ("size", "checked_in", "checked_out", "overflow", "overflow_peak", "wait_seconds_max")
+
+db_pool_counters = {
+    key: Counter(f"db_pool_{key.removesuffix('_total')}_total", f"Connection pool {key.replace('_', ' ')}")
+    for key in _POOL_COUNTERS
+}
+db_pool_gauges = {
+    key: Gauge(f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}", mode="pid")
+    for key in _POOL_GAUGES
+}
+
+cache_hits_total = Counter("cache_hits_total", "Cache hits", ("cache", "layer"))
+cache_misses_total = Counter("cache_misses_total", "Cache misses", ("cache",))
+cache_entries = Gauge("cache_entries", "Entries in the in-process cache layer", ("cache",), mode="pid")
+
+
+def collect_pool():
+    status = get_pool_status()
+    for key, counter in db_pool_counters.items():
+        if key in status:
+            counter.set_total(status[key])
+    for key, gauge in db_pool_gauges.items():
+        if key in status:
+            gauge.set(status[key])
+
+
+def collect_caches():
+    for namespace, stats in cache_stats().items():
+        cache_hits_total.set_total(stats["local_hits"], (namespace, "local"))
+        cache_hits_total.set_total(stats["redis_hits"], (namespace, "redis"))
+        cache_misses_total.set_total(stats["misses"], (namespace,))
+        cache_entries.set(stats["size"], (namespace,))
+
+
+REGISTRY.add_collector(collect_pool)
+REGISTRY.add_collector(collect_caches)
+
+
+def _with_hit_ratios(merged: dict) -> dict:
+    """全ワーカー合算後のヒット・ミス数からキャッシュヒット率を算出"""
+    hits, misses = {}, {}
+    for (namespace, _layer), value in merged.get("cache_hits_total", {}).get("samples", {}).items():
+        hits[namespace] = hits.get(namespace, 0.0) + value
+    for (namespace,), value in merged.get("cache_misses_total", {}).get("samples", {}).items():
+        misses[namespace] = value
+
+    samples = {}
+    for namespace in hits.keys() | misses.keys():
+        total = hits.get(namespace, 0.0) + misses.get(namespace, 0.0)
+        samples[(namespace,)] = hits.get(namespace, 0.0) / total if total else 0.0
+    merged["cache_hit_ratio"] = {
+        "type": "gauge",
+        "help": "Cache hit ratio across all workers",
+        "labelnames": ["cache"],
+        "buckets": None,
+        "samples": samples,
+    }
+    return merged
+
+
+def _render_all(own: dict) -> str:
+    return render(_with_hit_ratios(REGISTRY.collect(own=own)))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 形式のメトリクス（全ワーカー分を合算）
+
+    記録側がロックを取らないため、スナップショットはイベントループ上で取得し、
+    他のワーカーのファイルの読み書き・合算・整形はスレッドで行う
+    """
+    own = REGISTRY.snapshot()
+    content = await asyncio.to_thread(_render_all, own)
+    return Response(content=content, media_type=CONTENT_TYPE)
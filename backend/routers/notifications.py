@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session
+from database.connection import get_db
+from models.notification import Notification
+from schemas.notification import NotificationResponse
+from schemas.user import UserSnapshot
+from routers.users import get_current_user
+from services.notification_hub import notification_hub
+from utils.responses import model_response
+from utils.security import verify_token
+from typing import List, Optional
+
+router = APIRouter(prefix="/api/notifications", tags=["notifications"])
+
+@router.get("/", response_model=List[NotificationResponse])
+async def get_notifications(
+    unread_only: bool = False,
+    after_id: Optional[int] = Query(None, description="このIDより新しい通知のみ（差分取得）"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """通知一覧取得（新しい順）"""
+    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    if unread_only:
+        query = query.filter(Notification.is_read == False)
+    if after_id is not None:
+        query = query.filter(Notification.id > after_id)
+    notifications = query.order_by(Notification.id.desc()).limit(limit).all()
+    return model_response(List[NotificationResponse], notifications)
+
+@router.put("/read")
+async def mark_notifications_read(
+    up_to_id: Optional[int] = Query(None, description="このID以下の通知を既読にする（省略時はすべて）"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """通知を既読にする"""
+    query = db.query(Notification).filter(
+        Notification.user_id == current_user.id,
+        Notification.is_read == False
+    )
+    if up_to_id is not None:
+        query = query.filter(Notification.id <= up_to_id)
+    updated = query.update({"is_read": True}, synchronize_session=False)
+    db.commit()
+    return {"updated": updated}
+
+@router.websocket("/ws")
+async def notifications_socket(websocket: WebSocket, token: str):
+    """通知のプッシュ（接続中は予約イベントが届く。接続前・切断中の通知は一覧取得で確認する）"""
+    # 接続中にDBセッションを保持しないよう、トークンの検証のみ行う
+    try:
+        user_id = int(verify_token(token))
+    except (HTTPException, ValueError):
+        # ユーザーID以外の sub（登録・ログインで発行するメールアドレスのトークン）も拒否する
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await notification_hub.connect(user_id, websocket)
+    try:
+        while True:
+            # クライアントからのメッセージは使わない（切断の検知のみ）
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notification_hub.disconnect(user_id, websocket)
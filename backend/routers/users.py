@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
 from sqlalchemy.orm import Session
 from database.connection import get_db
+from database.replicas import get_read_db
 from models.user import User
-from schemas.user import UserResponse, UserUpdate, UserCreate, UserLogin
+from schemas.user import UserResponse, UserUpdate, UserCreate, UserLogin, UserSnapshot
+from services.auth_service import AuthService
+from services.background_tasks import process_photo
+from services.entity_cache import parse_ids, user_cache
+from services.task_queue import task_queue
+from utils.http_cache import entity_etag, is_not_modified, set_validators, not_modified_response
 from utils.security import verify_token, create_access_token, hash_password, verify_password
 import shutil
 import os
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -16,10 +22,10 @@ class Token(BaseModel):
     token_type: str
     user: UserResponse
 
-def get_current_user(token: str, db: Session = Depends(get_db)):
-    """現在のユーザーを取得"""
+def get_current_user(token: str, db: Session = Depends(get_db)) -> UserSnapshot:
+    """現在のユーザーを取得（トークン検証・ユーザー情報ともにキャッシュを利用）"""
     user_id = verify_token(token)
-    user = db.query(User).filter(User.id == user_id).first()
+    user = AuthService.get_user_snapshot(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -92,42 +98,75 @@ async def login_user(
         "user": user
     }
 
+def _get_current_user_row(db: Session, current_user: UserSnapshot) -> User:
+    """更新用に認証ユーザーの行を取得（キャッシュされたスナップショットの取得後に削除された場合は404）"""
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        AuthService.invalidate_user(current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
+
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserSnapshot = Depends(get_current_user)):
     """現在のユーザー情報取得"""
     return current_user
 
 @router.put("/me", response_model=UserResponse)
 async def update_user_info(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """ユーザー情報更新"""
+    user = _get_current_user_row(db, current_user)
     update_data = user_update.dict(exclude_unset=True)
     
     for field, value in update_data.items():
-        setattr(current_user, field, value)
+        setattr(user, field, value)
     
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(user)
+    AuthService.invalidate_user(user.id)
+    return user
+
+@router.get("", response_model=List[UserResponse])
+async def get_users_by_ids(
+    ids: str = Query(..., description="カンマ区切りのユーザーID（例: 1,5,3）"),
+    db: Session = Depends(get_read_db)
+):
+    """複数ユーザー情報の一括取得（指定順に返し、存在しないIDは含めない）"""
+    user_ids = parse_ids(ids)
+    users = user_cache.get_many(db, user_ids)
+    return [users[user_id] for user_id in user_ids if user_id in users]
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
+async def get_user_by_id(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+):
     """特定ユーザー情報取得"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = user_cache.get(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    
+    etag = entity_etag("user", user)
+    if is_not_modified(request, etag, user.updated_at):
+        return not_modified_response(etag, user.updated_at)
+    set_validators(response, etag, user.updated_at)
     return user
 
 @router.post("/upload-avatar")
 async def upload_avatar(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """プロフィール画像アップロード"""
@@ -138,6 +177,8 @@ async def upload_avatar(
             detail="File must be an image"
         )
     
+    user = _get_current_user_row(db, current_user)
+    
     # ファイル保存
     file_extension = file.filename.split(".")[-1]
     filename = f"avatar_{current_user.id}.{file_extension}"
@@ -147,7 +188,10 @@ async def upload_avatar(
         shutil.copyfileobj(file.file, buffer)
     
     # データベース更新
-    current_user.profile_image = file_path
+    user.profile_image = file_path
     db.commit()
+    AuthService.invalidate_user(user.id)
+    # 縮小・サムネイル作成はバックグラウンドで行う
+    await task_queue.enqueue_or_run(process_photo, file_path)
     
     return {"message": "Avatar uploaded successfully", "file_path": file_path}
\ No newline at end of file
@@ -0,0 +1,37 @@
+import re
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Optional
+
+class ProfilerStart(BaseModel):
+    seconds: Optional[float] = Field(None, gt=0)
+    requests: Optional[int] = Field(None, gt=0)
+    route: Optional[str] = None  # パスの正規表現（例: "^/api/hosts"）
+    interval_ms: float = Field(5.0, ge=1.0, le=1000.0)
+
+    @field_validator("route")
+    @classmethod
+    def valid_pattern(cls, value):
+        if value is not None:
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise ValueError(f"Invalid route pattern: {e}")
+        return value
+
+    @model_validator(mode="after")
+    def default_duration(self):
+        # 秒数・リクエスト数のどちらも指定がない場合は10秒
+        if self.seconds is None and self.requests is None:
+            self.seconds = 10.0
+        return self
+
+class MemoryTraceStart(BaseModel):
+    frames: int = Field(30, ge=1, le=100)
+
+class MemorySnapshotCreate(BaseModel):
+    label: Optional[str] = None
+    baseline: bool = False
+
+class MemorySchedule(BaseModel):
+    interval_seconds: float = Field(..., ge=1.0)
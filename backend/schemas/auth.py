@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import List, Optional
+from datetime import datetime
 
 class UserSignup(BaseModel):
     name: str
@@ -18,4 +19,31 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 class TokenData(BaseModel):
-    user_id: Optional[int] = None
\ No newline at end of file
+    user_id: Optional[int] = None
+
+class AuthUser(BaseModel):
+    id: int
+    name: str
+    email: str
+    interests: List[str] = []
+    location: Optional[str] = None
+    bio: Optional[str] = None
+    profile_image: Optional[str] = None
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("interests", mode="before")
+    @classmethod
+    def none_to_list(cls, value):
+        return value or []
+
+    class Config:
+        from_attributes = True
+
+class AuthResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    user: AuthUser
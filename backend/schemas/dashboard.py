@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from schemas.booking import BookingResponse
+from schemas.matching import MatchedHostResponse
+from schemas.message import ConversationResponse
+from schemas.user import UserResponse
+
+class DashboardResponse(BaseModel):
+    """ダッシュボード（タイムアウト・失敗したセクションは null になり、errors に理由が入る）"""
+    user: UserResponse
+    bookings: Optional[List[BookingResponse]] = None
+    conversations: Optional[List[ConversationResponse]] = None
+    matched_hosts: Optional[List[MatchedHostResponse]] = None
+    errors: Dict[str, str] = {}
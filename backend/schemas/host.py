@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, create_model
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
+from functools import lru_cache
 
 class AvailableDate(BaseModel):
     date: str
@@ -41,4 +42,36 @@ class HostResponse(HostBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class HostSnapshot(HostResponse):
+    """宿主のスナップショット（キャッシュ用）"""
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class HostCard(BaseModel):
+    """一覧表示用の軽量な宿主情報（説明文・設備・日程などの重い項目は含まない）"""
+    id: int
+    title: str
+    location: str
+    property_type: str
+    max_guests: int
+    price_per_night: float
+    thumbnail: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+@lru_cache(maxsize=128)
+def host_projection_model(fields: Tuple[str, ...]):
+    """HostResponseのうち指定フィールドのみを持つモデルを生成（フィールドの組み合わせごとにキャッシュ）"""
+    definitions = {
+        name: (HostResponse.model_fields[name].annotation, HostResponse.model_fields[name])
+        for name in fields
+    }
+    return create_model("HostProjection", __config__=ConfigDict(from_attributes=True), **definitions)
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, field_validator
+from typing import Any, List
+
+class MatchedHostUser(BaseModel):
+    id: int
+    name: str
+    interests: List[str] = []
+    rating: float = 0.0
+    review_count: int = 0
+
+    @field_validator("interests", mode="before")
+    @classmethod
+    def none_to_list(cls, value):
+        return value or []
+
+    @field_validator("rating", "review_count", mode="before")
+    @classmethod
+    def none_to_zero(cls, value):
+        # users の列は NULL を許容している（既定値は Python 側のみ）
+        return 0 if value is None else value
+
+    class Config:
+        from_attributes = True
+
+class MatchedHostResponse(BaseModel):
+    id: int
+    title: str
+    description: str
+    location: str
+    property_type: str
+    max_guests: int
+    price_per_night: float
+    photos: List[str] = []
+    available_dates: List[Any] = []
+    host_user: MatchedHostUser
+    match_rate: float
+    match_reason: str
+
+    @field_validator("photos", "available_dates", mode="before")
+    @classmethod
+    def none_to_list(cls, value):
+        return value or []
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class NotificationResponse(BaseModel):
+    id: int
+    event_id: int
+    type: str  # "booking.created", "booking.status_changed", "booking.cancelled"
+    booking_id: Optional[int] = None
+    payload: Optional[Dict[str, Any]] = None
+    is_read: bool
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import List, Optional
 from datetime import datetime
 
@@ -31,4 +31,33 @@ class UserResponse(UserBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserSnapshot(BaseModel):
+    """認証済みユーザーの軽量スナップショット（キャッシュ用・パスワードハッシュは含まない）"""
+    id: int
+    name: str
+    email: str
+    interests: List[str] = []
+    location: Optional[str] = None
+    bio: Optional[str] = None
+    profile_image: Optional[str] = None
+    rating: float = 0.0
+    review_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("interests", mode="before")
+    @classmethod
+    def none_to_list(cls, value):
+        return value or []
+
+    @field_validator("rating", "review_count", mode="before")
+    @classmethod
+    def none_to_zero(cls, value):
+        # users の列は NULL を許容している（既定値は Python 側のみ）
+        return 0 if value is None else value
+
+    class Config:
+        from_attributes = True
+        frozen = True
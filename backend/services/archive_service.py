@@ -0,0 +1,216 @@
+"""予約・メッセージのアーカイブ
+
+完了・キャンセル済みで ARCHIVE_RETENTION_DAYS 日以上更新のない予約と、そのメッセージを
+アーカイブテーブル（database/archive.py）に移す。コピーと削除は別トランザクションで行い、
+削除はアーカイブに存在する行のみを対象にする（途中で停止しても再実行で続きから処理でき、
+SQLite の ATTACH したファイルとの間でトランザクションが原子的でない場合も行を失わない）。
+
+cron 等から実行する場合（backend ディレクトリで実行）:
+    python -m services.archive_service
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import exists, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from database.archive import archived_bookings, archived_messages
+from database.connection import SessionLocal
+from models.booking import Booking
+from models.message import Message
+
+logger = logging.getLogger(__name__)
+
+# アーカイブ対象とする最終更新からの日数・1トランザクションの予約数
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# アプリ内で定期実行する間隔（秒、0は無効）
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+# 事前に作成する messages の月次パーティション数（PostgreSQL）
+MESSAGE_PARTITION_MONTHS_AHEAD = int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", "3"))
+
+ARCHIVABLE_STATUSES = ("completed", "cancelled")
+
+BOOKING_COLUMNS = [column.name for column in Booking.__table__.columns]
+MESSAGE_COLUMNS = [column.name for column in Message.__table__.columns]
+
+
+def _month_start(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class ArchiveService:
+    @staticmethod
+    def available(db: Session) -> bool:
+        """アーカイブテーブルを参照できるか（SQLite は ATTACH 済み、PostgreSQL はマイグレーション適用済み）"""
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            return any(row[1] == "archive" for row in db.execute(text("PRAGMA database_list")))
+        if dialect == "postgresql":
+            return bool(db.execute(text("SELECT to_regclass('archive.messages') IS NOT NULL")).scalar())
+        return False
+
+    @staticmethod
+    def archive_bookings(
+        db: Session,
+        retention_days: int = ARCHIVE_RETENTION_DAYS,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        now: Optional[datetime] = None,
+    ) -> dict:
+        """保持期間を過ぎた予約とメッセージをアーカイブに移動"""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=retention_days)
+        totals = {"bookings": 0, "messages": 0}
+        last_id = 0
+        while True:
+            booking_ids = db.execute(
+                select(Booking.id)
+                .where(
+                    Booking.id > last_id,
+                    Booking.status.in_(ARCHIVABLE_STATUSES),
+                    func.coalesce(Booking.updated_at, Booking.created_at) < cutoff,
+                )
+                .order_by(Booking.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not booking_ids:
+                break
+            last_id = booking_ids[-1]
+            moved = ArchiveService._archive_batch(db, booking_ids, now)
+            totals["bookings"] += moved["bookings"]
+            totals["messages"] += moved["messages"]
+        if totals["bookings"] or totals["messages"]:
+            logger.info("Archived %d bookings and %d messages", totals["bookings"], totals["messages"])
+        return totals
+
+    @staticmethod
+    def _archive_batch(db: Session, booking_ids: List[int], now: datetime) -> dict:
+        # 1. コピー（前回の途中で停止した場合に備え、アーカイブ済みの行は除く）
+        db.execute(insert(archived_bookings).from_select(
+            BOOKING_COLUMNS + ["archived_at"],
+            select(*[Booking.__table__.c[name] for name in BOOKING_COLUMNS], literal(now, archived_bookings.c.archived_at.type))
+            .where(Booking.id.in_(booking_ids))
+            .where(Booking.id.not_in(select(archived_bookings.c.id).where(archived_bookings.c.id.in_(booking_ids)))),
+        ))
+        db.execute(insert(archived_messages).from_select(
+            MESSAGE_COLUMNS + ["archived_at"],
+            select(*[Message.__table__.c[name] for name in MESSAGE_COLUMNS], literal(now, archived_messages.c.archived_at.type))
+            .where(Message.booking_id.in_(booking_ids))
+            .where(Message.id.not_in(select(archived_messages.c.id).where(archived_messages.c.booking_id.in_(booking_ids)))),
+        ))
+        db.commit()
+
+        # 2. アーカイブに存在する行のみ削除（コピー後に追加されたメッセージは次回に移す）
+        messages = db.query(Message).filter(
+            Message.booking_id.in_(booking_ids),
+            Message.id.in_(select(archived_messages.c.id).where(archived_messages.c.booking_id.in_(booking_ids))),
+        ).delete(synchronize_session=False)
+        bookings = db.query(Booking).filter(
+            Booking.id.in_(booking_ids),
+            Booking.id.in_(select(archived_bookings.c.id).where(archived_bookings.c.id.in_(booking_ids))),
+            ~exists().where(Message.booking_id == Booking.id),
+        ).delete(synchronize_session=False)
+        db.commit()
+        return {"bookings": bookings, "messages": messages}
+
+    @staticmethod
+    def ensure_message_partitions(db: Session, months_ahead: int = MESSAGE_PARTITION_MONTHS_AHEAD) -> List[str]:
+        """今月から months_ahead か月先までの messages のパーティションを作成（PostgreSQLでパーティション化済みの場合のみ）
+
+        ジョブが止まっていた間に DEFAULT パーティションに入った行は、作成したパーティションに移してから接続する
+        （そのまま PARTITION OF で作成すると DEFAULT の制約違反になる）。月ごとに別トランザクションで行い、
+        失敗した月はログに記録して次の月に進む。
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return []
+        partitioned = db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('messages'))"
+        )).scalar()
+        if not partitioned:
+            return []
+        today = datetime.now(timezone.utc).date()
+        names = []
+        for offset in range(months_ahead + 1):
+            start, end = _month_start(today, offset), _month_start(today, offset + 1)
+            name = f"messages_y{start.year}m{start.month:02d}"
+            try:
+                ArchiveService._create_message_partition(db, name, start, end)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to create message partition %s", name)
+                continue
+            names.append(name)
+        return names
+
+    @staticmethod
+    def _create_message_partition(db: Session, name: str, start: date, end: date):
+        if db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar():
+            return
+        bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        params = {"start": start, "end": end}
+        in_default = db.execute(text("SELECT to_regclass('messages_default') IS NOT NULL")).scalar() and db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM messages_default WHERE created_at >= :start AND created_at < :end)"
+        ), params).scalar()
+        if not in_default:
+            db.execute(text(f"CREATE TABLE {name} PARTITION OF messages FOR VALUES {bounds}"))
+            return
+        logger.warning("Moving rows for %s out of messages_default", name)
+        db.execute(text(f"CREATE TABLE {name} (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        db.execute(text(
+            f"WITH moved AS (DELETE FROM messages_default WHERE created_at >= :start AND created_at < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), params)
+        db.execute(text(f"ALTER TABLE messages ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+    @staticmethod
+    def get_booking(db: Session, booking_id: int):
+        """アーカイブ済みの予約（なければNone）"""
+        if not ArchiveService.available(db):
+            return None
+        return db.execute(select(archived_bookings).where(archived_bookings.c.id == booking_id)).first()
+
+    @staticmethod
+    def get_messages(db: Session, booking_id: int):
+        """アーカイブ済みの予約のメッセージ（作成日時順）"""
+        return db.execute(
+            select(archived_messages)
+            .where(archived_messages.c.booking_id == booking_id)
+            .order_by(archived_messages.c.created_at, archived_messages.c.id)
+        ).all()
+
+    @staticmethod
+    def run() -> dict:
+        """パーティションの作成とアーカイブを1回実行（パーティションの作成に失敗してもアーカイブは行う）"""
+        db = SessionLocal()
+        try:
+            try:
+                partitions = ArchiveService.ensure_message_partitions(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to create message partitions")
+                partitions = []
+            if not ArchiveService.available(db):
+                return {"partitions": partitions, "bookings": 0, "messages": 0, "skipped": "archive tables not available"}
+            return {"partitions": partitions, **ArchiveService.archive_bookings(db)}
+        finally:
+            db.close()
+
+
+async def archive_periodically(interval: float = ARCHIVE_INTERVAL_SECONDS):
+    """interval 秒ごとにアーカイブを実行（lifespanでタスクとして起動）"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(ArchiveService.run)
+        except Exception:
+            logger.exception("Archive job failed")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Archive job finished: %s", ArchiveService.run())
@@ -1,11 +1,16 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from models.user import User
 from schemas.auth import UserSignup, UserLogin
+from schemas.user import UserSnapshot
+from services.entity_cache import user_cache
 from utils.security import get_password_hash, verify_password, create_access_token, create_refresh_token
+from utils.tracing import traced
 
 class AuthService:
     @staticmethod
+    @traced()
     def create_user(db: Session, user_data: UserSignup):
         # メールアドレスの重複チェック
         existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -34,6 +39,7 @@ class AuthService:
         return db_user
     
     @staticmethod
+    @traced()
     def authenticate_user(db: Session, login_data: UserLogin):
         user = db.query(User).filter(User.email == login_data.email).first()
         
@@ -46,6 +52,7 @@ class AuthService:
         return user
     
     @staticmethod
+    @traced()
     def create_tokens(user_id: int):
         access_token = create_access_token(data={"sub": str(user_id)})
         refresh_token = create_refresh_token(data={"sub": str(user_id)})
@@ -54,4 +61,15 @@ class AuthService:
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer"
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    @traced()
+    def get_user_snapshot(db: Session, user_id) -> Optional[UserSnapshot]:
+        """認証ユーザーのスナップショットを取得（キャッシュにない場合のみDBを参照）"""
+        return user_cache.get(db, user_id)
+    
+    @staticmethod
+    def invalidate_user(user_id: int):
+        """ユーザー情報の変更時にスナップショットを破棄"""
+        user_cache.invalidate(user_id)
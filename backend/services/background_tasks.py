@@ -0,0 +1,64 @@
+"""バックグラウンドタスクの処理
+
+リクエストの処理中に task_queue.enqueue で登録し、ワーカーで実行する（services/task_queue.py）。
+同じタスクが複数回実行されても結果が変わらないようにすること。
+"""
+import os
+
+from PIL import Image, ImageOps
+from sqlalchemy import and_
+
+from database.connection import SessionLocal
+from models.message import Message
+from services.task_queue import task
+
+# 写真の長辺の上限・サムネイルの長辺（px）・サムネイルの保存先
+PHOTO_MAX_DIMENSION = int(os.getenv("PHOTO_MAX_DIMENSION", "2048"))
+PHOTO_THUMBNAIL_SIZE = int(os.getenv("PHOTO_THUMBNAIL_SIZE", "400"))
+PHOTO_THUMBNAIL_DIR = os.getenv("PHOTO_THUMBNAIL_DIR", "uploads/thumbnails")
+
+
+@task("messages.mark_read")
+def mark_messages_read(booking_id: int, receiver_id: int, up_to_id: int) -> int:
+    """予約の受信メッセージを up_to_id まで既読にする（取得時点で表示したメッセージのみ）"""
+    db = SessionLocal()
+    try:
+        updated = db.query(Message).filter(
+            and_(
+                Message.booking_id == booking_id,
+                Message.receiver_id == receiver_id,
+                Message.id <= up_to_id,
+                Message.is_read == False
+            )
+        ).update({"is_read": True}, synchronize_session=False)
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+
+def thumbnail_path(path: str) -> str:
+    return os.path.join(PHOTO_THUMBNAIL_DIR, os.path.basename(path))
+
+
+@task("media.process_photo", queue="media")
+def process_photo(path: str):
+    """アップロードされた写真の後処理（向きの補正・EXIFの除去・縮小・サムネイルの作成）"""
+    if not os.path.exists(path):
+        # 処理前に削除・置き換えられた場合
+        return
+    with Image.open(path) as original:
+        image_format = original.format
+        image = ImageOps.exif_transpose(original)
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    if max(image.size) > PHOTO_MAX_DIMENSION:
+        image.thumbnail((PHOTO_MAX_DIMENSION, PHOTO_MAX_DIMENSION))
+    # EXIF（位置情報等）を含めずに保存し直す
+    image.save(path, format=image_format)
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((PHOTO_THUMBNAIL_SIZE, PHOTO_THUMBNAIL_SIZE))
+    os.makedirs(PHOTO_THUMBNAIL_DIR, exist_ok=True)
+    thumbnail.save(thumbnail_path(path), format=image_format)
@@ -0,0 +1,15 @@
+from typing import List
+from sqlalchemy.orm import Session
+from models.booking import Booking
+from models.host import Host
+
+class BookingService:
+    @staticmethod
+    def get_bookings_for_user(db: Session, user_id: int) -> List[Booking]:
+        """ゲストとしての予約と、自分の宿主への予約の一覧"""
+        return db.query(Booking).filter(
+            (Booking.guest_id == user_id) |
+            (Booking.host_id.in_(
+                db.query(Host.id).filter(Host.user_id == user_id)
+            ))
+        ).all()
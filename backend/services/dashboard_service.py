@@ -0,0 +1,98 @@
+"""ダッシュボード
+
+予約一覧・会話一覧・おすすめ宿主の各セクションを、それぞれ別のセッション（接続）で
+スレッドに分けて並行に実行する。セクションごとに DASHBOARD_SECTION_TIMEOUT 秒で打ち切り、
+遅いセクションがあっても他のセクションは返す（打ち切られたスレッドは完了後に自身のセッションを閉じる）。
+"""
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from schemas.booking import BookingResponse
+from schemas.matching import MatchedHostResponse
+from schemas.user import UserSnapshot
+from services.booking_service import BookingService
+from services.matching_service import MatchingService
+from services.message_service import MessageService
+from utils.metrics import Counter
+from utils.responses import get_adapter
+
+logger = logging.getLogger(__name__)
+
+# セクションごとのタイムアウト（秒）・おすすめ宿主の件数
+DASHBOARD_SECTION_TIMEOUT = float(os.getenv("DASHBOARD_SECTION_TIMEOUT", "2"))
+DASHBOARD_MATCHED_HOSTS_LIMIT = int(os.getenv("DASHBOARD_MATCHED_HOSTS_LIMIT", "10"))
+
+dashboard_section_failures_total = Counter(
+    "dashboard_section_failures_total",
+    "Dashboard sections that timed out or failed",
+    ("section", "reason"),
+)
+
+
+def _bookings(db: Session, user: UserSnapshot):
+    return get_adapter(List[BookingResponse]).validate_python(
+        BookingService.get_bookings_for_user(db, user.id), from_attributes=True
+    )
+
+
+def _conversations(db: Session, user: UserSnapshot):
+    return MessageService.get_conversations(db, user.id)
+
+
+def _matched_hosts(db: Session, user: UserSnapshot):
+    return get_adapter(List[MatchedHostResponse]).validate_python(
+        MatchingService.get_matched_hosts(db, user.id, DASHBOARD_MATCHED_HOSTS_LIMIT), from_attributes=True
+    )
+
+
+# セクション名 -> (db, user) を受け取りシリアライズ可能な値を返す関数
+SECTIONS: Dict[str, Callable[[Session, UserSnapshot], object]] = {
+    "bookings": _bookings,
+    "conversations": _conversations,
+    "matched_hosts": _matched_hosts,
+}
+
+
+class DashboardService:
+    @staticmethod
+    def _run_section(section: Callable, session_factory: Callable[[], Session], user: UserSnapshot):
+        # セッションは実行するスレッド内で作成・破棄する（タイムアウト後も処理中のスレッドが使い続けるため）
+        db = session_factory()
+        try:
+            return section(db, user)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def build(
+        user: UserSnapshot,
+        session_factory: Callable[[], Session],
+        timeout: Optional[float] = None,
+        sections: Optional[Dict[str, Callable]] = None,
+    ) -> dict:
+        """全セクションを並行に実行して1つの結果にまとめる"""
+        timeout = DASHBOARD_SECTION_TIMEOUT if timeout is None else timeout
+        sections = SECTIONS if sections is None else sections
+        errors: Dict[str, str] = {}
+
+        async def run(name: str, section: Callable):
+            try:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(DashboardService._run_section, section, session_factory, user), timeout
+                )
+            except asyncio.TimeoutError:
+                dashboard_section_failures_total.inc((name, "timeout"))
+                errors[name] = f"timed out after {timeout}s"
+            except Exception:
+                logger.exception("Dashboard section %s failed", name)
+                dashboard_section_failures_total.inc((name, "error"))
+                errors[name] = "failed"
+            return None
+
+        names = list(sections)
+        results = await asyncio.gather(*(run(name, sections[name]) for name in names))
+        return {"user": user, **dict(zip(names, results)), "errors": errors}
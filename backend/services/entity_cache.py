@@ -0,0 +1,115 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Type
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from database.connection import Base
+from database.replicas import primary_reads
+from models.host import Host
+from models.user import User
+from schemas.host import HostSnapshot
+from schemas.user import UserSnapshot
+from utils.cache import TieredCache
+from utils.single_flight import cache_fill
+
+# エンティティキャッシュ設定
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "300"))
+ENTITY_CACHE_LOCAL_TTL = float(os.getenv("ENTITY_CACHE_LOCAL_TTL", "30"))
+ENTITY_CACHE_MAXSIZE = int(os.getenv("ENTITY_CACHE_MAXSIZE", "10000"))
+# ids= による一括取得で指定できるIDの上限
+BULK_LOOKUP_MAX_IDS = int(os.getenv("BULK_LOOKUP_MAX_IDS", "200"))
+
+
+def parse_ids(raw: str, max_ids: int = BULK_LOOKUP_MAX_IDS) -> List[int]:
+    """カンマ区切りのIDを検証して返す（重複は除き、指定順を保つ）"""
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    ids = list(dict.fromkeys(ids))
+    if not ids or len(ids) > max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids must contain between 1 and {max_ids} ids"
+        )
+    return ids
+
+
+class EntityCache:
+    """主キー指定の読み取りスルーキャッシュ
+
+    行はスナップショットスキーマに変換して保持する。
+    Redisにはフィールド名を省いた値の配列（JSON）として保存する。
+    """
+
+    def __init__(self, name: str, model: Type[Base], schema: Type[BaseModel]):
+        self.name = name
+        self.model = model
+        self.schema = schema
+        self.fields = list(schema.model_fields)
+        self.cache = TieredCache(
+            f"entity:{name}",
+            maxsize=ENTITY_CACHE_MAXSIZE,
+            ttl=ENTITY_CACHE_TTL,
+            local_ttl=ENTITY_CACHE_LOCAL_TTL,
+            dumps=self._dumps,
+            loads=self._loads,
+        )
+
+    def _dumps(self, snapshot: BaseModel) -> str:
+        data = snapshot.model_dump(mode="json")
+        return json.dumps([data[field] for field in self.fields], separators=(",", ":"), ensure_ascii=False)
+
+    def _loads(self, raw) -> BaseModel:
+        return self.schema.model_validate(dict(zip(self.fields, json.loads(raw))))
+
+    def get(self, db: Session, entity_id) -> Optional[BaseModel]:
+        """スナップショットを取得（キャッシュにない場合のみDBを参照）"""
+        key = str(entity_id)
+        snapshot = self.cache.get(key)
+        if snapshot is not None:
+            return snapshot
+        return cache_fill(self.cache, key, lambda: self._load(db, entity_id), self.name)
+
+    def peek(self, entity_id) -> Optional[BaseModel]:
+        """キャッシュのみを参照（DBは参照しない）"""
+        return self.cache.get(str(entity_id))
+
+    def _load(self, db: Session, entity_id) -> Optional[BaseModel]:
+        # キャッシュにはプライマリの値のみを入れる（遅延したレプリカの古い値を保持し続けないため）
+        with primary_reads(db):
+            row = db.query(self.model).filter(self.model.id == entity_id).first()
+        if row is None:
+            return None
+
+        snapshot = self.schema.model_validate(row)
+        self.cache.set(str(entity_id), snapshot)
+        return snapshot
+
+    def get_many(self, db: Session, entity_ids: Iterable[int]) -> Dict[int, BaseModel]:
+        """複数のスナップショットを取得（キャッシュにないものは IN クエリ1回で取得。存在するIDのみ返す）"""
+        ids = list(dict.fromkeys(entity_ids))
+        cached = self.cache.get_many([str(entity_id) for entity_id in ids])
+        snapshots = {entity_id: cached[str(entity_id)] for entity_id in ids if str(entity_id) in cached}
+        missing = [entity_id for entity_id in ids if entity_id not in snapshots]
+        if not missing:
+            return snapshots
+
+        with primary_reads(db):
+            rows = db.query(self.model).filter(self.model.id.in_(missing)).all()
+        loaded = {row.id: self.schema.model_validate(row) for row in rows}
+        self.cache.set_many({str(entity_id): snapshot for entity_id, snapshot in loaded.items()})
+        snapshots.update(loaded)
+        return snapshots
+
+    def invalidate(self, entity_id):
+        """書き込み時にスナップショットを破棄"""
+        self.cache.delete(str(entity_id))
+
+
+host_cache = EntityCache("host", Host, HostSnapshot)
+user_cache = EntityCache("user", User, UserSnapshot)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+import psutil
+import redis
+from sqlalchemy import text
+
+from database.connection import engine
+from database.replicas import replica_set
+
+# ヘルスチェック設定
+HEALTH_REFRESH_INTERVAL = float(os.getenv("HEALTH_REFRESH_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+# 結果がこの秒数より古い場合は stale とみなす（リフレッシュが止まっている）
+HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", str(HEALTH_REFRESH_INTERVAL * 3)))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+_redis_client = None
+
+
+def _get_redis_client():
+    """ヘルスチェック用のRedisクライアント（コネクションプールを使い回す）"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=HEALTH_CHECK_TIMEOUT,
+            socket_connect_timeout=HEALTH_CHECK_TIMEOUT,
+        )
+    return _redis_client
+
+
+def check_database() -> str:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        # 必要なテーブルの存在確認
+        connection.execute(text("SELECT 1 FROM users LIMIT 1"))
+    return "healthy"
+
+
+def check_redis() -> str:
+    _get_redis_client().ping()
+    return "healthy"
+
+
+def check_disk() -> str:
+    total, used, free = shutil.disk_usage("/")
+    disk_usage_percent = (used / total) * 100
+    if disk_usage_percent > 90:
+        return f"warning: {disk_usage_percent:.1f}% used"
+    return f"healthy: {disk_usage_percent:.1f}% used"
+
+
+def check_memory() -> str:
+    memory_usage_percent = psutil.virtual_memory().percent
+    if memory_usage_percent > 90:
+        return f"warning: {memory_usage_percent:.1f}% used"
+    return f"healthy: {memory_usage_percent:.1f}% used"
+
+
+class HealthMonitor:
+    """ヘルスチェックをバックグラウンドで定期実行し、最新の結果を保持する
+
+    各チェックはスレッドで並行に実行し、チェックごとにタイムアウトを設ける。
+    critical のチェックが失敗した場合は unhealthy、それ以外は "unknown: ..." として記録する。
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], str]],
+        critical: Iterable[str] = (),
+        interval: float = HEALTH_REFRESH_INTERVAL,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+        stale_after: float = HEALTH_STALE_SECONDS,
+    ):
+        self.checks = checks
+        self.critical = set(critical)
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._snapshot: Optional[dict] = None
+        self._refreshed_at = 0.0
+
+    async def _run_check(self, name: str, check: Callable[[], str]) -> str:
+        prefix = "unhealthy" if name in self.critical else "unknown"
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(check), self.timeout)
+        except asyncio.TimeoutError:
+            return f"{prefix}: timed out after {self.timeout}s"
+        except Exception as e:
+            return f"{prefix}: {str(e)}"
+
+    async def refresh(self) -> dict:
+        """全チェックを並行に実行して結果を更新"""
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._run_check(name, self.checks[name]) for name in names))
+        services = dict(zip(names, results))
+        healthy = all(not services[name].startswith("unhealthy") for name in self.critical)
+        self._snapshot = {
+            "status": "healthy" if healthy else "unhealthy",
+            "timestamp": datetime.utcnow().isoformat(),
+            "version": "1.0.0",
+            "services": services,
+        }
+        self._refreshed_at = time.monotonic()
+        return self._snapshot
+
+    async def run(self):
+        """interval ごとにチェックを実行（lifespanでタスクとして起動）"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+    def snapshot(self) -> Optional[dict]:
+        """最新の結果（未実行の場合はNone）と経過秒数・stale判定"""
+        if self._snapshot is None:
+            return None
+        age = time.monotonic() - self._refreshed_at
+        return {
+            **self._snapshot,
+            "age_seconds": round(age, 3),
+            "stale": age > self.stale_after,
+        }
+
+
+health_monitor = HealthMonitor(
+    checks={
+        "database": check_database,
+        "redis": check_redis,
+        "disk": check_disk,
+        "memory": check_memory,
+    },
+    critical=("database", "redis"),
+)
+
+# レプリカの状態確認（失敗したレプリカは読み取りの対象から除外される）
+if replica_set.replicas:
+    health_monitor.checks["database_replicas"] = replica_set.check
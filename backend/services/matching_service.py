@@ -2,6 +2,20 @@ from typing import List, Dict
 from sqlalchemy.orm import Session
 from models.host import Host
 from models.user import User
+from utils.tracing import traced
+
+class MatchedHost:
+    """マッチング結果（宿主の属性は host をそのまま参照する）"""
+    __slots__ = ("host", "host_user", "match_rate", "match_reason")
+
+    def __init__(self, host: Host, host_user: User, match_rate: float, match_reason: str):
+        self.host = host
+        self.host_user = host_user
+        self.match_rate = match_rate
+        self.match_reason = match_reason
+
+    def __getattr__(self, name):
+        return getattr(self.host, name)
 
 class MatchingService:
     @staticmethod
@@ -30,27 +44,24 @@ class MatchingService:
         return min((interest_score + location_score + rating_score) * 100, 100)
     
     @staticmethod
-    def get_matched_hosts(db: Session, user_id: int, limit: int = 20) -> List[Dict]:
+    @traced()
+    def get_matched_hosts(db: Session, user_id: int, limit: int = 20) -> List[MatchedHost]:
         """ユーザーにマッチした宿主一覧を取得"""
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             return []
         
-        hosts = db.query(Host).filter(Host.is_active == True).all()
+        # 宿主とそのユーザー情報を1クエリで取得
+        rows = db.query(Host, User).join(User, User.id == Host.user_id).filter(Host.is_active == True).all()
         matched_hosts = []
         
-        for host in hosts:
-            # 宿主のユーザー情報を取得
-            host_user = db.query(User).filter(User.id == host.user_id).first()
-            if not host_user:
-                continue
-            
+        for host, host_user in rows:
             match_rate = MatchingService.calculate_match_rate(
                 guest_interests=user.interests or [],
                 host_interests=host_user.interests or [],
                 location_preference=user.location or "",
                 host_location=host.location,
-                host_rating=host_user.rating
+                host_rating=host_user.rating or 0.0
             )
             
             # マッチング理由を生成
@@ -61,15 +72,15 @@ class MatchingService:
                 host.location
             )
             
-            matched_hosts.append({
-                "host": host,
-                "host_user": host_user,
-                "match_rate": round(match_rate, 1),
-                "match_reason": match_reason
-            })
+            matched_hosts.append(MatchedHost(
+                host=host,
+                host_user=host_user,
+                match_rate=round(match_rate, 1),
+                match_reason=match_reason
+            ))
         
         # マッチング率でソート
-        matched_hosts.sort(key=lambda x: x["match_rate"], reverse=True)
+        matched_hosts.sort(key=lambda x: x.match_rate, reverse=True)
         return matched_hosts[:limit]
     
     @staticmethod
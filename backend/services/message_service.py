@@ -0,0 +1,79 @@
+from typing import List
+from sqlalchemy import and_, desc, func, or_
+from sqlalchemy.orm import Session
+from models.booking import Booking
+from models.host import Host
+from models.message import Message
+from models.user import User
+from schemas.message import ConversationResponse
+
+class MessageService:
+    @staticmethod
+    def get_conversations(db: Session, user_id: int) -> List[ConversationResponse]:
+        """会話一覧（予約件数に関わらずクエリ数は一定）"""
+        # ユーザーが関わっている予約と宿主のユーザーIDを取得
+        rows = db.query(Booking.id, Booking.guest_id, Host.user_id).join(
+            Host, Host.id == Booking.host_id
+        ).filter(
+            or_(
+                Booking.guest_id == user_id,
+                Host.user_id == user_id
+            )
+        ).all()
+        if not rows:
+            return []
+
+        # 相手のユーザーID（ゲストの場合は宿主、宿主の場合はゲスト）
+        other_user_ids = {
+            booking_id: host_user_id if guest_id == user_id else guest_id
+            for booking_id, guest_id, host_user_id in rows
+        }
+        booking_ids = list(other_user_ids)
+
+        user_names = dict(
+            db.query(User.id, User.name).filter(User.id.in_(set(other_user_ids.values()))).all()
+        )
+
+        # 予約ごとの最新メッセージ
+        ranked = db.query(
+            Message.booking_id,
+            Message.content,
+            Message.created_at,
+            func.row_number().over(
+                partition_by=Message.booking_id,
+                order_by=(desc(Message.created_at), desc(Message.id))
+            ).label("rank")
+        ).filter(Message.booking_id.in_(booking_ids)).subquery()
+        last_messages = {
+            row.booking_id: row
+            for row in db.query(ranked).filter(ranked.c.rank == 1).all()
+        }
+
+        # 予約ごとの未読メッセージ数
+        unread_counts = dict(
+            db.query(Message.booking_id, func.count(Message.id)).filter(
+                and_(
+                    Message.booking_id.in_(booking_ids),
+                    Message.receiver_id == user_id,
+                    Message.is_read == False
+                )
+            ).group_by(Message.booking_id).all()
+        )
+
+        conversations = []
+        for booking_id, other_user_id in other_user_ids.items():
+            other_user_name = user_names.get(other_user_id)
+            if other_user_name is None:
+                continue
+
+            last_message = last_messages.get(booking_id)
+            conversations.append(ConversationResponse(
+                booking_id=booking_id,
+                other_user_id=other_user_id,
+                other_user_name=other_user_name,
+                last_message=last_message.content if last_message else None,
+                last_message_time=last_message.created_at if last_message else None,
+                unread_count=unread_counts.get(booking_id, 0)
+            ))
+
+        return conversations
@@ -0,0 +1,131 @@
+"""WebSocket の接続管理と通知のプッシュ
+
+/api/notifications/ws に接続したクライアントをユーザーごとに保持し、ディスパッチャー（別スレッド）から
+各接続のイベントループに送信を依頼する。接続はワーカープロセスごとに持つため、複数ワーカーで
+運用する場合は NOTIFICATION_PUBSUB=true にすると Redis の Pub/Sub 経由で全ワーカーに配る。
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import redis
+import redis.asyncio
+from fastapi import WebSocket
+
+from utils.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Redis の Pub/Sub でワーカー間に配るか・接続先・チャンネル名
+NOTIFICATION_PUBSUB = os.getenv("NOTIFICATION_PUBSUB", "false").lower() == "true"
+NOTIFICATION_PUBSUB_URL = os.getenv("NOTIFICATION_PUBSUB_URL", os.getenv("REDIS_URL", "redis://localhost:6379"))
+NOTIFICATION_PUBSUB_CHANNEL = os.getenv("NOTIFICATION_PUBSUB_CHANNEL", "notifications")
+# Pub/Sub の購読が切れた場合の再接続までの秒数
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+notification_websocket_connections = Gauge(
+    "notification_websocket_connections",
+    "Open notification WebSocket connections",
+)
+notification_websocket_messages_total = Counter(
+    "notification_websocket_messages_total",
+    "Notification messages sent over WebSocket by result (sent / failed)",
+    ("result",),
+)
+
+
+class NotificationHub:
+    """ユーザーごとの WebSocket 接続（送信はスレッドセーフ）"""
+
+    def __init__(
+        self,
+        pubsub: bool = NOTIFICATION_PUBSUB,
+        url: str = NOTIFICATION_PUBSUB_URL,
+        channel: str = NOTIFICATION_PUBSUB_CHANNEL,
+    ):
+        self.pubsub = pubsub
+        self.url = url
+        self.channel = channel
+        self._connections: Dict[int, List[Tuple[WebSocket, asyncio.AbstractEventLoop]]] = {}
+        self._lock = threading.Lock()
+        self._client: Optional[redis.Redis] = None
+
+    async def connect(self, user_id: int, websocket: WebSocket):
+        await websocket.accept()
+        with self._lock:
+            self._connections.setdefault(user_id, []).append((websocket, asyncio.get_running_loop()))
+        notification_websocket_connections.inc()
+
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        with self._lock:
+            connections = self._connections.get(user_id, [])
+            remaining = [entry for entry in connections if entry[0] is not websocket]
+            if len(remaining) == len(connections):
+                return
+            if remaining:
+                self._connections[user_id] = remaining
+            else:
+                del self._connections[user_id]
+        notification_websocket_connections.dec()
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._connections.get(user_id, []))
+            return sum(len(connections) for connections in self._connections.values())
+
+    def publish(self, user_id: int, message: dict):
+        """ユーザーの全接続に送信（Pub/Sub の場合は全ワーカーに配る。Redis の障害は例外になる）"""
+        if not self.pubsub:
+            self.deliver_local(user_id, message)
+            return
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(self.channel, json.dumps({"user_id": user_id, "message": message}))
+
+    def deliver_local(self, user_id: int, message: dict) -> int:
+        """このワーカーの接続に送信を依頼し、依頼した接続数を返す（送信の完了は待たない）"""
+        with self._lock:
+            targets = list(self._connections.get(user_id, []))
+        for websocket, loop in targets:
+            if loop.is_closed():
+                self.disconnect(user_id, websocket)
+                continue
+            asyncio.run_coroutine_threadsafe(self._send(user_id, websocket, message), loop)
+        return len(targets)
+
+    async def _send(self, user_id: int, websocket: WebSocket, message: dict):
+        try:
+            await websocket.send_json(message)
+            notification_websocket_messages_total.inc(("sent",))
+        except Exception:
+            # 切断済みの接続（受信ループ側でも disconnect される）
+            notification_websocket_messages_total.inc(("failed",))
+            self.disconnect(user_id, websocket)
+
+    async def listen(self):
+        """Pub/Sub を購読し、このワーカーの接続に配る（lifespanでタスクとして起動）"""
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    if item["type"] != "message":
+                        continue
+                    data = json.loads(item["data"])
+                    self.deliver_local(data["user_id"], data["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Notification subscription lost; resubscribing", exc_info=True)
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+notification_hub = NotificationHub()
@@ -0,0 +1,319 @@
+"""予約イベントの通知（アウトボックスのディスパッチャー）
+
+outbox_events の配信待ちのイベントを OUTBOX_BATCH_SIZE 件ずつ取り出し、アプリ内通知（notifications）を作成して
+コミットしてから、外部のチャネル（NOTIFICATION_CHANNELS。email: メール送信の代わりにログへ出力 /
+websocket: 接続中のクライアントへプッシュ）に送る。外部チャネルの失敗でアプリ内通知が遅れることはない。
+
+- 送信できていないチャネルはイベントの pending_channels に残し、再試行ではそのチャネルにのみ送る
+- 配信は at-least-once: 外部チャネルへの送信後に停止・失敗した場合は再送するため、受け取る側は event_id で重複を除くこと
+- チャネルごとにバッチで送り、失敗した場合はイベントごとに送り直す。失敗したイベントのみ指数バックオフで再試行し、
+  OUTBOX_MAX_ATTEMPTS 回失敗したイベントは failed にする（アプリ内通知は作成済み）
+- 予約の変更をコミットしたリクエストは notify() でディスパッチャーを起こすため、通常はポーリング間隔を待たずに配信される
+
+アプリ内のディスパッチャーは lifespan で起動する（OUTBOX_DISPATCHER=false で無効）。別プロセスで実行する場合は
+WebSocket の接続を持つワーカーに届くよう NOTIFICATION_PUBSUB=true にする（backend ディレクトリで実行）:
+    python -m services.notification_service
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from database.connection import SessionLocal
+from models.notification import Notification
+from models.outbox import OutboxEvent
+from models.user import User
+from services.notification_hub import notification_hub
+from services.outbox_service import BOOKING_CANCELLED, BOOKING_CREATED, BOOKING_STATUS_CHANGED, OutboxService
+from utils.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+email_logger = logging.getLogger("notifications.email")
+
+# アプリ内でディスパッチャーを起動するか・配信待ちの確認間隔（秒）・1回に処理するイベント数
+OUTBOX_DISPATCHER = os.getenv("OUTBOX_DISPATCHER", "true").lower() == "true"
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+# 配信を試みる回数・再試行の間隔の初期値と上限（秒）
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "1"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "300"))
+# 外部チャネルへの送信中に他のディスパッチャーがイベントを取り出さない秒数
+OUTBOX_CLAIM_SECONDS = float(os.getenv("OUTBOX_CLAIM_SECONDS", "300"))
+# 配信済みのイベントを残す日数・削除を行う間隔（秒）
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+OUTBOX_PURGE_INTERVAL = float(os.getenv("OUTBOX_PURGE_INTERVAL", "3600"))
+# 外部の通知チャネル（アプリ内通知は常に作成する）
+NOTIFICATION_CHANNELS = os.getenv("NOTIFICATION_CHANNELS", "email,websocket")
+
+outbox_events_processed_total = Counter(
+    "outbox_events_processed_total",
+    "Outbox events by dispatch result (dispatched / retried / failed)",
+    ("event_type", "result"),
+)
+outbox_dispatch_lag_seconds = Histogram(
+    "outbox_dispatch_lag_seconds",
+    "Time from the booking change to the notification dispatch",
+)
+notification_channel_failures_total = Counter(
+    "notification_channel_failures_total",
+    "Failed deliveries to a notification channel",
+    ("channel",),
+)
+
+# 通知の件名
+SUBJECTS = {
+    BOOKING_CREATED: "新しい予約リクエストが届きました",
+    BOOKING_STATUS_CHANGED: "予約のステータスが更新されました",
+    BOOKING_CANCELLED: "予約がキャンセルされました",
+}
+
+
+def notification_message(event: OutboxEvent) -> dict:
+    """WebSocket で送る内容（クライアントは event_id で重複を除く）"""
+    return {
+        "type": "notification",
+        "event_id": event.id,
+        "event_type": event.event_type,
+        "subject": SUBJECTS.get(event.event_type, event.event_type),
+        "booking_id": event.aggregate_id,
+        "payload": event.payload,
+    }
+
+
+class EmailChannel:
+    """メール送信の代わりに notifications.email のログへ出力する"""
+
+    name = "email"
+
+    def deliver(self, db: Session, events: List[OutboxEvent]):
+        user_ids = {user_id for event in events for user_id in event.recipients}
+        emails = dict(db.query(User.id, User.email).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+        for event in events:
+            for user_id in event.recipients:
+                if user_id not in emails:
+                    continue
+                email_logger.info(
+                    "Email notification",
+                    extra={
+                        "event_id": event.id,
+                        "to": emails[user_id],
+                        "subject": SUBJECTS.get(event.event_type, event.event_type),
+                        "booking_id": event.aggregate_id,
+                    },
+                )
+
+
+class WebSocketChannel:
+    """接続中のクライアントへプッシュ（未接続のユーザーはアプリ内通知で確認する）"""
+
+    name = "websocket"
+
+    def deliver(self, db: Session, events: List[OutboxEvent]):
+        for event in events:
+            message = notification_message(event)
+            for user_id in event.recipients:
+                notification_hub.publish(user_id, message)
+
+
+CHANNELS = {channel.name: channel for channel in (EmailChannel, WebSocketChannel)}
+
+
+def create_channels(spec: str = NOTIFICATION_CHANNELS) -> list:
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CHANNELS]
+    if unknown:
+        raise ValueError(f"Unknown NOTIFICATION_CHANNELS: {', '.join(unknown)}")
+    return [CHANNELS[name]() for name in names]
+
+
+class OutboxDispatcher:
+    """アウトボックスのイベントを通知チャネルに配信する"""
+
+    def __init__(
+        self,
+        channels: Optional[list] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ):
+        self.channels = create_channels() if channels is None else channels
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    def notify(self):
+        """新しいイベントのコミット後に呼び、待機中のディスパッチャーを起こす（イベントループ上で使用）"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def dispatch_batch(self) -> int:
+        """配信待ちのイベントを1バッチ処理し、処理した件数を返す"""
+        db = self.session_factory()
+        try:
+            events = OutboxService.claim_batch(db, self.batch_size)
+            if not events:
+                db.rollback()
+                return 0
+            # アプリ内通知を先にコミットする（送信中は他のディスパッチャーが取り出さないよう available_at を延ばす）
+            now = datetime.now(timezone.utc)
+            self._store_notifications(db, [event for event in events if event.pending_channels is None])
+            for event in events:
+                if event.pending_channels is None:
+                    event.pending_channels = [channel.name for channel in self.channels]
+                event.available_at = now + timedelta(seconds=OUTBOX_CLAIM_SECONDS)
+            ids = [event.id for event in events]
+            db.commit()
+
+            events = db.query(OutboxEvent).filter(OutboxEvent.id.in_(ids)).order_by(OutboxEvent.id).all()
+            failures = self._send(db, events)
+            now = datetime.now(timezone.utc)
+            results = []
+            for event in events:
+                if event.id in failures:
+                    self._retry_later(event, failures[event.id], now)
+                    results.append((event.event_type, "failed" if event.status == "failed" else "retried", None))
+                else:
+                    event.status = "dispatched"
+                    event.dispatched_at = now
+                    event.attempts += 1
+                    results.append((event.event_type, "dispatched", event.created_at))
+            db.commit()
+        finally:
+            db.close()
+
+        for event_type, result, created_at in results:
+            outbox_events_processed_total.inc((event_type, result))
+            if created_at is not None:
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                outbox_dispatch_lag_seconds.observe(max(0.0, (now - created_at).total_seconds()))
+        return len(results)
+
+    def _send(self, db: Session, events: List[OutboxEvent]) -> Dict[int, Exception]:
+        """未送信のチャネルに送信して pending_channels から除き、送信できなかったイベントを返す"""
+        failures = {}
+        for channel in self.channels:
+            targets = [event for event in events if channel.name in (event.pending_channels or ())]
+            if not targets:
+                continue
+            errors = self._deliver(db, channel, targets)
+            for event in targets:
+                if event.id in errors:
+                    failures[event.id] = errors[event.id]
+                else:
+                    event.pending_channels = [name for name in event.pending_channels if name != channel.name]
+        return failures
+
+    @staticmethod
+    def _deliver(db: Session, channel, events: List[OutboxEvent]) -> Dict[int, Exception]:
+        """1つのチャネルに送信し、失敗したイベントを返す（バッチで失敗した場合はイベントごとに送り直す）"""
+        try:
+            channel.deliver(db, events)
+            return {}
+        except Exception as e:
+            notification_channel_failures_total.inc((channel.name,))
+            if len(events) == 1:
+                return {events[0].id: e}
+            logger.warning("Notification batch to %s failed; retrying events individually", channel.name, exc_info=True)
+
+        errors = {}
+        for event in events:
+            try:
+                channel.deliver(db, [event])
+            except Exception as e:
+                notification_channel_failures_total.inc((channel.name,))
+                errors[event.id] = e
+        return errors
+
+    @staticmethod
+    def _store_notifications(db: Session, events: List[OutboxEvent]):
+        """アプリ内通知を作成（作成済みのものは除く）"""
+        if not events:
+            return
+        existing = set(
+            db.query(Notification.event_id, Notification.user_id)
+            .filter(Notification.event_id.in_([event.id for event in events]))
+            .all()
+        )
+        db.add_all([
+            Notification(
+                user_id=user_id,
+                event_id=event.id,
+                type=event.event_type,
+                booking_id=event.aggregate_id,
+                payload=event.payload,
+                is_read=False,
+            )
+            for event in events
+            for user_id in event.recipients
+            if (event.id, user_id) not in existing
+        ])
+
+    def _retry_later(self, event: OutboxEvent, error: Exception, now: datetime):
+        event.attempts += 1
+        event.last_error = f"{type(error).__name__}: {error}"[:1000]
+        if event.attempts >= self.max_attempts:
+            event.status = "failed"
+            logger.error("Outbox event %s failed after %d attempts: %s", event.id, event.attempts, event.last_error)
+            return
+        delay = min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** (event.attempts - 1))
+        event.available_at = now + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def purge(self, retention_days: float = OUTBOX_RETENTION_DAYS) -> int:
+        db = self.session_factory()
+        try:
+            return OutboxService.purge_dispatched(db, retention_days)
+        finally:
+            db.close()
+
+    async def run(self, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        """配信待ちのイベントを処理し続ける（lifespanでタスクとして起動）"""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    processed = await asyncio.to_thread(self.dispatch_batch)
+                except Exception:
+                    logger.exception("Outbox dispatch failed")
+                    processed = 0
+                if processed >= self.batch_size:
+                    # まだ残っている可能性があるため待たずに続ける
+                    continue
+                if time.monotonic() - self._last_purge >= OUTBOX_PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    try:
+                        await asyncio.to_thread(self.purge)
+                    except Exception:
+                        logger.exception("Outbox purge failed")
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+
+    async def run_until_idle(self) -> int:
+        """配信待ちのイベントがなくなるまで処理し、処理した件数を返す（テスト・保守用）"""
+        total = 0
+        while True:
+            processed = await asyncio.to_thread(self.dispatch_batch)
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(outbox_dispatcher.run())
@@ -0,0 +1,79 @@
+"""予約イベントのアウトボックス
+
+予約の作成・ステータス変更・キャンセル時に、予約の変更と同じトランザクションで outbox_events に
+イベントを書き込む（コミットに失敗すればイベントも残らず、コミットされた変更のイベントは必ず残る）。
+通知の配信はリクエストの外で services/notification_service.py のディスパッチャーが行う。
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models.booking import Booking
+from models.outbox import OutboxEvent
+
+BOOKING_CREATED = "booking.created"
+BOOKING_STATUS_CHANGED = "booking.status_changed"
+BOOKING_CANCELLED = "booking.cancelled"
+
+
+class OutboxService:
+    @staticmethod
+    def record_booking_event(
+        db: Session,
+        event_type: str,
+        booking: Booking,
+        host_user_id: Optional[int],
+        actor_id: int,
+        previous_status: Optional[str] = None,
+    ) -> OutboxEvent:
+        """予約のイベントをセッションに追加（コミットは呼び出し側。通知先は操作した本人以外の当事者）
+
+        新規の予約は事前に flush して id を確定しておくこと。
+        """
+        recipients = sorted({booking.guest_id, host_user_id} - {actor_id, None})
+        event = OutboxEvent(
+            event_type=event_type,
+            aggregate_id=booking.id,
+            payload={
+                "booking_id": booking.id,
+                "host_id": booking.host_id,
+                "guest_id": booking.guest_id,
+                "host_user_id": host_user_id,
+                "actor_id": actor_id,
+                "status": booking.status,
+                "previous_status": previous_status,
+                "check_in": booking.check_in.isoformat(),
+                "check_out": booking.check_out.isoformat(),
+                "guests_count": booking.guests_count,
+                "total_price": booking.total_price,
+            },
+            recipients=recipients,
+            status="pending",
+            attempts=0,
+        )
+        db.add(event)
+        return event
+
+    @staticmethod
+    def claim_batch(db: Session, limit: int) -> List[OutboxEvent]:
+        """配信可能なイベントを古い順に取得（PostgreSQL では他のディスパッチャーが処理中の行を飛ばす）"""
+        return (
+            db.query(OutboxEvent)
+            .filter(OutboxEvent.status == "pending", OutboxEvent.available_at <= datetime.now(timezone.utc))
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    @staticmethod
+    def purge_dispatched(db: Session, retention_days: float) -> int:
+        """配信済みで retention_days 日を過ぎたイベントを削除（配信に失敗したイベントは調査用に残す）"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        deleted = db.query(OutboxEvent).filter(
+            OutboxEvent.status == "dispatched",
+            OutboxEvent.dispatched_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,451 @@
+"""バックグラウンドタスク
+
+レスポンスを待たせる必要のない処理（既読化・写真の後処理など）をキューに入れ、ワーカーで実行する。
+TASK_QUEUE_BACKEND=memory（開発用）はプロセス内のキュー、redis（本番用）は Redis のリストに
+保存するため、ワーカーの再起動後も残る。
+
+- タスクは @task で登録し、task_queue.enqueue(関数, 引数...) でキューに入れる（引数はJSONにできる値のみ）
+- 失敗したタスクは指数バックオフで再実行し、TASK_MAX_RETRIES 回を超えたら dead に移す
+- idempotency_key を指定すると、同じキーのタスクは TASK_IDEMPOTENCY_TTL 秒の間1回のみキューに入る
+  （キューに入れるのに失敗した場合はキーを削除する）
+- リクエストの処理中は task_queue.enqueue_or_run を使う（Redis の障害時はその場で実行し、エラーにしない）
+- キューごとの同時実行数は TASK_QUEUE_CONCURRENCY で指定する
+- Redis では取り出したタスクを TASK_VISIBILITY_TIMEOUT 秒以内に完了しないと再度キューに戻す
+  （ワーカーが停止しても失われない代わりに、同じタスクが複数回実行されることがあるため、処理は冪等にすること）
+
+アプリ内のワーカーは lifespan で起動する（TASK_WORKERS=false で無効）。別プロセスで実行する場合（backend ディレクトリで実行）:
+    python -m services.task_queue
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+
+import redis
+
+from utils.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# バックエンド（memory / redis）と Redis の接続先
+TASK_QUEUE_BACKEND = os.getenv("TASK_QUEUE_BACKEND", "memory")
+TASK_QUEUE_REDIS_URL = os.getenv("TASK_QUEUE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379"))
+# アプリ内でワーカーを起動するか・キューごとの同時実行数（未指定のキューは1）
+TASK_WORKERS = os.getenv("TASK_WORKERS", "true").lower() == "true"
+TASK_QUEUE_CONCURRENCY = os.getenv("TASK_QUEUE_CONCURRENCY", "default=4,media=2")
+# 再実行の回数・バックオフの初期値と上限（秒）
+TASK_MAX_RETRIES = int(os.getenv("TASK_MAX_RETRIES", "5"))
+TASK_RETRY_BASE_SECONDS = float(os.getenv("TASK_RETRY_BASE_SECONDS", "1"))
+TASK_RETRY_MAX_SECONDS = float(os.getenv("TASK_RETRY_MAX_SECONDS", "300"))
+# 冪等キーの保持秒数・Redis で実行中とみなす秒数・空のキューの確認間隔（秒）
+TASK_IDEMPOTENCY_TTL = int(os.getenv("TASK_IDEMPOTENCY_TTL", "86400"))
+TASK_VISIBILITY_TIMEOUT = float(os.getenv("TASK_VISIBILITY_TIMEOUT", "300"))
+TASK_POLL_INTERVAL = float(os.getenv("TASK_POLL_INTERVAL", "0.5"))
+# 保持する dead のタスク数（キューごと）
+TASK_DEAD_LETTER_LIMIT = 1000
+
+tasks_enqueued_total = Counter("tasks_enqueued_total", "Background tasks enqueued", ("task",))
+tasks_deduplicated_total = Counter(
+    "tasks_deduplicated_total", "Background tasks skipped because of an existing idempotency key", ("task",)
+)
+tasks_completed_total = Counter(
+    "tasks_completed_total", "Background task attempts by result (succeeded / retried / dead)", ("task", "result")
+)
+task_duration_seconds = Histogram("task_duration_seconds", "Background task execution time", ("task",))
+
+
+class TaskDefinition:
+    __slots__ = ("name", "fn", "queue", "max_retries")
+
+    def __init__(self, name: str, fn: Callable, queue: str, max_retries: int):
+        self.name = name
+        self.fn = fn
+        self.queue = queue
+        self.max_retries = max_retries
+
+
+_registry: Dict[str, TaskDefinition] = {}
+
+
+def task(name: str, queue: str = "default", max_retries: Optional[int] = None):
+    """バックグラウンドタスクとして登録するデコレーター（関数はそのまま呼び出すこともできる）"""
+
+    def decorator(fn: Callable) -> Callable:
+        _registry[name] = TaskDefinition(name, fn, queue, TASK_MAX_RETRIES if max_retries is None else max_retries)
+        fn.task_name = name
+        return fn
+
+    return decorator
+
+
+def retry_delay(attempts: int) -> float:
+    """再実行までの秒数（指数バックオフ。同時に失敗したタスクが揃って再実行されないよう揺らぎを入れる）"""
+    delay = min(TASK_RETRY_MAX_SECONDS, TASK_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _parse_concurrency(spec: str) -> Dict[str, int]:
+    values = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.rsplit("=", 1)
+            values[name.strip()] = int(value)
+    return values
+
+
+class MemoryBackend:
+    """プロセス内のキュー（開発用。プロセスの停止でキュー内のタスクは失われる）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready: Dict[str, Deque[str]] = {}
+        self._delayed: List[Tuple[float, int, str, str]] = []
+        self._dead: Dict[str, Deque[str]] = {}
+        self._processing: Dict[str, int] = {}
+        self._idempotency: Dict[str, float] = {}
+        self._counter = itertools.count()
+
+    def push(self, queue: str, raw: str, delay: float = 0.0):
+        with self._lock:
+            if delay > 0:
+                heapq.heappush(self._delayed, (time.time() + delay, next(self._counter), queue, raw))
+            else:
+                self._ready.setdefault(queue, deque()).append(raw)
+
+    def claim(self, queue: str) -> Optional[str]:
+        with self._lock:
+            now = time.time()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, due_queue, raw = heapq.heappop(self._delayed)
+                self._ready.setdefault(due_queue, deque()).append(raw)
+            ready = self._ready.get(queue)
+            if not ready:
+                return None
+            self._processing[queue] = self._processing.get(queue, 0) + 1
+            return ready.popleft()
+
+    def ack(self, queue: str, raw: str):
+        with self._lock:
+            self._processing[queue] -= 1
+
+    def retry(self, queue: str, raw: str, new_raw: str, delay: float):
+        self.ack(queue, raw)
+        self.push(queue, new_raw, delay)
+
+    def dead(self, queue: str, raw: str, new_raw: str):
+        self.ack(queue, raw)
+        with self._lock:
+            self._dead.setdefault(queue, deque(maxlen=TASK_DEAD_LETTER_LIMIT)).append(new_raw)
+
+    def reserve(self, key: str, ttl: int) -> bool:
+        with self._lock:
+            now = time.time()
+            if self._idempotency.get(key, 0) > now:
+                return False
+            self._idempotency[key] = now + ttl
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._idempotency.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            queues = set(self._ready) | set(self._dead) | set(self._processing) | {item[2] for item in self._delayed}
+            return {
+                queue: {
+                    "ready": len(self._ready.get(queue, ())),
+                    "delayed": sum(1 for item in self._delayed if item[2] == queue),
+                    "processing": self._processing.get(queue, 0),
+                    "dead": len(self._dead.get(queue, ())),
+                }
+                for queue in sorted(queues)
+            }
+
+    def dead_letters(self, queue: str, limit: int = 20) -> List[str]:
+        with self._lock:
+            return list(self._dead.get(queue, ()))[-limit:]
+
+
+# 期限の来た遅延タスク・期限切れの実行中タスクを ready に戻してから1件取り出す
+_CLAIM_SCRIPT = """
+for _, key in ipairs({KEYS[2], KEYS[3]}) do
+    local due = redis.call("zrangebyscore", key, "-inf", ARGV[1], "LIMIT", 0, 100)
+    for _, job in ipairs(due) do
+        redis.call("zrem", key, job)
+        redis.call("lpush", KEYS[1], job)
+    end
+end
+local job = redis.call("rpop", KEYS[1])
+if job then
+    redis.call("zadd", KEYS[3], ARGV[2], job)
+end
+return job
+"""
+
+
+class RedisBackend:
+    """Redis のキュー（ready: リスト / delayed・processing: ソート済みセット / dead: リスト）"""
+
+    def __init__(self, url: str = TASK_QUEUE_REDIS_URL, prefix: str = "tasks", client=None):
+        self.client = client or redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._claim = self.client.register_script(_CLAIM_SCRIPT)
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.prefix}:{kind}:{name}"
+
+    def push(self, queue: str, raw: str, delay: float = 0.0, pipeline=None):
+        target = pipeline or self.client
+        if delay > 0:
+            target.zadd(self._key("delayed", queue), {raw: time.time() + delay})
+        else:
+            target.lpush(self._key("ready", queue), raw)
+        target.sadd(self._key("queues", "all"), queue)
+
+    def claim(self, queue: str) -> Optional[str]:
+        now = time.time()
+        return self._claim(
+            keys=[self._key("ready", queue), self._key("delayed", queue), self._key("processing", queue)],
+            args=[now, now + TASK_VISIBILITY_TIMEOUT],
+        )
+
+    def ack(self, queue: str, raw: str):
+        self.client.zrem(self._key("processing", queue), raw)
+
+    def retry(self, queue: str, raw: str, new_raw: str, delay: float):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self._key("processing", queue), raw)
+        self.push(queue, new_raw, delay, pipeline=pipeline)
+        pipeline.execute()
+
+    def dead(self, queue: str, raw: str, new_raw: str):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self._key("processing", queue), raw)
+        pipeline.lpush(self._key("dead", queue), new_raw)
+        pipeline.ltrim(self._key("dead", queue), 0, TASK_DEAD_LETTER_LIMIT - 1)
+        pipeline.execute()
+
+    def reserve(self, key: str, ttl: int) -> bool:
+        return bool(self.client.set(self._key("idempotency", key), "1", nx=True, ex=ttl))
+
+    def release(self, key: str):
+        self.client.delete(self._key("idempotency", key))
+
+    def stats(self) -> dict:
+        stats = {}
+        for queue in sorted(self.client.smembers(self._key("queues", "all"))):
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.llen(self._key("ready", queue))
+            pipeline.zcard(self._key("delayed", queue))
+            pipeline.zcard(self._key("processing", queue))
+            pipeline.llen(self._key("dead", queue))
+            ready, delayed, processing, dead = pipeline.execute()
+            stats[queue] = {"ready": ready, "delayed": delayed, "processing": processing, "dead": dead}
+        return stats
+
+    def dead_letters(self, queue: str, limit: int = 20) -> List[str]:
+        return self.client.lrange(self._key("dead", queue), 0, limit - 1)
+
+
+class TaskQueue:
+    """タスクのキューへの登録と、キューごとのワーカーの実行"""
+
+    def __init__(self, backend, concurrency: Optional[Dict[str, int]] = None, poll_interval: float = TASK_POLL_INTERVAL):
+        self.backend = backend
+        self.concurrency = _parse_concurrency(TASK_QUEUE_CONCURRENCY) if concurrency is None else concurrency
+        self.poll_interval = poll_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeups: Dict[str, asyncio.Event] = {}
+
+    def enqueue(
+        self,
+        fn: Union[Callable, str],
+        *args,
+        idempotency_key: Optional[str] = None,
+        delay: float = 0.0,
+        **kwargs,
+    ) -> Optional[str]:
+        """タスクをキューに入れてIDを返す（冪等キーが登録済みの場合はNone）。スレッドからも呼び出せる"""
+        name = fn if isinstance(fn, str) else getattr(fn, "task_name", None)
+        definition = _registry.get(name)
+        if definition is None:
+            raise ValueError(f"Unknown task: {fn!r}")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "task": definition.name,
+            "args": list(args),
+            "kwargs": kwargs,
+            "attempts": 0,
+            "enqueued_at": time.time(),
+        }
+        # キューに入れる前にJSONにできるか確認する
+        raw = json.dumps(job, separators=(",", ":"), ensure_ascii=False)
+        if idempotency_key is not None and not self.backend.reserve(idempotency_key, TASK_IDEMPOTENCY_TTL):
+            tasks_deduplicated_total.inc((definition.name,))
+            return None
+
+        try:
+            self.backend.push(definition.queue, raw, delay)
+        except Exception:
+            # キューに入らなかったタスクの冪等キーを残すと、TTL の間同じタスクを登録できなくなる
+            if idempotency_key is not None:
+                self._release(idempotency_key)
+            raise
+        tasks_enqueued_total.inc((definition.name,))
+        self._wake(definition.queue)
+        return job["id"]
+
+    def _release(self, key: str):
+        try:
+            self.backend.release(key)
+        except redis.RedisError:
+            logger.exception("Failed to release idempotency key %s", key)
+
+    async def enqueue_or_run(
+        self, fn: Union[Callable, str], *args, idempotency_key: Optional[str] = None, **kwargs
+    ) -> Optional[str]:
+        """enqueue と同じ。キューに入れられない場合（Redis の障害など）はその場で実行する（失敗はログのみ）"""
+        try:
+            return self.enqueue(fn, *args, idempotency_key=idempotency_key, **kwargs)
+        except redis.RedisError:
+            logger.exception("Failed to enqueue task %r, running it inline", fn)
+        definition = _registry[fn if isinstance(fn, str) else fn.task_name]
+        try:
+            if asyncio.iscoroutinefunction(definition.fn):
+                await definition.fn(*args, **kwargs)
+            else:
+                await asyncio.to_thread(definition.fn, *args, **kwargs)
+        except Exception:
+            logger.exception("Inline task %s failed", definition.name)
+        return None
+
+    def _wake(self, queue: str):
+        loop = self._loop
+        if loop is None or loop.is_closed() or queue not in self._wakeups:
+            return
+        try:
+            if asyncio.get_running_loop() is loop:
+                self._wakeups[queue].set()
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(self._wakeups[queue].set)
+
+    def queues(self) -> List[str]:
+        return sorted({definition.queue for definition in _registry.values()} | set(self.concurrency))
+
+    async def execute(self, queue: str, raw: str):
+        """取り出したタスクを1件実行し、結果に応じて完了・再実行・dead にする"""
+        job = json.loads(raw)
+        definition = _registry.get(job["task"])
+        start = time.perf_counter()
+        try:
+            if definition is None:
+                raise LookupError(f"Unknown task: {job['task']}")
+            if asyncio.iscoroutinefunction(definition.fn):
+                await definition.fn(*job["args"], **job["kwargs"])
+            else:
+                await asyncio.to_thread(definition.fn, *job["args"], **job["kwargs"])
+        except Exception as e:
+            job["attempts"] += 1
+            job["error"] = f"{type(e).__name__}: {e}"
+            max_retries = definition.max_retries if definition else 0
+            if job["attempts"] > max_retries:
+                logger.exception("Task %s (%s) failed permanently after %d attempts", job["task"], job["id"], job["attempts"])
+                await asyncio.to_thread(self.backend.dead, queue, raw, json.dumps(job, ensure_ascii=False))
+                tasks_completed_total.inc((job["task"], "dead"))
+            else:
+                delay = retry_delay(job["attempts"])
+                logger.warning("Task %s (%s) failed, retrying in %.1fs: %s", job["task"], job["id"], delay, job["error"])
+                await asyncio.to_thread(self.backend.retry, queue, raw, json.dumps(job, ensure_ascii=False), delay)
+                tasks_completed_total.inc((job["task"], "retried"))
+        else:
+            await asyncio.to_thread(self.backend.ack, queue, raw)
+            tasks_completed_total.inc((job["task"], "succeeded"))
+        finally:
+            task_duration_seconds.observe(time.perf_counter() - start, (job["task"],))
+
+    async def _claim(self, queue: str) -> Optional[str]:
+        try:
+            return await asyncio.to_thread(self.backend.claim, queue)
+        except redis.RedisError:
+            logger.exception("Failed to claim task from queue %s", queue)
+            return None
+
+    async def _worker(self, queue: str):
+        wakeup = self._wakeups[queue]
+        while True:
+            raw = await self._claim(queue)
+            if raw is None:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                continue
+            try:
+                await self.execute(queue, raw)
+            except Exception:
+                # バックエンドへの完了・再実行の記録に失敗した場合（Redis では期限切れ後に再実行される）
+                logger.exception("Failed to record result of task from queue %s", queue)
+
+    async def run(self):
+        """キューごとに TASK_QUEUE_CONCURRENCY 個のワーカーを実行（lifespanでタスクとして起動）"""
+        self._loop = asyncio.get_running_loop()
+        workers = []
+        for queue in self.queues():
+            self._wakeups[queue] = asyncio.Event()
+            workers += [asyncio.create_task(self._worker(queue)) for _ in range(max(1, self.concurrency.get(queue, 1)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._loop = None
+
+    async def run_until_idle(self) -> int:
+        """実行可能なタスクがなくなるまで順に実行し、実行した件数を返す（テスト・保守用）"""
+        executed = 0
+        while True:
+            claimed = False
+            for queue in self.queues():
+                raw = await self._claim(queue)
+                if raw is not None:
+                    await self.execute(queue, raw)
+                    executed += 1
+                    claimed = True
+            if not claimed:
+                return executed
+
+    def stats(self) -> dict:
+        return {"backend": type(self.backend).__name__, "queues": self.backend.stats()}
+
+
+def create_backend(kind: str = TASK_QUEUE_BACKEND):
+    if kind == "redis":
+        return RedisBackend()
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown TASK_QUEUE_BACKEND: {kind}")
+
+
+task_queue = TaskQueue(create_backend())
+
+
+if __name__ == "__main__":
+    # タスクを登録するモジュールを読み込んでからワーカーを起動する
+    import services.background_tasks  # noqa: F401
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(task_queue.run())
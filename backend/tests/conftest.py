@@ -1,12 +1,33 @@
+import atexit
+import os
+import shutil
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+# バックグラウンドタスクはテスト内で明示的に実行する（ワーカーがテスト用DB以外を参照しないように）
+os.environ.setdefault("TASK_WORKERS", "false")
+os.environ.setdefault("OUTBOX_DISPATCHER", "false")
+# ログ・トレースはファイルに出力しない（リポジトリに logs/ を作らないように）
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("TRACE_EXPORTER", "none")
+# lifespan のマイグレーション・ヘルスチェックでリポジトリの database.db・archive.db を書き換えないよう一時ディレクトリを使う
+_database_dir = tempfile.mkdtemp(prefix="stayconnect-test-")
+atexit.register(shutil.rmtree, _database_dir, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'database.db')}"
+os.environ["ARCHIVE_SQLITE_PATH"] = os.path.join(_database_dir, "archive.db")
+
 from main import app
 from database import get_db, Base
+from database.replicas import get_read_db, get_read_session_factory
 from models import User, Host, Booking, Message
+from middleware.query_counter import assert_max_queries
+from services.auth_service import AuthService
+from utils.cache import clear_local_caches
 
 # テスト用のインメモリデータベース
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -26,6 +47,20 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_read_session_factory] = lambda: TestingSessionLocal
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """テスト間でキャッシュが持ち越されないようにクリア"""
+    clear_local_caches()
+    yield
+    clear_local_caches()
+
+@pytest.fixture
+def query_budget():
+    """クエリ数の上限を検証する（with query_budget(2): ...）"""
+    return assert_max_queries
 
 @pytest.fixture
 def client():
@@ -85,4 +120,43 @@ def auth_headers(client, test_user):
         "password": "secret"
     })
     token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def registered_user(db_session):
+    user = User(
+        name="登録ユーザー",
+        email="registered@example.com",
+        password_hash="$2b$12$EixZaYVK1fsbw1ZfbX3OXePaWxn96p36WQoeG6Lruj3vjPGga31lW",  # secret
+        interests=["旅行", "料理"],
+        location="東京都",
+        bio="テスト用のユーザーです"
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+@pytest.fixture
+def user_token(registered_user):
+    return AuthService.create_tokens(registered_user.id)["access_token"]
+
+@pytest.fixture
+def registered_host(db_session, registered_user):
+    host = Host(
+        user_id=registered_user.id,
+        title="登録宿主",
+        description="テスト用の宿主です",
+        location="東京都渋谷区",
+        property_type="apartment",
+        price_per_night=10000,
+        max_guests=2,
+        amenities=["WiFi", "キッチン"],
+        house_rules=["禁煙"],
+        photos=[],
+        available_dates=[]
+    )
+    db_session.add(host)
+    db_session.commit()
+    db_session.refresh(host)
+    return host
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from utils import security
+from utils.profiler import SamplingProfiler, profiler
+
+ADMIN_HEADERS = {"X-Admin-Token": "admin-secret"}
+
+@pytest.fixture
+def admin_enabled(monkeypatch, tmp_path):
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(profiler, "output_dir", str(tmp_path))
+    yield
+    profiler.stop()
+
+def test_admin_disabled_without_token(client):
+    """ADMIN_TOKEN 未設定時は管理用エンドポイントが無効であることのテスト"""
+    response = client.get("/api/admin/profiler", headers=ADMIN_HEADERS)
+    assert response.status_code == 404
+
+def test_admin_requires_token(client, admin_enabled):
+    """管理用トークンがない場合は403になることのテスト"""
+    assert client.get("/api/admin/profiler").status_code == 403
+    assert client.get("/api/admin/profiler", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    # 非ASCIIのトークンも 403 になる（500 にならない）
+    assert client.get("/api/admin/profiler", headers={"X-Admin-Token": "tökén".encode("latin-1")}).status_code == 403
+    assert client.get("/api/admin/profiler", headers=ADMIN_HEADERS).json()["running"] is False
+
+def test_profile_matching_requests(client, admin_enabled, registered_host, tmp_path):
+    """パスに一致するリクエストM件分のプロファイルのテスト"""
+    response = client.post(
+        "/api/admin/profiler/start",
+        json={"requests": 2, "route": "^/api/hosts/\\d+$", "interval_ms": 1},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 200
+    assert client.post("/api/admin/profiler/start", json={}, headers=ADMIN_HEADERS).status_code == 409
+
+    client.get("/api/hosts")  # 対象外
+    client.get(f"/api/hosts/{registered_host.id}")
+    client.get(f"/api/hosts/{registered_host.id}")
+
+    deadline = time.monotonic() + 2
+    while profiler.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    status = client.get("/api/admin/profiler", headers=ADMIN_HEADERS).json()
+    assert status["running"] is False
+    assert status["last_result"]["requests_profiled"] == 2
+    assert status["last_result"]["path"].startswith(str(tmp_path))
+
+def test_profiler_rejects_invalid_route_pattern(client, admin_enabled):
+    """不正な正規表現のパス指定は422になり、プロファイラーを開始しないことのテスト"""
+    response = client.post("/api/admin/profiler/start", json={"route": "^/api/hosts/(\\d+"}, headers=ADMIN_HEADERS)
+    assert response.status_code == 422
+    assert profiler.running is False
+
+def test_sampling_profiler_collapsed_stacks(tmp_path):
+    """一定秒数のプロファイルが collapsed stack 形式で出力されることのテスト"""
+    def busy_work(stop):
+        while not stop.is_set():
+            sum(range(1000))
+
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_work, args=(stop,))
+    worker.start()
+    sampler = SamplingProfiler(output_dir=str(tmp_path))
+    try:
+        sampler.start(seconds=0.2, interval=0.002)
+        time.sleep(0.3)
+    finally:
+        stop.set()
+        worker.join()
+    result = sampler.stop()
+
+    assert result["samples"] > 0
+    lines = open(result["path"]).read().splitlines()
+    assert any("test_admin:busy_work" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+_retained = []
+
+def leaky_endpoint():
+    _retained.append([bytearray(1024) for _ in range(200)])
+
+def test_memory_diff_grouped_by_route():
+    """メモリ増加をエンドポイント単位で集計するテスト"""
+    from types import SimpleNamespace
+    from utils.memory_profiler import MemoryTracker
+
+    tracker = MemoryTracker()
+    routes = [SimpleNamespace(path="/leak", methods={"GET"}, endpoint=leaky_endpoint)]
+    tracker.start(frames=10)
+    try:
+        tracker.take_snapshot(baseline=True)
+        leaky_endpoint()
+        diff = tracker.diff(group_by="route", routes=routes)
+        assert diff["top"][0]["key"] == "GET /leak"
+        assert diff["top"][0]["size_diff"] > 200 * 1024
+
+        diff = tracker.diff(diff["snapshot_id"], group_by="module")
+        assert diff["top"][0]["key"] == "tests/test_admin.py"
+    finally:
+        tracker.stop()
+        _retained.clear()
+
+def test_memory_endpoints(client, admin_enabled):
+    """tracemalloc の開始・スナップショット・差分のエンドポイントのテスト"""
+    response = client.post("/api/admin/memory/snapshots", json={}, headers=ADMIN_HEADERS)
+    assert response.status_code == 409
+
+    try:
+        assert client.post("/api/admin/memory/start", json={"frames": 5}, headers=ADMIN_HEADERS).json()["tracing"] is True
+        baseline = client.post("/api/admin/memory/snapshots", json={"baseline": True}, headers=ADMIN_HEADERS).json()
+        assert baseline["baseline"] is True
+
+        response = client.get("/api/admin/memory/diff", params={"group_by": "lineno", "limit": 5}, headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        assert response.json()["baseline_id"] == baseline["id"]
+        assert len(response.json()["top"]) <= 5
+
+        assert client.get("/api/admin/memory/diff", params={"group_by": "thread"}, headers=ADMIN_HEADERS).status_code == 400
+        assert client.get("/api/admin/memory/diff", params={"baseline_id": 999}, headers=ADMIN_HEADERS).status_code == 404
+    finally:
+        client.post("/api/admin/memory/stop", headers=ADMIN_HEADERS)
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from middleware.admission import AdmissionController, AdmissionMiddleware, Rejected
+from services.auth_service import AuthService
+
+def make_controller(**kwargs):
+    options = dict(
+        max_concurrency=10,
+        shares={"critical": 1.0, "authenticated": 0.8, "browse": 0.5},
+        budgets={"critical": 1.0, "authenticated": 0.5, "browse": 0.2},
+        max_queue={"critical": 10, "authenticated": 10, "browse": 10},
+        min_queue_timeout=0.01,
+    )
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+def test_lower_classes_get_fewer_slots():
+    """下位のクラスほど使える枠が少なく、上位のクラスは残りの枠を使えることのテスト"""
+    async def main():
+        controller = make_controller()
+        for _ in range(5):
+            await controller.acquire("browse")
+        with pytest.raises(Rejected):
+            await controller.acquire("browse")
+        for _ in range(3):
+            await controller.acquire("authenticated")
+        for _ in range(2):
+            await controller.acquire("critical")
+        assert controller.active == 10
+
+    asyncio.run(main())
+
+def test_released_slots_go_to_higher_priority_first():
+    """空いた枠が待っているリクエストに優先度順に割り当てられることのテスト"""
+    async def main():
+        controller = make_controller(max_concurrency=1, shares={"critical": 1.0, "authenticated": 1.0, "browse": 1.0})
+        await controller.acquire("browse")
+        order = []
+
+        async def wait(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+
+        tasks = [asyncio.ensure_future(wait("browse")), asyncio.ensure_future(wait("critical"))]
+        await asyncio.sleep(0)
+        controller.release(0.001)
+        await asyncio.sleep(0.01)
+        assert order == ["critical"]
+        controller.release(0.001)
+        await asyncio.gather(*tasks)
+        assert order == ["critical", "browse"]
+
+    asyncio.run(main())
+
+def test_queue_timeout_adapts_to_latency():
+    """処理時間が長くなるほど待ち時間の上限が短くなり、推定待ち時間が上限を超えると即座に拒否されることのテスト"""
+    async def main():
+        controller = make_controller(max_concurrency=1)
+        assert controller.queue_timeout("browse") == 0.2
+        controller.latency = 0.15
+        assert controller.queue_timeout("browse") == pytest.approx(0.05)
+        assert controller.queue_timeout("critical") == pytest.approx(0.85)
+
+        await controller.acquire("critical")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(Rejected) as excinfo:
+            await controller.acquire("browse")
+        assert loop.time() - started < 0.01
+        assert excinfo.value.retry_after >= 1
+
+        # 待っても枠が空かなければタイムアウト
+        controller.latency = 0.01
+        with pytest.raises(Rejected):
+            await controller.acquire("authenticated")
+        assert not controller._queues["authenticated"]
+
+    asyncio.run(main())
+
+def test_middleware_returns_503_with_retry_after():
+    """枠がない場合に 503 と Retry-After を返し、ヘルスチェックは対象外であることのテスト"""
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/api/hosts", ok), Route("/api/bookings", ok, methods=["POST"]), Route("/health", ok)])
+    controller = make_controller(max_concurrency=1)
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    controller.active = 1
+
+    with TestClient(app) as client:
+        response = client.get("/api/hosts")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert client.get("/health").status_code == 200
+
+        controller.active = 0
+        assert client.get("/api/hosts").status_code == 200
+        assert controller.active == 0
+        assert controller.latency > 0
+
+def test_classify():
+    """メソッド・パス・認証情報から優先度クラスを判定することのテスト"""
+    middleware = AdmissionMiddleware(app=None, controller=make_controller())
+
+    def scope(method, path, query=b"", headers=()):
+        return {"method": method, "path": path, "query_string": query, "headers": list(headers)}
+
+    assert middleware.classify(scope("POST", "/api/bookings/")) == "critical"
+    assert middleware.classify(scope("DELETE", "/api/bookings/3")) == "critical"
+    assert middleware.classify(scope("POST", "/api/auth/login")) == "critical"
+    token = AuthService.create_tokens(1)["access_token"].encode()
+    assert middleware.classify(scope("GET", "/api/bookings/", b"token=" + token)) == "authenticated"
+    assert middleware.classify(scope("GET", "/api/hosts", b"location=tokyo&token=" + token)) == "authenticated"
+    assert middleware.classify(scope("GET", "/api/hosts", headers=[(b"authorization", b"Bearer " + token)])) == "authenticated"
+    # 不正なトークンでは上位のクラスに入れない
+    assert middleware.classify(scope("GET", "/api/bookings/", b"token=abc")) == "browse"
+    assert middleware.classify(scope("GET", "/api/hosts", headers=[(b"authorization", b"Bearer x")])) == "browse"
+    assert middleware.classify(scope("GET", "/api/hosts", b"location=tokyo")) == "browse"
+    assert middleware.classify(scope("GET", "/health")) is None
+    assert middleware.classify(scope("GET", "/api/admin/slow-queries")) is None
@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from database.archive import archived_bookings, archived_messages, attach_archive
+from models import Booking, Message, User
+from services import archive_service
+from services.archive_service import ArchiveService
+from services.auth_service import AuthService
+
+@pytest.fixture
+def archive_db(db_session, tmp_path):
+    """テスト用DBの接続にアーカイブファイルを ATTACH"""
+    connection = db_session.get_bind().raw_connection()
+    attach_archive(connection.driver_connection, str(tmp_path / "archive.db"))
+    connection.close()
+    yield db_session
+    db_session.rollback()
+    db_session.execute(text("DETACH DATABASE archive"))
+
+@pytest.fixture
+def guest(db_session):
+    user = User(name="ゲスト", email="guest@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+def _booking(db, guest, host, status, updated_days_ago):
+    booking = Booking(
+        guest_id=guest.id, host_id=host.id, check_in=date(2024, 4, 1), check_out=date(2024, 4, 3),
+        guests_count=1, total_price=20000, status=status,
+    )
+    db.add(booking)
+    db.flush()
+    db.add_all([
+        Message(booking_id=booking.id, sender_id=guest.id, receiver_id=host.user_id, content=f"{status} {n}")
+        for n in range(2)
+    ])
+    db.commit()
+    booking.updated_at = datetime.now(timezone.utc) - timedelta(days=updated_days_ago)
+    db.commit()
+    return booking.id
+
+def test_archive_moves_old_finished_bookings(archive_db, guest, registered_host):
+    """保持期間を過ぎた完了・キャンセル済みの予約とメッセージのみがアーカイブに移ることのテスト"""
+    db = archive_db
+    old_completed = _booking(db, guest, registered_host, "completed", 400)
+    old_cancelled = _booking(db, guest, registered_host, "cancelled", 200)
+    recent_completed = _booking(db, guest, registered_host, "completed", 10)
+    old_pending = _booking(db, guest, registered_host, "pending", 400)
+
+    assert ArchiveService.available(db)
+    assert ArchiveService.archive_bookings(db, retention_days=180, batch_size=1) == {"bookings": 2, "messages": 4}
+
+    remaining = set(db.execute(select(Booking.id)).scalars())
+    assert remaining == {recent_completed, old_pending}
+    assert set(db.execute(select(archived_bookings.c.id)).scalars()) == {old_completed, old_cancelled}
+    assert db.query(Message).filter(Message.booking_id.in_([old_completed, old_cancelled])).count() == 0
+    assert len(ArchiveService.get_messages(db, old_completed)) == 2
+
+    # 再実行しても重複しない
+    assert ArchiveService.archive_bookings(db, retention_days=180) == {"bookings": 0, "messages": 0}
+
+def test_archive_resumes_after_interrupted_run(archive_db, guest, registered_host):
+    """コピー後に停止した場合も、再実行で重複なく削除まで完了することのテスト"""
+    db = archive_db
+    booking_id = _booking(db, guest, registered_host, "completed", 400)
+    now = datetime.now(timezone.utc)
+    db.execute(archived_bookings.insert().values(
+        id=booking_id, guest_id=guest.id, host_id=registered_host.id, check_in=date(2024, 4, 1),
+        check_out=date(2024, 4, 3), guests_count=1, total_price=20000, status="completed", archived_at=now,
+    ))
+    db.commit()
+
+    assert ArchiveService.archive_bookings(db, retention_days=180) == {"bookings": 1, "messages": 2}
+    assert db.execute(select(archived_bookings.c.id)).scalars().all() == [booking_id]
+    assert len(db.execute(select(archived_messages.c.id)).all()) == 2
+
+def test_get_messages_falls_back_to_archive(client, archive_db, guest, registered_host, registered_user, db_session):
+    """アーカイブ済みの予約のメッセージが get_messages で取得でき、権限チェックも行われることのテスト"""
+    booking_id = _booking(archive_db, guest, registered_host, "completed", 400)
+    ArchiveService.archive_bookings(archive_db, retention_days=180)
+
+    guest_token = AuthService.create_tokens(guest.id)["access_token"]
+    response = client.get(f"/api/messages/{booking_id}", params={"token": guest_token})
+    assert response.status_code == 200
+    assert [message["content"] for message in response.json()] == ["completed 0", "completed 1"]
+
+    host_token = AuthService.create_tokens(registered_user.id)["access_token"]
+    assert client.get(f"/api/messages/{booking_id}", params={"token": host_token}).status_code == 200
+
+    stranger = User(name="他人", email="stranger@example.com", password_hash="x")
+    db_session.add(stranger)
+    db_session.commit()
+    stranger_token = AuthService.create_tokens(stranger.id)["access_token"]
+    assert client.get(f"/api/messages/{booking_id}", params={"token": stranger_token}).status_code == 403
+    assert client.get("/api/messages/99999", params={"token": guest_token}).status_code == 404
+
+class FakePostgresSession:
+    """パーティション化済みの PostgreSQL とみなすセッション（SQLは実行しない）"""
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def get_bind(self):
+        class Bind:
+            class dialect:
+                name = "postgresql"
+        return Bind()
+
+    def execute(self, statement, params=None):
+        class Result:
+            def scalar(self):
+                return True
+        return Result()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def test_partition_failure_skips_only_that_month(monkeypatch):
+    """パーティションの作成に失敗した月はスキップし、他の月は作成することのテスト"""
+    created = []
+    def create(db, name, start, end):
+        if not created:
+            created.append(None)
+            raise RuntimeError("updated partition constraint for default partition would be violated")
+        created.append(name)
+    monkeypatch.setattr(ArchiveService, "_create_message_partition", staticmethod(create))
+
+    db = FakePostgresSession()
+    names = ArchiveService.ensure_message_partitions(db, months_ahead=2)
+    assert names == created[1:]
+    assert len(names) == 2
+    assert (db.commits, db.rollbacks) == (2, 1)
+
+def test_run_archives_when_partition_creation_fails(archive_db, guest, registered_host, monkeypatch):
+    """パーティションの作成が失敗してもアーカイブは実行されることのテスト"""
+    _booking(archive_db, guest, registered_host, "completed", 400)
+    def fail(db):
+        raise RuntimeError("partition check failed")
+    monkeypatch.setattr(ArchiveService, "ensure_message_partitions", staticmethod(fail))
+    monkeypatch.setattr(archive_service, "SessionLocal", sessionmaker(bind=archive_db.get_bind()))
+
+    assert ArchiveService.run() == {"partitions": [], "bookings": 1, "messages": 2}
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from database import Base, get_db
+from database.replicas import get_read_session_factory
+from models import Booking, Host, Message, User
+from services import dashboard_service
+from services.auth_service import AuthService
+
+@pytest.fixture
+def file_sessions(client, tmp_path):
+    """セクションを別接続で並行に実行できるよう、ファイルのSQLiteを使う"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'dashboard.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = lambda: SessionLocal
+    yield SessionLocal
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(overrides)
+    engine.dispose()
+
+@pytest.fixture
+def dashboard_user(file_sessions):
+    db = file_sessions()
+    guest = User(name="ゲスト", email="guest@example.com", password_hash="x", interests=["料理"], location="東京都")
+    host_user = User(name="ホスト", email="host@example.com", password_hash="x", interests=["料理"])
+    db.add_all([guest, host_user])
+    db.flush()
+    host = Host(
+        user_id=host_user.id, title="東京の宿", description="説明", location="東京都渋谷区",
+        property_type="apartment", price_per_night=10000, max_guests=2,
+    )
+    db.add(host)
+    db.flush()
+    booking = Booking(
+        guest_id=guest.id, host_id=host.id, check_in=date(2024, 4, 1), check_out=date(2024, 4, 3),
+        guests_count=1, total_price=20000, status="pending",
+    )
+    db.add(booking)
+    db.flush()
+    db.add(Message(booking_id=booking.id, sender_id=host_user.id, receiver_id=guest.id, content="ようこそ"))
+    db.commit()
+    ids = {"guest": guest.id, "host": host.id, "booking": booking.id}
+    db.close()
+    return ids
+
+def test_dashboard_returns_all_sections(client, dashboard_user):
+    """1回のリクエストでユーザー・予約・会話・おすすめ宿主が返ることのテスト"""
+    token = AuthService.create_tokens(dashboard_user["guest"])["access_token"]
+    response = client.get("/api/dashboard", params={"token": token})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["user"]["id"] == dashboard_user["guest"]
+    assert [booking["id"] for booking in data["bookings"]] == [dashboard_user["booking"]]
+    assert data["conversations"][0]["last_message"] == "ようこそ"
+    assert data["conversations"][0]["unread_count"] == 1
+    assert [host["id"] for host in data["matched_hosts"]] == [dashboard_user["host"]]
+    assert data["errors"] == {}
+
+def test_dashboard_sections_run_concurrently(client, dashboard_user, monkeypatch):
+    """各セクションが別スレッド・別セッションで並行に実行されることのテスト"""
+    barrier = threading.Barrier(len(dashboard_service.SECTIONS), timeout=5)
+    sessions = set()
+
+    def waiting(section):
+        def run(db, user):
+            sessions.add(id(db))
+            barrier.wait()
+            return section(db, user)
+        return run
+
+    for name, section in list(dashboard_service.SECTIONS.items()):
+        monkeypatch.setitem(dashboard_service.SECTIONS, name, waiting(section))
+
+    token = AuthService.create_tokens(dashboard_user["guest"])["access_token"]
+    response = client.get("/api/dashboard", params={"token": token})
+    assert response.json()["errors"] == {}
+    assert len(sessions) == len(dashboard_service.SECTIONS)
+
+def test_dashboard_section_timeout(client, dashboard_user, monkeypatch):
+    """遅いセクションのみが打ち切られ、他のセクションは返ることのテスト"""
+    release = threading.Event()
+
+    def slow(db, user):
+        release.wait(5)
+        return []
+
+    monkeypatch.setitem(dashboard_service.SECTIONS, "matched_hosts", slow)
+    monkeypatch.setattr(dashboard_service, "DASHBOARD_SECTION_TIMEOUT", 0.1)
+
+    token = AuthService.create_tokens(dashboard_user["guest"])["access_token"]
+    started = time.monotonic()
+    response = client.get("/api/dashboard", params={"token": token})
+    release.set()
+    assert time.monotonic() - started < 2
+    data = response.json()
+    assert data["matched_hosts"] is None
+    assert data["errors"] == {"matched_hosts": "timed out after 0.1s"}
+    assert len(data["bookings"]) == 1
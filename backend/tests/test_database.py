@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from database.pool_metrics import PoolMetrics, instrumented_pool_class, instrument_engine, pool_status
+
+
+def test_pool_metrics_records_checkouts(tmp_path):
+    """コネクションプールの計測値のテスト"""
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(metrics),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    instrument_engine(engine, metrics)
+
+    first = engine.connect()
+    second = engine.connect()
+    first.execute(text("SELECT 1"))
+
+    status = pool_status(engine, metrics)
+    assert status["checked_out"] == 2
+    assert status["overflow_peak"] == 1
+    assert status["checkouts"] == 2
+    assert status["connects"] == 2
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert metrics.timeouts == 1
+
+    first.close()
+    second.close()
+    assert pool_status(engine, metrics)["checkins"] == 2
+    engine.dispose()
+
+
+def test_index_advisor_flags_full_scans(tmp_path):
+    """インデックスアドバイザーのフルスキャン検出のテスト"""
+    from sqlalchemy import select
+    from database import Base
+    from database.index_advisor import analyze, QUERY_SHAPES
+    from models import Host
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'advisor.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    # モデルのインデックスが揃っていればアプリのクエリパターンはフルスキャンにならない
+    assert analyze(engine, QUERY_SHAPES, min_rows=0) == []
+
+    shapes = [("hosts.by_title", lambda: select(Host).where(Host.title == "x"))]
+    findings = analyze(engine, shapes, min_rows=0)
+    assert [(f["query"], f["table"]) for f in findings] == [("hosts.by_title", "hosts")]
+    assert analyze(engine, shapes, min_rows=1) == []
+    engine.dispose()
@@ -0,0 +1,37 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from utils.event_loop import LoopWatchdog, event_loop_blocks_total
+
+def blocking_handler():
+    time.sleep(0.3)
+
+def test_watchdog_records_blocking_route():
+    """イベントループをブロックした処理のスタックとルートを記録するテスト"""
+    watchdog = LoopWatchdog(threshold=0.05)
+    scope = {"type": "http", "method": "GET", "path": "/slow", "route": SimpleNamespace(path="/slow")}
+
+    async def request():
+        watchdog.active[asyncio.current_task()] = scope
+        blocking_handler()
+
+    async def main():
+        watchdog.start(asyncio.get_running_loop())
+        try:
+            await asyncio.sleep(0.05)
+            await asyncio.create_task(request())
+            # ループ再開をウォッチドッグが検出するまで待つ
+            await asyncio.sleep(0.2)
+        finally:
+            watchdog.stop()
+
+    before = event_loop_blocks_total._samples.get(("/slow",), 0)
+    asyncio.run(main())
+
+    assert len(watchdog.recent_blocks) == 1
+    block = watchdog.recent_blocks[0]
+    assert block["route"] == "/slow"
+    assert 0.15 < block["blocked_seconds"] < 0.5
+    assert "blocking_handler" in block["stack"]
+    assert event_loop_blocks_total._samples[("/slow",)] == before + 1
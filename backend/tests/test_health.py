@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from services.health_service import HealthMonitor
+
+def test_live_and_health_serve_snapshot(client):
+    """/live・/health が定期チェックの結果を返すことのテスト"""
+    response = client.get("/live")
+    assert response.status_code == 200
+    assert response.json()["health_age_seconds"] is not None
+
+    response = client.get("/health")
+    body = response.json() if response.status_code == 200 else response.json()["detail"]
+    assert body["services"]["database"] == "healthy"
+    assert "stale" in body
+    assert "database_pool" in body
+
+def test_health_checks_run_concurrently_with_timeouts():
+    """チェックが並行に実行され、個別のタイムアウトが効くことのテスト"""
+    def slow():
+        time.sleep(0.5)
+        return "healthy"
+
+    def broken():
+        raise ConnectionError("connection refused")
+
+    monitor = HealthMonitor(
+        checks={"database": lambda: "healthy", "redis": slow, "disk": broken, "cache": slow},
+        critical=("database", "redis"),
+        timeout=0.2,
+    )
+    assert monitor.snapshot() is None
+
+    async def timed_refresh():
+        start = time.monotonic()
+        snapshot = await monitor.refresh()
+        return snapshot, time.monotonic() - start
+
+    snapshot, elapsed = asyncio.run(timed_refresh())
+    assert elapsed < 0.45
+    assert snapshot["status"] == "unhealthy"
+    assert snapshot["services"]["database"] == "healthy"
+    assert snapshot["services"]["redis"] == "unhealthy: timed out after 0.2s"
+    assert snapshot["services"]["cache"] == "unknown: timed out after 0.2s"
+    assert snapshot["services"]["disk"] == "unknown: connection refused"
+
+def test_health_snapshot_staleness():
+    """更新が止まった結果が stale と判定されることのテスト"""
+    monitor = HealthMonitor(checks={"database": lambda: "healthy"}, critical=("database",), stale_after=0.05)
+    asyncio.run(monitor.refresh())
+    assert monitor.snapshot()["stale"] is False
+    assert monitor.snapshot()["status"] == "healthy"
+
+    time.sleep(0.1)
+    assert monitor.snapshot()["stale"] is True
@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from models import Host
 
 def test_create_host(client, auth_headers, test_user):
     """宿主登録のテスト"""
@@ -65,4 +66,166 @@ def test_delete_host(client, auth_headers, test_host):
     
     # 削除後の確認
     response = client.get(f"/hosts/{test_host.id}")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_host_detail_is_cached(client, registered_host, query_budget):
+    """宿主詳細の2回目以降の取得でDBを参照しないことのテスト"""
+    from services.entity_cache import host_cache
+
+    assert client.get(f"/api/hosts/{registered_host.id}").status_code == 200
+
+    with query_budget(0):
+        response = client.get(f"/api/hosts/{registered_host.id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == registered_host.title
+    assert host_cache.cache.stats()["local_hits"] >= 1
+
+def test_update_host_invalidates_cache(client, registered_host, user_token):
+    """宿主情報更新時にキャッシュが破棄されることのテスト"""
+    client.get(f"/api/hosts/{registered_host.id}")
+
+    response = client.put(
+        f"/api/hosts/{registered_host.id}",
+        params={"token": user_token},
+        json={"title": "更新された宿主"}
+    )
+    assert response.status_code == 200
+
+    response = client.get(f"/api/hosts/{registered_host.id}")
+    assert response.json()["title"] == "更新された宿主"
+
+def test_entity_cache_compact_roundtrip(registered_host, db_session):
+    """エンティティのシリアライズ・デシリアライズのテスト"""
+    from services.entity_cache import host_cache
+
+    snapshot = host_cache.get(db_session, registered_host.id)
+    raw = host_cache._dumps(snapshot)
+    assert raw.startswith("[")
+    assert host_cache._loads(raw) == snapshot
+
+def test_host_detail_conditional_get(client, registered_host, user_token):
+    """宿主詳細のETagによる条件付きGETのテスト"""
+    response = client.get(f"/api/hosts/{registered_host.id}")
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    response = client.get(f"/api/hosts/{registered_host.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.put(f"/api/hosts/{registered_host.id}", params={"token": user_token}, json={"price_per_night": 12000})
+    response = client.get(f"/api/hosts/{registered_host.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_host_detail_if_modified_since(client, registered_host):
+    """宿主詳細の If-Modified-Since による条件付きGETのテスト（SQLiteのタイムゾーンなしの更新日時と比較できること）"""
+    last_modified = client.get(f"/api/hosts/{registered_host.id}").headers["Last-Modified"]
+
+    response = client.get(f"/api/hosts/{registered_host.id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    response = client.get(f"/api/hosts/{registered_host.id}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert response.status_code == 200
+
+def test_host_list_conditional_get(client, registered_host):
+    """宿主一覧のETagによる条件付きGETのテスト"""
+    response = client.get("/api/hosts")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/hosts", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+
+    response = client.get("/api/hosts", params={"location": "大阪"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_host_list_ignores_if_modified_since(client, registered_host, db_session):
+    """一覧は Last-Modified を返さず、If-Modified-Since だけでは304にならないことのテスト"""
+    response = client.get("/api/hosts")
+    assert "Last-Modified" not in response.headers
+    response = client.get("/api/hosts", params={"ids": str(registered_host.id)})
+    assert "Last-Modified" not in response.headers
+
+    future = "Fri, 01 Jan 2100 00:00:00 GMT"
+    assert client.get("/api/hosts", headers={"If-Modified-Since": future}).status_code == 200
+    assert client.get("/api/hosts", params={"ids": str(registered_host.id)}, headers={"If-Modified-Since": future}).status_code == 200
+
+def test_host_list_card_view(client, registered_host, db_session):
+    """宿主一覧のカード表示のテスト"""
+    registered_host.photos = ["uploads/host_1_0.jpg", "uploads/host_1_1.jpg"]
+    db_session.commit()
+
+    response = client.get("/api/hosts", params={"view": "card"})
+    assert response.status_code == 200
+    card = response.json()[0]
+    assert card["thumbnail"] == "uploads/host_1_0.jpg"
+    assert card["title"] == registered_host.title
+    assert "description" not in card
+    assert "available_dates" not in card
+
+def test_host_list_sparse_fields(client, registered_host, query_budget):
+    """宿主一覧のfields指定のテスト"""
+    with query_budget(1) as stats:
+        response = client.get("/api/hosts", params={"fields": "title,price_per_night"})
+    assert response.status_code == 200
+    assert response.json() == [{"id": registered_host.id, "title": registered_host.title, "price_per_night": 10000.0}]
+    assert not [shape for shape in stats.shapes if "hosts.description" in shape]
+
+    response = client.get("/api/hosts", params={"fields": "title,password"})
+    assert response.status_code == 400
+
+def test_host_list_query_budget(client, registered_user, db_session, query_budget):
+    """宿主一覧のクエリ数が件数に比例しないことのテスト"""
+    db_session.add_all([
+        Host(
+            user_id=registered_user.id,
+            title=f"宿主{i}",
+            description="一覧用",
+            location="東京都",
+            property_type="apartment",
+            price_per_night=8000,
+            max_guests=2,
+        )
+        for i in range(20)
+    ])
+    db_session.commit()
+
+    with query_budget(1):
+        response = client.get("/api/hosts")
+    assert response.status_code == 200
+    assert len(response.json()) == 20
+
+def test_host_list_by_ids(client, registered_user, db_session, query_budget):
+    """ids= 指定時に IN クエリ1回で指定順に返し、2回目はキャッシュから返すことのテスト"""
+    hosts = [
+        Host(
+            user_id=registered_user.id,
+            title=f"宿主{i}",
+            description="一括取得用",
+            location="東京都",
+            property_type="apartment",
+            price_per_night=8000,
+            max_guests=2,
+            photos=[f"photo{i}.jpg"],
+            is_active=i != 1,
+        )
+        for i in range(3)
+    ]
+    db_session.add_all(hosts)
+    db_session.commit()
+    ids = [hosts[2].id, 99999, hosts[0].id, hosts[1].id, hosts[2].id]
+    params = {"ids": ",".join(map(str, ids))}
+
+    with query_budget(1):
+        response = client.get("/api/hosts", params=params)
+    assert response.status_code == 200
+    assert [host["id"] for host in response.json()] == [hosts[2].id, hosts[0].id]
+
+    # キャッシュ済みのIDのみなら問い合わせない
+    with query_budget(0):
+        response = client.get("/api/hosts", params={"ids": f"{ids[0]},{ids[2]}", "view": "card"})
+    assert [host["thumbnail"] for host in response.json()] == ["photo2.jpg", "photo0.jpg"]
+
+    assert client.get("/api/hosts", params={"ids": "1,a"}).status_code == 400
+    assert client.get("/api/hosts", params={"ids": ",".join(map(str, range(1, 300)))}).status_code == 400
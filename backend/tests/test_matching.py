@@ -47,4 +47,63 @@ def test_get_host_recommendations(client, auth_headers, test_user):
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
-    assert len(data) <= 10  # 最大10件のレコメンデーション
\ No newline at end of file
+    assert len(data) <= 10  # 最大10件のレコメンデーション
+
+def test_matched_hosts_payload(client, registered_host, db_session):
+    """マッチング一覧のレスポンス形式のテスト"""
+    from models import User
+    from services.auth_service import AuthService
+
+    guest = User(name="ゲスト", email="guest@example.com", password_hash="x", interests=["旅行"], location="東京")
+    db_session.add(guest)
+    db_session.commit()
+    token = AuthService.create_tokens(guest.id)["access_token"]
+
+    response = client.get("/api/matching/hosts", params={"token": token})
+    assert response.status_code == 200
+    item = response.json()[0]
+    assert item["id"] == registered_host.id
+    assert item["photos"] == []
+    assert item["host_user"]["name"] == "登録ユーザー"
+    assert item["match_rate"] > 0
+    assert "match_reason" in item
+
+def test_matched_hosts_allow_null_rating(client, registered_host, registered_user, db_session):
+    """宿主ユーザーの rating・review_count が NULL でもマッチング一覧が返ることのテスト"""
+    from models import User
+    from services.auth_service import AuthService
+    from services.entity_cache import user_cache
+
+    registered_user.rating = None
+    registered_user.review_count = None
+    guest = User(name="ゲスト", email="guest@example.com", password_hash="x", interests=["旅行"], location="東京")
+    db_session.add(guest)
+    db_session.commit()
+    user_cache.invalidate(registered_user.id)
+    token = AuthService.create_tokens(guest.id)["access_token"]
+
+    response = client.get("/api/matching/hosts", params={"token": token})
+    assert response.status_code == 200
+    host_user = response.json()[0]["host_user"]
+    assert (host_user["rating"], host_user["review_count"]) == (0.0, 0)
+
+def test_matched_hosts_query_budget(client, registered_user, db_session, query_budget):
+    """マッチング一覧のクエリ数が宿主数に比例しないことのテスト"""
+    from models import Host, User
+    from services.auth_service import AuthService
+
+    for i in range(10):
+        owner = User(name=f"宿主ユーザー{i}", email=f"owner{i}@example.com", password_hash="x", interests=["料理"])
+        db_session.add(owner)
+        db_session.flush()
+        db_session.add(Host(
+            user_id=owner.id, title=f"宿主{i}", description="一覧用", location="東京都",
+            property_type="house", price_per_night=5000, max_guests=4,
+        ))
+    db_session.commit()
+    token = AuthService.create_tokens(registered_user.id)["access_token"]
+
+    with query_budget(3):
+        response = client.get("/api/matching/hosts", params={"token": token})
+    assert response.status_code == 200
+    assert len(response.json()) == 10
@@ -101,4 +101,42 @@ def test_get_unread_count(client, auth_headers):
     assert response.status_code == 200
     data = response.json()
     assert "unread_count" in data
-    assert isinstance(data["unread_count"], int)
\ No newline at end of file
+    assert isinstance(data["unread_count"], int)
+
+def test_conversations_query_budget(client, registered_host, registered_user, db_session, query_budget):
+    """会話一覧の内容とクエリ数が予約件数に比例しないことのテスト"""
+    from datetime import date
+    from models import Booking, Message, User
+    from services.auth_service import AuthService
+
+    guests = []
+    for i in range(5):
+        guest = User(name=f"ゲスト{i}", email=f"guest{i}@example.com", password_hash="x")
+        db_session.add(guest)
+        db_session.flush()
+        booking = Booking(
+            guest_id=guest.id, host_id=registered_host.id, check_in=date(2024, 3, 1),
+            check_out=date(2024, 3, 3), guests_count=1, total_price=20000,
+        )
+        db_session.add(booking)
+        db_session.flush()
+        db_session.add_all([
+            Message(booking_id=booking.id, sender_id=guest.id, receiver_id=registered_user.id, content="はじめまして"),
+            Message(booking_id=booking.id, sender_id=guest.id, receiver_id=registered_user.id, content=f"よろしく{i}"),
+        ])
+        guests.append(guest)
+    db_session.commit()
+    token = AuthService.create_tokens(registered_user.id)["access_token"]
+
+    with query_budget(5):
+        response = client.get("/api/messages/conversations", params={"token": token})
+    assert response.status_code == 200
+    conversations = {item["other_user_name"]: item for item in response.json()}
+    assert len(conversations) == 5
+    assert conversations["ゲスト0"]["last_message"] == "よろしく0"
+    assert conversations["ゲスト0"]["unread_count"] == 2
+
+    # ゲスト側から見た相手は宿主ユーザー
+    guest_token = AuthService.create_tokens(guests[0].id)["access_token"]
+    response = client.get("/api/messages/conversations", params={"token": guest_token})
+    assert [item["other_user_name"] for item in response.json()] == ["登録ユーザー"]
@@ -0,0 +1,53 @@
+import json
+from utils.metrics import Counter, Gauge, Histogram, MetricsRegistry, merge_snapshots, render
+
+def test_metrics_endpoint(client, registered_host):
+    """/metrics がルートのテンプレート単位で集計されることのテスト"""
+    client.get(f"/api/hosts/{registered_host.id}")
+    client.get("/api/hosts/999999")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/hosts/{host_id}",status="200"}' in body
+    assert 'http_requests_total{method="GET",route="/api/hosts/{host_id}",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/hosts/{host_id}",le="+Inf"}' in body
+    assert "# TYPE db_pool_checkouts_total counter" in body
+    assert 'cache_hit_ratio{cache="entity:host"}' in body
+
+def test_histogram_render():
+    """ヒストグラムのバケットが累積で出力されることのテスト"""
+    registry = MetricsRegistry()
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, ("/a",))
+
+    body = registry.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in body
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in body
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in body
+    assert 'latency_seconds_count{route="/a"} 4' in body
+
+def test_merge_worker_snapshots(tmp_path):
+    """複数ワーカーの値の合算のテスト（停止したワーカーのゲージは除外）"""
+    registry = MetricsRegistry()
+    counter = Counter("requests_total", "Requests", ("route",), registry=registry)
+    in_flight = Gauge("in_flight", "In flight", registry=registry)
+    pool_size = Gauge("pool_size", "Pool size", mode="pid", registry=registry)
+    counter.inc(("/a",), 2)
+    in_flight.set(3)
+    pool_size.set(5)
+    snapshot = registry.snapshot()
+
+    merged = merge_snapshots([(100, True, snapshot), (101, True, snapshot), (102, False, snapshot)])
+    assert merged["requests_total"]["samples"] == {("/a",): 6.0}
+    assert merged["in_flight"]["samples"] == {(): 6.0}
+    assert merged["pool_size"]["samples"] == {("100",): 5.0, ("101",): 5.0}
+    assert 'pool_size{pid="101"} 5' in render(merged)
+
+    # 共有ディレクトリ経由の集計（停止済みワーカーのカウンターも残る）
+    (tmp_path / "worker_999999999.json").write_text(json.dumps({"pid": 999999999, "metrics": snapshot}))
+    merged = registry.collect(str(tmp_path))
+    assert merged["requests_total"]["samples"] == {("/a",): 4.0}
+    assert merged["in_flight"]["samples"] == {(): 3.0}
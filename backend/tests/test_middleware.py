@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from middleware.query_counter import QueryStats, assert_max_queries, statement_shape
+
+def test_server_timing_header(client, registered_host):
+    """レスポンスにSQL件数のServer-Timingが付与されることのテスト"""
+    response = client.get(f"/api/hosts/{registered_host.id}")
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="1 queries"' in timing
+
+def test_statement_shape_ignores_in_clause_size():
+    """IN句のパラメータ数が違っても同じ形状とみなすことのテスト"""
+    assert statement_shape("SELECT * FROM hosts WHERE id IN (?, ?, ?)") == statement_shape(
+        "SELECT *\n FROM hosts WHERE id IN (?)"
+    )
+
+def test_repeated_shapes_detected():
+    """同一形状のSQLの繰り返し（N+1）を検出するテスト"""
+    stats = QueryStats()
+    stats.record("SELECT * FROM hosts", 0.001)
+    for _ in range(5):
+        stats.record("SELECT * FROM users WHERE users.id = ?", 0.001)
+
+    assert stats.count == 6
+    assert stats.repeated_shapes(threshold=5) == [("SELECT * FROM users WHERE users.id = ?", 5)]
+    assert stats.repeated_shapes(threshold=6) == []
+
+def test_failed_statement_does_not_leak_start_time(tmp_path):
+    """失敗したSQLの開始時刻が接続に残らないことのテスト"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'error.db'}")
+    with assert_max_queries(10) as stats, engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info.get("query_start_time") == []
+        conn.execute(text("SELECT 1"))
+    assert stats.count == 1
@@ -0,0 +1,184 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from models import Notification, OutboxEvent, User
+from services.auth_service import AuthService
+from services.notification_service import OutboxDispatcher, EmailChannel, WebSocketChannel
+
+class FlakyChannel:
+    """指定したイベントの送信を fail_times 回失敗させるチャネル"""
+
+    name = "flaky"
+
+    def __init__(self, fail_times=1, event_ids=None):
+        self.fail_times = fail_times
+        self.event_ids = event_ids
+        self.delivered = []
+
+    def deliver(self, db, events):
+        if self.fail_times > 0 and any(self.event_ids is None or event.id in self.event_ids for event in events):
+            self.fail_times -= 1
+            raise ConnectionError("channel unavailable")
+        self.delivered += [event.id for event in events]
+
+@pytest.fixture
+def guest(db_session):
+    user = User(name="ゲスト", email="guest@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def guest_token(guest):
+    return AuthService.create_tokens(guest.id)["access_token"]
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+def _create_booking(client, host_id, token):
+    response = client.post("/api/bookings/", params={"token": token}, json={
+        "host_id": host_id, "check_in": "2024-04-01", "check_out": "2024-04-03", "guests_count": 1,
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def _events(db):
+    db.expire_all()
+    return db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+
+def test_booking_changes_record_outbox_events(client, db_session, registered_host, registered_user, user_token, guest, guest_token):
+    """予約の作成・ステータス変更・キャンセルで、相手方宛てのイベントが記録されることのテスト"""
+    booking_id = _create_booking(client, registered_host.id, guest_token)
+    assert client.put(f"/api/bookings/{booking_id}", params={"token": user_token}, json={"status": "confirmed"}).status_code == 200
+    # ステータスが変わらない更新ではイベントを記録しない
+    assert client.put(f"/api/bookings/{booking_id}", params={"token": user_token}, json={"status": "confirmed"}).status_code == 200
+    assert client.delete(f"/api/bookings/{booking_id}", params={"token": guest_token}).status_code == 200
+
+    events = _events(db_session)
+    assert [(e.event_type, e.recipients, e.status) for e in events] == [
+        ("booking.created", [registered_user.id], "pending"),
+        ("booking.status_changed", [guest.id], "pending"),
+        ("booking.cancelled", [registered_user.id], "pending"),
+    ]
+    assert all(e.aggregate_id == booking_id for e in events)
+    assert events[1].payload["previous_status"] == "pending"
+    assert events[1].payload["status"] == "confirmed"
+    assert events[2].payload["previous_status"] == "confirmed"
+
+def test_dispatch_delivers_to_all_channels(client, db_session, session_factory, registered_host, registered_user, user_token, guest_token, caplog):
+    """配信でアプリ内通知の作成・メール（ログ）・WebSocket へのプッシュが行われることのテスト"""
+    booking_id = _create_booking(client, registered_host.id, guest_token)
+    dispatcher = OutboxDispatcher(channels=[EmailChannel(), WebSocketChannel()], session_factory=session_factory)
+
+    with client.websocket_connect(f"/api/notifications/ws?token={user_token}") as websocket:
+        with caplog.at_level(logging.INFO, logger="notifications.email"):
+            assert dispatcher.dispatch_batch() == 1
+        message = websocket.receive_json()
+    assert message["event_type"] == "booking.created"
+    assert message["booking_id"] == booking_id
+    assert [(r.to, r.booking_id) for r in caplog.records if r.name == "notifications.email"] == [
+        ("registered@example.com", booking_id)
+    ]
+
+    event = _events(db_session)[0]
+    assert event.status == "dispatched"
+    assert event.dispatched_at is not None
+    assert dispatcher.dispatch_batch() == 0
+
+    response = client.get("/api/notifications/", params={"token": user_token})
+    assert response.status_code == 200
+    notifications = response.json()
+    assert [(n["type"], n["booking_id"], n["event_id"], n["is_read"]) for n in notifications] == [
+        ("booking.created", booking_id, event.id, False)
+    ]
+    # 差分取得・既読化
+    assert client.get("/api/notifications/", params={"token": user_token, "after_id": notifications[0]["id"]}).json() == []
+    assert client.put("/api/notifications/read", params={"token": user_token}).json() == {"updated": 1}
+    assert client.get("/api/notifications/", params={"token": user_token, "unread_only": True}).json() == []
+    # 予約したゲストには通知しない
+    assert client.get("/api/notifications/", params={"token": guest_token}).json() == []
+
+def test_failed_delivery_is_retried_without_duplicate_notifications(client, db_session, session_factory, registered_host, registered_user, guest_token):
+    """チャネルの失敗時は再試行され、アプリ内通知は先に作成されて重複しないことのテスト"""
+    _create_booking(client, registered_host.id, guest_token)
+    channel = FlakyChannel(fail_times=1)
+    dispatcher = OutboxDispatcher(channels=[channel], session_factory=session_factory)
+
+    assert dispatcher.dispatch_batch() == 1
+    event = _events(db_session)[0]
+    assert (event.status, event.attempts) == ("pending", 1)
+    assert event.last_error == "ConnectionError: channel unavailable"
+    assert event.pending_channels == ["flaky"]
+    assert db_session.query(Notification).filter(Notification.user_id == registered_user.id).count() == 1
+    # バックオフ中は取り出さない
+    assert dispatcher.dispatch_batch() == 0
+
+    event.available_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    assert dispatcher.dispatch_batch() == 1
+    event = _events(db_session)[0]
+    assert (event.status, event.attempts) == ("dispatched", 2)
+    assert channel.delivered == [event.id]
+    assert event.pending_channels == []
+    assert db_session.query(Notification).count() == 1
+
+def test_failing_channel_does_not_block_in_app_notification(client, db_session, session_factory, registered_host, registered_user, guest_token, monkeypatch):
+    """外部チャネルが失敗し続けてもアプリ内通知は作成され、送信できたチャネルには再送しないことのテスト"""
+    def fail(self, db, events):
+        raise ConnectionError("push service unavailable")
+
+    monkeypatch.setattr(WebSocketChannel, "deliver", fail)
+    booking_id = _create_booking(client, registered_host.id, guest_token)
+    channel = FlakyChannel(fail_times=0)
+    dispatcher = OutboxDispatcher(channels=[channel, WebSocketChannel()], session_factory=session_factory, max_attempts=2)
+
+    assert dispatcher.dispatch_batch() == 1
+    event = _events(db_session)[0]
+    assert (event.status, event.pending_channels) == ("pending", ["websocket"])
+    notification = db_session.query(Notification).one()
+    assert (notification.user_id, notification.event_id, notification.booking_id) == (registered_user.id, event.id, booking_id)
+
+    event.available_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+    assert dispatcher.dispatch_batch() == 1
+    event = _events(db_session)[0]
+    assert (event.status, event.pending_channels) == ("failed", ["websocket"])
+    assert channel.delivered == [event.id]
+    assert db_session.query(Notification).count() == 1
+
+def test_failing_event_does_not_block_batch(client, db_session, session_factory, registered_host, guest_token):
+    """バッチ内の1件が失敗し続けても他のイベントは配信され、上限回数で failed になることのテスト（アプリ内通知は作成する）"""
+    for _ in range(3):
+        _create_booking(client, registered_host.id, guest_token)
+    first, second, third = [event.id for event in _events(db_session)]
+    channel = FlakyChannel(fail_times=5, event_ids={second})
+    dispatcher = OutboxDispatcher(channels=[channel], session_factory=session_factory, max_attempts=1)
+
+    assert dispatcher.dispatch_batch() == 3
+    assert {event.id: event.status for event in _events(db_session)} == {
+        first: "dispatched", second: "failed", third: "dispatched",
+    }
+    assert channel.delivered == [first, third]
+    assert db_session.query(Notification).count() == 3
+
+def test_websocket_rejects_invalid_token(client):
+    """無効なトークンでは WebSocket に接続できないことのテスト"""
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/api/notifications/ws?token=invalid") as websocket:
+            websocket.receive_json()
+    assert exc_info.value.code == 1008
+
+def test_websocket_rejects_non_numeric_subject(client):
+    """sub がユーザーIDでないトークン（メールアドレス）では WebSocket に接続できないことのテスト"""
+    from utils.security import create_access_token
+    token = create_access_token(data={"sub": "guest@example.com"})
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect(f"/api/notifications/ws?token={token}") as websocket:
+            websocket.receive_json()
+    assert exc_info.value.code == 1008
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base
+from database import replicas
+from database.replicas import ReplicaSet, get_read_db, primary_reads
+from middleware.read_your_writes import ReadYourWritesMiddleware
+from models import User
+
+def _database(path, name):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, name=name, email="replica@example.com", password_hash="x"))
+        db.commit()
+    return engine
+
+@pytest.fixture
+def databases(tmp_path):
+    """プライマリとレプリカ2台（それぞれ別のSQLiteファイル。同じ行の name で参照先を判別する）"""
+    engines = [_database(tmp_path / f"{name}.db", name) for name in ("primary", "replica-1", "replica-2")]
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+def _read_name(db) -> str:
+    return db.query(User.name).filter(User.id == 1).scalar()
+
+def test_round_robin_reads_and_primary_writes(databases):
+    """読み取りはレプリカにラウンドロビンで、書き込みはプライマリに送られることのテスト"""
+    primary, replica_1, replica_2 = databases
+    replica_set = ReplicaSet(primary, [replica_1, replica_2])
+
+    names = []
+    for _ in range(3):
+        with replica_set.session() as db:
+            names.append(_read_name(db))
+    assert names == ["replica-1", "replica-2", "replica-1"]
+
+    with replica_set.session() as db:
+        user = db.query(User).filter(User.id == 1).first()
+        assert user.name.startswith("replica")
+        db.add(User(id=2, name="new", email="new@example.com", password_hash="x"))
+        db.commit()
+        with primary_reads(db):
+            assert _read_name(db) == "primary"
+
+    with Session(primary) as db:
+        assert db.get(User, 2) is not None
+    with Session(replica_1) as db:
+        assert db.get(User, 2) is None
+
+def test_unhealthy_replica_is_skipped(databases, tmp_path):
+    """接続できないレプリカがヘルスチェックで除外されることのテスト"""
+    primary, replica_1, _ = databases
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replica_set = ReplicaSet(primary, [broken, replica_1])
+
+    status = replica_set.check()
+    assert status.startswith("warning: 1/2 replicas")
+    for _ in range(3):
+        with replica_set.session() as db:
+            assert _read_name(db) == "replica-1"
+
+    replica_set = ReplicaSet(primary, [broken])
+    replica_set.check()
+    with replica_set.session() as db:
+        assert _read_name(db) == "primary"
+
+def test_read_your_writes(databases, monkeypatch):
+    """書き込んだクライアントのみ、Cookie の有効期間中はプライマリを参照することのテスト"""
+    primary, replica_1, _ = databases
+    replica_set = ReplicaSet(primary, [replica_1])
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+
+    def get_primary_db():
+        with replica_set.session(use_primary=True) as db:
+            yield db
+
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, seconds=30)
+
+    @app.get("/name")
+    def read_name(db: Session = Depends(get_read_db)):
+        return {"name": _read_name(db)}
+
+    @app.put("/name")
+    def write_name(db: Session = Depends(get_primary_db)):
+        db.get(User, 1).name = "updated"
+        db.commit()
+        return {"name": "updated"}
+
+    writer = TestClient(app)
+    other = TestClient(app)
+    assert writer.get("/name").json()["name"] == "replica-1"
+    assert "set-cookie" not in writer.get("/name").headers
+
+    response = writer.put("/name")
+    assert replicas.STICKY_COOKIE in response.headers["set-cookie"]
+    assert writer.get("/name").json()["name"] == "updated"
+    assert other.get("/name").json()["name"] == "replica-1"
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from starlette.requests import Request
+
+from utils import single_flight
+from utils.cache import TieredCache
+from utils.single_flight import SingleFlight, cache_fill, request_key, single_flight_requests_total
+
+test_cache = TieredCache("test:single_flight", ttl=60)
+
+def test_concurrent_calls_share_one_computation():
+    """同じキーの同時呼び出しで計算が1回のみ実行され、結果が共有されることのテスト"""
+    flight = SingleFlight("test_shared")
+    release = threading.Event()
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    async def main():
+        tasks = [asyncio.ensure_future(flight.do("key", compute, 21)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert flight.in_flight() == 1
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == [21]
+    assert flight.in_flight() == 0
+    assert single_flight_requests_total._samples[("test_shared", "leader")] == 1
+    assert single_flight_requests_total._samples[("test_shared", "coalesced")] == 4
+
+def test_errors_are_shared_and_not_cached():
+    """計算の例外が待っていた全リクエストに伝わり、次の呼び出しでは再実行されることのテスト"""
+    flight = SingleFlight("test_errors")
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        with pytest.raises(ValueError):
+            await flight.do("key", fail)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+def test_cancelled_leader_does_not_cancel_followers():
+    """最初のリクエストが切断されても、待っている他のリクエストは結果を受け取れることのテスト"""
+    flight = SingleFlight("test_cancel")
+
+    def compute():
+        time.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+
+def test_request_key_normalizes_parameter_order():
+    """クエリパラメータの順序・末尾のスラッシュによらず同じキーになることのテスト"""
+    def request(path, query):
+        return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": []})
+
+    assert request_key(request("/api/hosts/", "location=tokyo&limit=10")) == request_key(request("/api/hosts", "limit=10&location=tokyo"))
+    assert request_key(request("/api/hosts", "limit=10&token=a"), "token") == request_key(request("/api/hosts", "limit=10&token=b"), "token")
+    assert request_key(request("/api/hosts", "limit=10")) != request_key(request("/api/hosts", "limit=20"))
+
+def test_host_flight_key_separates_primary_reads():
+    """プライマリに固定されたリクエストはレプリカを参照するリクエストと集約しないことのテスト"""
+    import time as time_module
+    from routers.hosts import _flight_key
+
+    def request(cookie=None):
+        headers = [(b"cookie", f"db_primary_until={cookie}".encode())] if cookie else []
+        return Request({"type": "http", "method": "GET", "path": "/api/hosts", "query_string": b"", "headers": headers})
+
+    assert _flight_key(request(), "k") == "replica:k"
+    assert _flight_key(request(time_module.time() + 60), "k") == "primary:k"
+    assert _flight_key(request(time_module.time() - 60), "k") == "replica:k"
+
+def test_host_flight_uses_own_session(client, registered_host, monkeypatch):
+    """集約した読み込みはリクエストのセッションではなく、スレッド内で作成・破棄したセッションを使うことのテスト"""
+    from database.replicas import get_read_session_factory
+    from main import app
+    from services.entity_cache import host_cache
+
+    sessions = []
+    original = app.dependency_overrides[get_read_session_factory]()
+
+    def factory():
+        session = original()
+        sessions.append((threading.get_ident(), session))
+        return session
+
+    monkeypatch.setitem(app.dependency_overrides, get_read_session_factory, lambda: factory)
+    host_cache.invalidate(registered_host.id)
+    assert client.get(f"/api/hosts/{registered_host.id}").status_code == 200
+    assert client.get("/api/hosts").status_code == 200
+    assert len(sessions) == 2
+    assert all(thread_id != threading.get_ident() for thread_id, _ in sessions)
+
+class FakeRedis:
+    """ロックの取得・解放のみを扱うRedisクライアント"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def eval(self, script, numkeys, key, token):
+        if self.values.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_REDIS_LOCK", True)
+    monkeypatch.setattr(single_flight, "get_redis_client", lambda: client)
+    test_cache.clear_local()
+    return client
+
+def test_cache_fill_waits_for_other_worker(fake_redis):
+    """他のワーカーがロックを持っている場合、キャッシュが埋まるのを待って読み込まないことのテスト"""
+    fake_redis.set("lock:test:single_flight:1", "other-worker")
+    threading.Timer(0.05, lambda: test_cache.set("1", "filled by other worker")).start()
+
+    def load():
+        raise AssertionError("should not load")
+
+    assert cache_fill(test_cache, "1", load, "test") == "filled by other worker"
+
+def test_cache_fill_loads_after_wait_timeout(fake_redis, monkeypatch):
+    """ロックを持つワーカーが埋めない場合は待機時間後に自分で読み込むことのテスト"""
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_LOCK_WAIT_MS", 50)
+    fake_redis.set("lock:test:single_flight:2", "other-worker")
+    assert cache_fill(test_cache, "2", lambda: "loaded", "test") == "loaded"
+
+def test_cache_fill_releases_own_lock(fake_redis):
+    """ロックを取得したワーカーが読み込み後にロックを解放することのテスト"""
+    def load():
+        assert "lock:test:single_flight:3" in fake_redis.values
+        return "loaded"
+
+    assert cache_fill(test_cache, "3", load, "test") == "loaded"
+    assert fake_redis.values == {}
+
+def test_cache_fill_does_not_wait_on_event_loop(fake_redis, monkeypatch):
+    """イベントループ上の呼び出しではロックを待たず（ループを止めず）にすぐ読み込むことのテスト"""
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_LOCK_WAIT_MS", 5000)
+    fake_redis.set("lock:test:single_flight:4", "other-worker")
+
+    async def main():
+        start = time.monotonic()
+        value = cache_fill(test_cache, "4", lambda: "loaded", "test")
+        return value, time.monotonic() - start
+
+    value, elapsed = asyncio.run(main())
+    assert value == "loaded"
+    assert elapsed < 1
+    assert fake_redis.values == {"lock:test:single_flight:4": "other-worker"}
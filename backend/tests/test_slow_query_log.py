@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from database.slow_query_log import SlowQueryLog, fingerprint, parameter_types, slow_query_log
+from utils import security
+
+ADMIN_HEADERS = {"X-Admin-Token": "admin-secret"}
+
+def test_fingerprint_normalizes_literals_and_in_lists():
+    """リテラル・IN句のパラメータ数が異なるSQLが同じフィンガープリントになることのテスト"""
+    first = fingerprint("SELECT * FROM hosts WHERE id IN (?, ?, ?) AND city = 'Tokyo' LIMIT 10")
+    second = fingerprint("SELECT *  FROM hosts\nWHERE id IN (?) AND city = 'Osaka' LIMIT 20")
+    assert first == second == "SELECT * FROM hosts WHERE id IN (?) AND city = ? LIMIT ?"
+
+def test_parameter_types():
+    """バインドパラメータは値ではなく型名のみ記録されることのテスト"""
+    assert parameter_types((1, "secret", None)) == ["int", "str", "NoneType"]
+    assert parameter_types({"email": "a@example.com"}) == {"email": "str"}
+    assert parameter_types([(1, 2.5), (3, 4.5)], executemany=True) == ["int", "float"]
+
+def test_aggregates_percentiles_and_captures_explain(tmp_path):
+    """閾値を超えたSQLのみがフィンガープリントごとに集計され、EXPLAIN が取得されることのテスト"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE hosts (id INTEGER PRIMARY KEY, city TEXT)"))
+
+    log = SlowQueryLog(threshold_ms=50)
+    statement = "SELECT id FROM hosts WHERE city = ?"
+    log.record(engine, statement, ("Tokyo",), 0.01)  # 閾値未満
+    for ms in range(60, 160):
+        log.record(engine, statement, ("Tokyo",), ms / 1000)
+    log.record(engine, "SELECT count(*) FROM hosts", (), 0.5)
+    log.wait_for_explains()
+
+    top = log.top(sort_by="total")
+    assert [entry["fingerprint"] for entry in top] == [statement, "SELECT count(*) FROM hosts"]
+    entry = top[0]
+    assert entry["count"] == 100
+    assert entry["p50_ms"] == 110.0
+    assert entry["p99_ms"] == 158.0
+    assert entry["max_ms"] == 159.0
+    assert entry["parameter_types"] == ["str"]
+    assert entry["routes"] == {"background": 100}
+    assert any("hosts" in line for line in entry["plan"])
+    assert log.top(sort_by="max")[0]["fingerprint"] == "SELECT count(*) FROM hosts"
+
+def test_max_fingerprints():
+    """フィンガープリント数が上限を超えた場合は古いものから破棄されることのテスト"""
+    log = SlowQueryLog(threshold_ms=1, explain=False, max_fingerprints=2)
+    for table in ("users", "hosts", "bookings"):
+        log.record(None, f"SELECT * FROM {table}", (), 0.01)
+    assert sorted(entry["fingerprint"] for entry in log.top()) == ["SELECT * FROM bookings", "SELECT * FROM hosts"]
+
+def test_slow_query_admin_endpoint(client, registered_host, monkeypatch):
+    """リクエスト中のスロークエリがルート付きで管理用エンドポイントから取得できることのテスト"""
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 1e-6)
+    slow_query_log.reset()
+    try:
+        client.get(f"/api/hosts/{registered_host.id}")
+        slow_query_log.wait_for_explains()
+        monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+
+        response = client.get("/api/admin/slow-queries?sort_by=count", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["fingerprints"] >= 1
+        hosts_query = next(entry for entry in body["top"] if "FROM hosts" in entry["fingerprint"])
+        assert "GET /api/hosts/{host_id}" in hosts_query["routes"]
+        assert hosts_query["plan"]
+
+        assert client.get("/api/admin/slow-queries?sort_by=bogus", headers=ADMIN_HEADERS).status_code == 400
+        assert client.delete("/api/admin/slow-queries", headers=ADMIN_HEADERS).json()["fingerprints"] == 0
+    finally:
+        slow_query_log.reset()
+
+def test_failed_statement_does_not_leak_start_time(tmp_path, monkeypatch):
+    """失敗したSQLの開始時刻が接続に残らないことのテスト"""
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 1e6)
+    engine = create_engine(f"sqlite:///{tmp_path / 'error.db'}")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info.get("slow_query_start_time") == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info["slow_query_start_time"] == []
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from database.sqlite_tuning import configure_sqlite, default_pragmas, is_file_database
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}", connect_args={"check_same_thread": False})
+    lock = configure_sqlite(engine, pragmas=default_pragmas(), single_writer=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+    yield engine, lock
+    engine.dispose()
+
+def test_pragmas_applied(sqlite_engine):
+    """接続ごとに WAL・synchronous・mmap・キャッシュ・ビジータイムアウトが設定されることのテスト"""
+    engine, _ = sqlite_engine
+    with engine.connect() as conn:
+        values = {name: conn.execute(text(f"PRAGMA {name}")).scalar() for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")}
+    assert values == {"journal_mode": "wal", "synchronous": 1, "mmap_size": 268435456, "cache_size": -65536, "busy_timeout": 5000}
+    assert is_file_database(engine)
+    assert not is_file_database(create_engine("sqlite:///:memory:"))
+
+def test_single_writer_serializes_write_transactions(sqlite_engine):
+    """書き込みトランザクションがコミットまで順番待ちになり、読み取りは待たないことのテスト"""
+    engine, lock = sqlite_engine
+    order = []
+
+    first = engine.connect()
+    first.execute(text("INSERT INTO items (name) VALUES ('first')"))
+    order.append("first inserted")
+
+    def second_writer():
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO items (name) VALUES ('second')"))
+            order.append("second inserted")
+
+    thread = threading.Thread(target=second_writer)
+    thread.start()
+    time.sleep(0.1)
+    # 書き込み中でも読み取りは可能
+    with engine.connect() as reader:
+        assert reader.execute(text("SELECT count(*) FROM items")).scalar() == 0
+    assert order == ["first inserted"]
+
+    first.commit()
+    order.append("first committed")
+    first.close()
+    thread.join(timeout=5)
+    assert order == ["first inserted", "first committed", "second inserted"]
+
+def test_writer_lock_timeout_and_release_on_checkin(sqlite_engine):
+    """ロック待ちのタイムアウトと、コミットせずに返却された接続のロック解放のテスト"""
+    engine, lock = sqlite_engine
+    lock.timeout = 0.05
+
+    holder = engine.connect()
+    holder.execute(text("INSERT INTO items (name) VALUES ('held')"))
+
+    def blocked_writer(errors):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO items (name) VALUES ('blocked')"))
+        except OperationalError as e:
+            errors.append(e)
+
+    errors = []
+    thread = threading.Thread(target=blocked_writer, args=(errors,))
+    thread.start()
+    thread.join()
+    assert errors and "writer lock" in str(errors[0])
+
+    holder.close()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO items (name) VALUES ('after')"))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM items")).scalars().all() == ["after"]
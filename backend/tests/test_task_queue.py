@@ -0,0 +1,209 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+import redis
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+
+from models import Booking, Message, User
+from services import background_tasks, task_queue as task_queue_module
+from services.auth_service import AuthService
+from services.task_queue import MemoryBackend, TaskQueue, task, task_queue
+
+calls = []
+
+@task("test.record")
+def record(value):
+    calls.append(value)
+
+@task("test.flaky", max_retries=2)
+def flaky(fail_times):
+    calls.append("attempt")
+    if calls.count("attempt") <= fail_times:
+        raise RuntimeError("temporary failure")
+
+@task("test.slow", queue="test-limited")
+async def slow(value):
+    calls.append(("start", value))
+    await asyncio.sleep(0.05)
+    calls.append(("end", value))
+
+@pytest.fixture
+def queue(monkeypatch):
+    calls.clear()
+    monkeypatch.setattr(task_queue_module, "TASK_RETRY_BASE_SECONDS", 0)
+    return TaskQueue(MemoryBackend(), concurrency={}, poll_interval=0.01)
+
+def test_enqueue_and_run(queue):
+    """キューに入れたタスクがワーカーで実行されることのテスト"""
+    assert queue.enqueue(record, 1)
+    assert queue.enqueue("test.record", value=2)
+    assert calls == []
+    assert asyncio.run(queue.run_until_idle()) == 2
+    assert calls == [1, 2]
+    with pytest.raises(ValueError):
+        queue.enqueue("test.unknown")
+    with pytest.raises(TypeError):
+        queue.enqueue(record, object())
+
+def test_idempotency_key(queue):
+    """同じ冪等キーのタスクは1回のみキューに入ることのテスト"""
+    assert queue.enqueue(record, 1, idempotency_key="same")
+    assert queue.enqueue(record, 2, idempotency_key="same") is None
+    asyncio.run(queue.run_until_idle())
+    assert calls == [1]
+
+def test_retry_then_succeed(queue):
+    """失敗したタスクが再実行されることのテスト"""
+    queue.enqueue(flaky, 2)
+    asyncio.run(queue.run_until_idle())
+    assert calls == ["attempt"] * 3
+    assert queue.stats()["queues"]["default"] == {"ready": 0, "delayed": 0, "processing": 0, "dead": 0}
+
+def test_exhausted_retries_go_to_dead_letters(queue):
+    """再実行の上限を超えたタスクが dead に移ることのテスト"""
+    queue.enqueue(flaky, 10)
+    asyncio.run(queue.run_until_idle())
+    assert calls == ["attempt"] * 3
+    dead = [json.loads(raw) for raw in queue.backend.dead_letters("default")]
+    assert len(dead) == 1
+    assert dead[0]["attempts"] == 3
+    assert dead[0]["error"] == "RuntimeError: temporary failure"
+
+def test_retry_delay_backs_off(monkeypatch):
+    """再実行までの時間が指数的に延び、上限で頭打ちになることのテスト"""
+    monkeypatch.setattr(task_queue_module, "TASK_RETRY_BASE_SECONDS", 1)
+    monkeypatch.setattr(task_queue_module, "TASK_RETRY_MAX_SECONDS", 10)
+    assert 0.5 <= task_queue_module.retry_delay(1) <= 1
+    assert 4 <= task_queue_module.retry_delay(4) <= 8
+    assert task_queue_module.retry_delay(20) <= 10
+
+def test_per_queue_concurrency(queue):
+    """キューごとの同時実行数を超えて実行されないことのテスト"""
+    queue.concurrency = {"test-limited": 2}
+
+    async def main():
+        for value in range(4):
+            queue.enqueue(slow, value)
+        worker = asyncio.create_task(queue.run())
+        while len([call for call in calls if call[0] == "end"]) < 4:
+            await asyncio.sleep(0.01)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    running = peak = 0
+    for event, _ in calls:
+        running += 1 if event == "start" else -1
+        peak = max(peak, running)
+    assert peak == 2
+
+def test_get_messages_marks_read_in_background(client, db_session, registered_host, monkeypatch):
+    """メッセージ取得時に既読化がバックグラウンドタスクとして登録され、実行後に既読になることのテスト"""
+    monkeypatch.setattr(task_queue, "backend", MemoryBackend())
+    monkeypatch.setattr(background_tasks, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    guest = User(name="ゲスト", email="guest@example.com", password_hash="x")
+    db_session.add(guest)
+    db_session.commit()
+    booking = Booking(
+        guest_id=guest.id, host_id=registered_host.id, check_in=date(2024, 4, 1), check_out=date(2024, 4, 3),
+        guests_count=1, total_price=20000, status="confirmed",
+    )
+    db_session.add(booking)
+    db_session.commit()
+    db_session.add_all([
+        Message(booking_id=booking.id, sender_id=registered_host.user_id, receiver_id=guest.id, content=f"{n}")
+        for n in range(2)
+    ])
+    db_session.commit()
+    booking_id, guest_id = booking.id, guest.id
+
+    token = AuthService.create_tokens(guest_id)["access_token"]
+    for _ in range(2):
+        response = client.get(f"/api/messages/{booking_id}", params={"token": token})
+        assert response.status_code == 200
+        # レスポンスでは表示したメッセージを既読として返す
+        assert [message["is_read"] for message in response.json()] == [True, True]
+    # 2回目は冪等キーにより登録されない
+    assert task_queue.stats()["queues"]["default"]["ready"] == 1
+    assert db_session.query(Message).filter(Message.is_read == True).count() == 0
+
+    asyncio.run(task_queue.run_until_idle())
+    db_session.expire_all()
+    assert db_session.query(Message).filter(Message.booking_id == booking_id, Message.is_read == True).count() == 2
+
+class FailingPushBackend(MemoryBackend):
+    def push(self, queue, raw, delay=0.0):
+        raise redis.ConnectionError("Redis is down")
+
+def test_failed_push_releases_idempotency_key(queue):
+    """キューに入れるのに失敗した場合、冪等キーが残らないことのテスト"""
+    backend = FailingPushBackend()
+    queue.backend = backend
+    with pytest.raises(redis.RedisError):
+        queue.enqueue(record, 1, idempotency_key="same")
+    assert backend.reserve("same", 60)
+
+def test_get_messages_runs_mark_read_inline_when_queue_fails(client, db_session, registered_host, monkeypatch):
+    """キューに入れられない場合もメッセージを取得でき、既読化をその場で行うことのテスト"""
+    monkeypatch.setattr(task_queue, "backend", FailingPushBackend())
+    monkeypatch.setattr(background_tasks, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    guest = User(name="ゲスト", email="guest@example.com", password_hash="x")
+    db_session.add(guest)
+    db_session.commit()
+    booking = Booking(
+        guest_id=guest.id, host_id=registered_host.id, check_in=date(2024, 4, 1), check_out=date(2024, 4, 3),
+        guests_count=1, total_price=20000, status="confirmed",
+    )
+    db_session.add(booking)
+    db_session.commit()
+    db_session.add(Message(booking_id=booking.id, sender_id=registered_host.user_id, receiver_id=guest.id, content="0"))
+    db_session.commit()
+    booking_id = booking.id
+
+    token = AuthService.create_tokens(guest.id)["access_token"]
+    response = client.get(f"/api/messages/{booking_id}", params={"token": token})
+    assert response.status_code == 200
+    assert response.json()[0]["is_read"] is True
+    db_session.expire_all()
+    assert db_session.query(Message).filter(Message.booking_id == booking_id, Message.is_read == True).count() == 1
+
+def test_process_photo(tmp_path, monkeypatch):
+    """写真の縮小とサムネイルの作成のテスト"""
+    monkeypatch.setattr(background_tasks, "PHOTO_MAX_DIMENSION", 100)
+    monkeypatch.setattr(background_tasks, "PHOTO_THUMBNAIL_SIZE", 20)
+    monkeypatch.setattr(background_tasks, "PHOTO_THUMBNAIL_DIR", str(tmp_path / "thumbnails"))
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (300, 150), "red").save(path)
+
+    background_tasks.process_photo(str(path))
+    with Image.open(path) as image:
+        assert image.size == (100, 50)
+    with Image.open(tmp_path / "thumbnails" / "photo.jpg") as thumbnail:
+        assert thumbnail.size == (20, 10)
+    # 削除済みのファイルは何もしない
+    background_tasks.process_photo(str(tmp_path / "missing.jpg"))
+
+@pytest.fixture
+def redis_backend():
+    backend = task_queue_module.RedisBackend(prefix="tasks-test")
+    try:
+        backend.client.ping()
+    except redis.RedisError:
+        pytest.skip("Redis is not available")
+    yield backend
+    keys = backend.client.keys("tasks-test:*")
+    if keys:
+        backend.client.delete(*keys)
+
+def test_redis_backend_redelivers_expired_claims(redis_backend, monkeypatch):
+    """Redis では完了しないまま期限を過ぎたタスクが再度取り出されることのテスト"""
+    redis_backend.push("default", "job-1")
+    monkeypatch.setattr(task_queue_module, "TASK_VISIBILITY_TIMEOUT", -1)
+    assert redis_backend.claim("default") == "job-1"
+    assert redis_backend.claim("default") == "job-1"
+    redis_backend.ack("default", "job-1")
+    assert redis_backend.claim("default") is None
+    assert redis_backend.reserve("key", 60) and not redis_backend.reserve("key", 60)
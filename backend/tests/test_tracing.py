@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from utils.tracing import (
+    InMemorySpanExporter,
+    OTLPJsonFileExporter,
+    SimpleSpanProcessor,
+    TracingAsyncTransport,
+    parse_traceparent,
+    tracer,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "processor", SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    return exporter
+
+def test_parse_traceparent():
+    """traceparent ヘッダーの解析のテスト"""
+    context = parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert (context.trace_id, context.span_id, context.sampled) == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00").sampled is False
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("invalid") is None
+
+def test_request_spans_follow_upstream_sampling(client, registered_user, exporter):
+    """上流のtraceparentを引き継ぎ、リクエスト・サービス・SQLのスパンを記録するテスト"""
+    from services.auth_service import AuthService
+
+    token = AuthService.create_tokens(registered_user.id)["access_token"]
+    exporter.spans.clear()
+    response = client.get(
+        "/api/matching/hosts",
+        params={"token": token},
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"},
+    )
+    assert response.status_code == 200
+
+    spans = {span.name: span for span in exporter.spans}
+    root = spans["GET /api/matching/hosts"]
+    assert root.parent_span_id == PARENT_ID
+    assert root.attributes["http.response.status_code"] == 200
+    assert all(span.trace_id == TRACE_ID for span in exporter.spans)
+
+    service = spans["MatchingService.get_matched_hosts"]
+    assert service.parent_span_id == root.span_id
+    sql = [span for span in exporter.spans if span.name == "db.query"]
+    assert any(span.parent_span_id == service.span_id for span in sql)
+    assert all(span.attributes["db.system"] == "sqlite" for span in sql)
+
+def test_unsampled_request_records_nothing(client, exporter):
+    """サンプリング対象外のリクエストではスパンを記録しないことのテスト"""
+    client.get("/live", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+    client.get("/live")
+    assert exporter.spans == []
+
+def test_outbound_http_propagates_traceparent(exporter):
+    """外部HTTP呼び出しのスパン記録と traceparent の付与のテスト"""
+    received = {}
+
+    def handler(request):
+        received["traceparent"] = request.headers.get("traceparent")
+        return httpx.Response(200, json={"ok": True})
+
+    async def call():
+        with tracer.use_span(tracer.start_request(f"00-{TRACE_ID}-{PARENT_ID}-01", "job")):
+            async with httpx.AsyncClient(transport=TracingAsyncTransport(httpx.MockTransport(handler))) as http:
+                await http.post("http://vllm.internal:8001/v1/chat/completions?key=x", json={})
+
+    asyncio.run(call())
+    client_span = next(span for span in exporter.spans if span.name == "HTTP POST")
+    assert received["traceparent"] == f"00-{TRACE_ID}-{client_span.span_id}-01"
+    assert client_span.attributes["url.full"] == "http://vllm.internal:8001/v1/chat/completions"
+    assert client_span.attributes["http.response.status_code"] == 200
+
+def test_otlp_json_file_exporter(tmp_path, exporter):
+    """OTLP/JSON 形式でファイルに出力されることのテスト"""
+    with tracer.use_span(tracer.start_request(f"00-{TRACE_ID}-{PARENT_ID}-01", "GET /x")):
+        with tracer.start_as_current_span("child", attributes={"count": 3, "ok": True}):
+            pass
+
+    path = tmp_path / "traces.jsonl"
+    OTLPJsonFileExporter(str(path), service_name="test").export(exporter.spans)
+    data = json.loads(path.read_text().splitlines()[0])
+    resource_spans = data["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "test"}}]
+    spans = resource_spans["scopeSpans"][0]["spans"]
+    child = next(span for span in spans if span["name"] == "child")
+    assert child["traceId"] == TRACE_ID
+    assert {"key": "count", "value": {"intValue": "3"}} in child["attributes"]
+    assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
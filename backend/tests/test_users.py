@@ -46,4 +46,74 @@ def test_update_other_user_profile_forbidden(client, auth_headers, db_session):
 def test_get_nonexistent_user(client, auth_headers):
     """存在しないユーザーの取得テスト"""
     response = client.get("/users/99999", headers=auth_headers)
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_current_user_is_cached(client, registered_user, user_token, query_budget):
+    """認証ユーザーの2回目以降の取得でDBを参照しないことのテスト"""
+    response = client.get("/api/users/me", params={"token": user_token})
+    assert response.status_code == 200
+    assert response.json()["email"] == registered_user.email
+
+    with query_budget(0):
+        response = client.get("/api/users/me", params={"token": user_token})
+    assert response.status_code == 200
+
+def test_update_user_invalidates_cache(client, registered_user, user_token):
+    """ユーザー情報更新時にキャッシュが破棄されることのテスト"""
+    client.get("/api/users/me", params={"token": user_token})
+
+    response = client.put("/api/users/me", params={"token": user_token}, json={"name": "更新後の名前"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "更新後の名前"
+
+    response = client.get("/api/users/me", params={"token": user_token})
+    assert response.json()["name"] == "更新後の名前"
+
+def test_current_user_with_null_columns(client, registered_user, user_token, db_session):
+    """rating・review_count・interests が NULL のユーザーでも認証できることのテスト"""
+    from models import User
+    db_session.query(User).filter(User.id == registered_user.id).update(
+        {"rating": None, "review_count": None, "interests": None}, synchronize_session=False
+    )
+    db_session.commit()
+
+    response = client.get("/api/bookings/", params={"token": user_token})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("method,path,kwargs", [
+    ("put", "/api/users/me", {"json": {"name": "更新後の名前"}}),
+    ("post", "/api/users/upload-avatar", {"files": {"file": ("avatar.png", b"x", "image/png")}}),
+])
+def test_update_deleted_user_returns_404(client, registered_user, user_token, db_session, method, path, kwargs):
+    """スナップショットがキャッシュされたまま削除されたユーザーの更新は404になることのテスト"""
+    from models import User
+    assert client.get("/api/users/me", params={"token": user_token}).status_code == 200
+    db_session.query(User).filter(User.id == registered_user.id).delete()
+    db_session.commit()
+
+    response = client.request(method, path, params={"token": user_token}, **kwargs)
+    assert response.status_code == 404
+    # 削除されたユーザーのスナップショットは破棄し、以降はDBを参照する
+    assert client.get("/api/users/me", params={"token": user_token}).status_code == 404
+
+def test_invalid_token_rejected(client, registered_user):
+    """不正なトークンが拒否されることのテスト"""
+    response = client.get("/api/users/me", params={"token": "invalid-token"})
+    assert response.status_code == 401
+
+def test_get_users_by_ids(client, registered_user, db_session, query_budget):
+    """複数ユーザーを IN クエリ1回で指定順に取得できることのテスト"""
+    from models import User
+    other = User(name="別ユーザー", email="other@example.com", password_hash="x")
+    db_session.add(other)
+    db_session.commit()
+
+    ids = [other.id, 99999, registered_user.id]
+
+    with query_budget(1):
+        response = client.get("/api/users", params={"ids": ",".join(map(str, ids))})
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == [ids[0], ids[2]]
+    assert "password_hash" not in response.json()[0]
+
+    assert client.get("/api/users", params={"ids": ""}).status_code == 400
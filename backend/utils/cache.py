@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import redis
+
+# Redis共有キャッシュ設定（未設定の場合はプロセス内キャッシュのみ）
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", os.getenv("REDIS_URL", ""))
+CACHE_REDIS_TIMEOUT = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.05"))
+# Redis障害時に再接続を試みるまでの秒数
+CACHE_REDIS_RETRY_SECONDS = float(os.getenv("CACHE_REDIS_RETRY_SECONDS", "30"))
+
+_MISSING = object()
+
+# 生成済みのTieredCache（テスト時の一括クリア用）
+_tiered_caches = []
+
+
+class TTLCache:
+    """上限付きTTLキャッシュ（上限を超えたら最も古く使われたものから削除）"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_redis_client = None
+_redis_down_until = 0.0
+_redis_lock = threading.Lock()
+
+
+def get_redis_client():
+    """共有Redisクライアントを取得（未設定・障害中はNone）"""
+    global _redis_client
+    if not CACHE_REDIS_URL or time.monotonic() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    CACHE_REDIS_URL,
+                    socket_timeout=CACHE_REDIS_TIMEOUT,
+                    socket_connect_timeout=CACHE_REDIS_TIMEOUT,
+                )
+    return _redis_client
+
+
+def mark_redis_down():
+    """Redis障害を記録し、一定時間はRedisを使わない"""
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + CACHE_REDIS_RETRY_SECONDS
+
+
+class TieredCache:
+    """プロセス内TTLキャッシュ + Redis共有層の2段キャッシュ
+
+    Redisが未設定・障害中の場合はプロセス内キャッシュのみで動作する。
+    削除はRedisと自プロセスに反映され、他ワーカーのプロセス内キャッシュは
+    local_ttl 経過後に失効する。
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        local_ttl: Optional[float] = None,
+        dumps: Callable[[Any], str] = json.dumps,
+        loads: Callable[[Any], Any] = json.loads,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_ttl = ttl if local_ttl is None else min(local_ttl, ttl)
+        self.local = TTLCache(maxsize=maxsize, ttl=self.local_ttl)
+        self.dumps = dumps
+        self.loads = loads
+        # ヒット・ミス数（統計用のためロックは取らない）
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        _tiered_caches.append(self)
+
+    def _redis_key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        """キャッシュから取得（存在しない場合はNone）"""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+
+        client = get_redis_client()
+        if client is None:
+            self.misses += 1
+            return None
+        try:
+            raw = client.get(self._redis_key(key))
+        except redis.RedisError:
+            mark_redis_down()
+            self.misses += 1
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+
+        value = self.loads(raw)
+        self.local.set(key, value)
+        self.redis_hits += 1
+        return value
+
+    def get_many(self, keys) -> dict:
+        """複数キーを取得（Redisへの問い合わせは MGET 1回。存在するキーのみ返す）"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                self.local_hits += 1
+                found[key] = value
+        if not missing:
+            return found
+
+        client = get_redis_client()
+        if client is None:
+            self.misses += len(missing)
+            return found
+        try:
+            raws = client.mget([self._redis_key(key) for key in missing])
+        except redis.RedisError:
+            mark_redis_down()
+            self.misses += len(missing)
+            return found
+        for key, raw in zip(missing, raws):
+            if raw is None:
+                self.misses += 1
+                continue
+            value = self.loads(raw)
+            self.local.set(key, value)
+            self.redis_hits += 1
+            found[key] = value
+        return found
+
+    def set_many(self, items: dict, ttl: Optional[float] = None):
+        """複数キーを保存（Redisへはパイプラインで1往復）"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or not items:
+            return
+        for key, value in items.items():
+            self.local.set(key, value, min(ttl, self.local_ttl))
+
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipeline.set(self._redis_key(key), self.dumps(value), px=int(ttl * 1000))
+            pipeline.execute()
+        except redis.RedisError:
+            mark_redis_down()
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """キャッシュに保存（ttlはRedis層の有効期限、プロセス内はlocal_ttlが上限）"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self.local.set(key, value, min(ttl, self.local_ttl))
+
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            client.set(self._redis_key(key), self.dumps(value), px=int(ttl * 1000))
+        except redis.RedisError:
+            mark_redis_down()
+
+    def delete(self, key):
+        """キャッシュから削除"""
+        self.local.delete(key)
+
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            client.delete(self._redis_key(key))
+        except redis.RedisError:
+            mark_redis_down()
+
+    def clear_local(self):
+        """プロセス内キャッシュのみをクリア"""
+        self.local.clear()
+
+    def stats(self) -> dict:
+        """ヒット・ミス数を取得"""
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "size": len(self.local),
+        }
+
+
+def clear_local_caches():
+    """全TieredCacheのプロセス内キャッシュをクリア"""
+    for cache in _tiered_caches:
+        cache.clear_local()
+
+
+def cache_stats() -> dict:
+    """全TieredCacheの統計を名前空間ごとに取得"""
+    return {cache.namespace: cache.stats() for cache in _tiered_caches}
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+
+from utils.metrics import Counter, Gauge, Histogram, route_label
+
+logger = logging.getLogger(__name__)
+
+# イベントループ遅延の計測間隔（秒）
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between a scheduled wakeup and its execution on the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_lag_last_seconds = Gauge(
+    "event_loop_lag_last_seconds",
+    "Most recently observed event loop delay",
+    mode="max",
+)
+
+
+async def monitor_event_loop(interval: float = EVENT_LOOP_LAG_INTERVAL):
+    """一定間隔でスリープし、予定時刻からの遅れをイベントループ遅延として記録"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled)
+        event_loop_lag_seconds.observe(lag)
+        event_loop_lag_last_seconds.set(lag)
+
+
+# 以下は EVENT_LOOP_WATCHDOG=true の場合のみ有効（イベントループを止めている処理の特定用）
+EVENT_LOOP_WATCHDOG = os.getenv("EVENT_LOOP_WATCHDOG", "false").lower() == "true"
+# この秒数以上イベントループが応答しない場合にスタックを取得
+EVENT_LOOP_BLOCK_THRESHOLD = float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD", "0.1"))
+
+event_loop_blocks_total = Counter(
+    "event_loop_blocks_total",
+    "Times the event loop was blocked longer than the threshold",
+    ("route",),
+)
+event_loop_blocked_seconds_total = Counter(
+    "event_loop_blocked_seconds_total",
+    "Seconds the event loop was blocked, by the route that blocked it",
+    ("route",),
+)
+
+
+class LoopWatchdog:
+    """イベントループを止めている処理を検出する監視スレッド
+
+    ループ上のタスクが定期的にハートビートを更新し、別スレッドがその途絶を監視する。
+    閾値を超えて途絶えた時点でループスレッドのスタックと実行中のルートを記録し、
+    再開した時点でブロック時間をルートごとのメトリクスに加算する。
+    """
+
+    def __init__(self, threshold: float = EVENT_LOOP_BLOCK_THRESHOLD, history: int = 50):
+        self.threshold = threshold
+        self.heartbeat_interval = threshold / 2
+        # 処理中のリクエスト（タスク -> ASGI scope）。LoopWatchdogMiddleware が登録する
+        self.active: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+        self.recent_blocks: deque = deque(maxlen=history)
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """ループスレッドから呼び出す"""
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = loop.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    async def _beat(self):
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _current_route(self) -> str:
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        scope = self.active.get(task) if task is not None else None
+        if scope is None:
+            return "background"
+        return route_label(scope)
+
+    def _capture_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return "".join(traceback.format_stack(frame)) if frame is not None else ""
+
+    def _watch(self):
+        stall = None
+        while not self._stopped.wait(self.heartbeat_interval / 2):
+            heartbeat = self._heartbeat
+            now = time.monotonic()
+
+            if stall is None:
+                if now - heartbeat > self.heartbeat_interval + self.threshold:
+                    # ブロック中にスタックとルートを取得
+                    stall = {"heartbeat": heartbeat, "route": self._current_route(), "stack": self._capture_stack()}
+                    logger.warning(
+                        "Event loop blocked for %.3fs on %s\n%s",
+                        now - heartbeat - self.heartbeat_interval, stall["route"], stall["stack"],
+                    )
+            elif heartbeat != stall["heartbeat"]:
+                # ループ再開：ブロック時間を記録
+                blocked = max(0.0, heartbeat - stall["heartbeat"] - self.heartbeat_interval)
+                event_loop_blocks_total.inc((stall["route"],))
+                event_loop_blocked_seconds_total.inc((stall["route"],), blocked)
+                self.recent_blocks.append({
+                    "route": stall["route"],
+                    "blocked_seconds": round(blocked, 4),
+                    "stack": stall["stack"],
+                    "timestamp": time.time(),
+                })
+                logger.warning("Event loop resumed after %.3fs blocked by %s", blocked, stall["route"])
+                stall = None
+
+
+loop_watchdog = LoopWatchdog()
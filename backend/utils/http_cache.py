@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLiteではタイムゾーンなしで返るためUTCとして扱う
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def make_etag(*parts) -> str:
+    """行バージョン等から強いETagを生成"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()}"'
+
+
+# 行バージョンには updated_at を使う。SQLiteのCURRENT_TIMESTAMPは秒単位のため、モデルの updated_at は
+# 更新時にアプリ側で秒未満まで記録する（同じ秒内の更新でもETagが変わるように）
+def entity_etag(kind: str, entity) -> str:
+    """単一エンティティのETag（IDと更新日時から生成）"""
+    return make_etag(kind, entity.id, _version(entity))
+
+
+def list_etag(kind: str, entities: Iterable) -> str:
+    """一覧のETag（各行のIDと更新日時のハッシュ）"""
+    return make_etag(kind, *(f"{entity.id}:{_version(entity)}" for entity in entities))
+
+
+def _version(entity) -> str:
+    version = getattr(entity, "updated_at", None) or getattr(entity, "created_at", None)
+    return _as_utc(version).isoformat() if version else ""
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """条件付きGETで304を返せるかを判定（If-None-Matchを優先）
+
+    一覧では last_modified を渡さないこと（行が除外されても更新日時の最大値は変わらないため）
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # nginxのgzip等で弱いETagに変換される場合があるため弱い比較を行う
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    """レスポンスにETag・Last-Modifiedを設定"""
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """304レスポンスを作成（レスポンスモデルのシリアライズは行わない）"""
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,204 @@
+"""構造化ログ（JSON Lines）
+
+アプリのスレッドではレコードをキューに積むだけで、整形・秘匿化・ファイル書き込みは
+QueueListener のスレッドで行う。キューが満杯の場合はレコードを破棄し件数のみ記録する
+（負荷が高いときにログがリクエスト処理を遅らせないため）。
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from utils.metrics import Counter
+from utils.tracing import current_span
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+# ログファイル名（空にするとファイルには出力しない）
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 標準エラー出力にも出力するか（docker logs 用）
+LOG_STDERR = os.getenv("LOG_STDERR", "true").lower() == "true"
+# DEBUGログを出力するリクエストの割合（既定値と、ルートごとの指定 "/api/hosts=0.1,/api/matching/hosts=0.5"）
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+LOG_DEBUG_SAMPLE_RATES = os.getenv("LOG_DEBUG_SAMPLE_RATES", "")
+
+log_records_dropped_total = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# リクエストID・ASGI scope・DEBUGログを出力するか（RequestContextMiddleware が設定）
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_scope_var: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=True)
+
+REDACTED = "[REDACTED]"
+_SECRET_KEYS = re.compile(r"(password|passwd|secret|token|authorization|cookie|api_key)", re.IGNORECASE)
+_SECRET_PATTERNS = [
+    # JWT
+    (re.compile(r"eyJ[\w-]+\.eyJ[\w-]+\.[\w-]+"), REDACTED),
+    # key=value / key: value / 'key': 'value' 形式
+    (
+        re.compile(r"""(?P<key>["']?\b(?:password|passwd|secret|\w*token|authorization|api_key)\b["']?\s*[:=]\s*)(?P<quote>["']?)(?:Bearer\s+)?[^\s"',}]+""", re.IGNORECASE),
+        r"\g<key>\g<quote>" + REDACTED,
+    ),
+    # Authorization: Bearer xxx
+    (re.compile(r"(Bearer\s+)[\w.~+/-]+=*", re.IGNORECASE), r"\1" + REDACTED),
+]
+
+# LogRecord 標準の属性（これ以外は extra として出力する）
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "trace_id", "route"}
+
+
+def redact(value):
+    """文字列・dict・list に含まれる秘匿情報をマスク"""
+    if isinstance(value, str):
+        for pattern, replacement in _SECRET_PATTERNS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if isinstance(key, str) and _SECRET_KEYS.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            route, rate = item.rsplit("=", 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+_debug_sample_rates = parse_sample_rates(LOG_DEBUG_SAMPLE_RATES)
+
+
+def sample_debug(path: str) -> bool:
+    """このリクエストでDEBUGログを出力するか（リクエスト単位でまとめて判定）"""
+    rate = _debug_sample_rates.get(path, LOG_DEBUG_SAMPLE_RATE)
+    return rate >= 1.0 or random.random() < rate
+
+
+class RequestContextFilter(logging.Filter):
+    """リクエストID・ルートを付与し、サンプリング対象外のリクエストのDEBUGログを除外"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and not debug_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None and span.sampled else None
+        scope = request_scope_var.get()
+        if scope is not None:
+            route = scope.get("route")
+            record.route = getattr(route, "path", None) or scope.get("path")
+        else:
+            record.route = None
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """キューに積むだけのハンドラー（満杯の場合は破棄）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 引数の埋め込みと例外の文字列化のみ行い、整形はリスナー側で行う
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+class JSONFormatter(logging.Formatter):
+    """1レコード1行のJSON（秘匿情報はマスク）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for key in ("request_id", "trace_id", "route"):
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = REDACTED if _SECRET_KEYS.search(key) else redact(value)
+        if record.exc_text:
+            data["exc"] = redact(record.exc_text)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def configure_logging(log_dir: str = LOG_DIR, level: str = LOG_LEVEL) -> logging.handlers.QueueListener:
+    """ルートロガーをキュー経由のJSONログに設定（二重に呼び出した場合は何もしない）"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    formatter = JSONFormatter()
+    handlers = []
+    if LOG_FILE:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, LOG_FILE),
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if LOG_STDERR:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """キューに残ったログを書き出して停止"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
@@ -0,0 +1,232 @@
+"""tracemalloc によるメモリスナップショットと差分
+
+トレース中はメモリ確保ごとにコストがかかるため、管理用エンドポイントから必要な間だけ有効にする。
+差分はモジュール（ファイル）・行・ルート（確保時のスタックに含まれるエンドポイント関数）単位で集計する。
+"""
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 確保時に記録するスタックの深さ（ルート単位の集計にはエンドポイント関数まで届く深さが必要）
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "30"))
+# 保持するスナップショット数（ベースラインは別枠）
+MEMORY_SNAPSHOT_KEEP = int(os.getenv("MEMORY_SNAPSHOT_KEEP", "5"))
+# 定期スナップショットの間隔（秒、0は無効）。起動時からトレースを有効にする
+MEMORY_SNAPSHOT_INTERVAL = float(os.getenv("MEMORY_SNAPSHOT_INTERVAL", "0"))
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+GROUP_BY = ("module", "lineno", "route")
+
+
+def _display_path(filename: str) -> str:
+    """アプリ内はbackendからの相対パス、ライブラリは site-packages 以下のパス"""
+    if filename.startswith(BASE_DIR + os.sep):
+        return os.path.relpath(filename, BASE_DIR)
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def route_spans(routes: Iterable) -> List[tuple]:
+    """エンドポイント関数のソース範囲（ファイル, 開始行, 終了行, ルート名）"""
+    spans = []
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            continue
+        lines = [line for _, _, line in code.co_lines() if line is not None]
+        methods = ",".join(sorted(getattr(route, "methods", None) or []))
+        spans.append((code.co_filename, code.co_firstlineno, max(lines or [code.co_firstlineno]), f"{methods} {route.path}"))
+    return spans
+
+
+def _route_of(traceback, spans: List[tuple]) -> str:
+    # 確保箇所に近いフレームから順にエンドポイント関数を探す
+    for frame in reversed(traceback):
+        for filename, first, last, label in spans:
+            if frame.filename == filename and first <= frame.lineno <= last:
+                return label
+    return "other"
+
+
+class MemoryTracker:
+    """スナップショットの取得・保持・差分"""
+
+    def __init__(self, keep: int = MEMORY_SNAPSHOT_KEEP):
+        self.keep = keep
+        self.snapshots: "OrderedDict[int, dict]" = OrderedDict()
+        self.baseline_id: Optional[int] = None
+        self.routes: list = []
+        self.last_scheduled_diff: Optional[dict] = None
+        self.schedule_interval: Optional[float] = None
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._schedule_stop = threading.Event()
+        self._schedule_thread: Optional[threading.Thread] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """トレースを停止し、保持しているスナップショットを破棄"""
+        self.unschedule()
+        tracemalloc.stop()
+        with self._lock:
+            self.snapshots.clear()
+            self.baseline_id = None
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        return {
+            "tracing": self.tracing,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "baseline_id": self.baseline_id,
+            "schedule_interval": self.schedule_interval,
+            "snapshots": [self._info(snapshot_id) for snapshot_id in self.snapshots],
+        }
+
+    def _info(self, snapshot_id: int) -> dict:
+        entry = self.snapshots[snapshot_id]
+        return {
+            "id": snapshot_id,
+            "label": entry["label"],
+            "taken_at": entry["taken_at"],
+            "traced_bytes": entry["traced_bytes"],
+            "baseline": snapshot_id == self.baseline_id,
+        }
+
+    def take_snapshot(self, label: Optional[str] = None, baseline: bool = False) -> dict:
+        """スナップショットを取得（トレース停止中は RuntimeError）"""
+        if not self.tracing:
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self.snapshots[snapshot_id] = {
+                "snapshot": snapshot,
+                "label": label,
+                "taken_at": time.time(),
+                "traced_bytes": tracemalloc.get_traced_memory()[0],
+            }
+            if baseline or self.baseline_id is None:
+                self.baseline_id = snapshot_id
+            # ベースライン以外の古いものから破棄
+            while len(self.snapshots) > self.keep + 1:
+                oldest = next(key for key in self.snapshots if key != self.baseline_id)
+                del self.snapshots[oldest]
+        return self._info(snapshot_id)
+
+    def _get(self, snapshot_id: int):
+        entry = self.snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(f"Snapshot {snapshot_id} not found")
+        return entry["snapshot"]
+
+    def diff(
+        self,
+        snapshot_id: Optional[int] = None,
+        baseline_id: Optional[int] = None,
+        group_by: str = "module",
+        limit: int = 20,
+        routes: Optional[Iterable] = None,
+    ) -> dict:
+        """ベースラインとの差分（増加量の多い順）。snapshot_id 省略時は新たに取得する"""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        baseline_id = baseline_id or self.baseline_id
+        if baseline_id is None:
+            raise ValueError("No baseline snapshot")
+        baseline = self._get(baseline_id)
+        if snapshot_id is None:
+            snapshot_id = self.take_snapshot(label="diff")["id"]
+        current = self._get(snapshot_id)
+
+        if group_by == "route":
+            spans = route_spans(routes if routes is not None else self.routes)
+            grouped = {}
+            for stat in current.compare_to(baseline, "traceback"):
+                entry = grouped.setdefault(_route_of(stat.traceback, spans), {"size_diff": 0, "count_diff": 0, "size": 0})
+                entry["size_diff"] += stat.size_diff
+                entry["count_diff"] += stat.count_diff
+                entry["size"] += stat.size
+            top = [{"key": key, **values} for key, values in grouped.items()]
+        else:
+            key_type = "filename" if group_by == "module" else "lineno"
+            top = []
+            for stat in current.compare_to(baseline, key_type):
+                frame = stat.traceback[0]
+                key = _display_path(frame.filename)
+                if group_by == "lineno":
+                    key = f"{key}:{frame.lineno}"
+                top.append({"key": key, "size_diff": stat.size_diff, "count_diff": stat.count_diff, "size": stat.size})
+
+        top.sort(key=lambda entry: entry["size_diff"], reverse=True)
+        return {
+            "baseline_id": baseline_id,
+            "snapshot_id": snapshot_id,
+            "group_by": group_by,
+            "total_size_diff": sum(entry["size_diff"] for entry in top),
+            "top": top[:limit],
+        }
+
+    def schedule(self, interval: float, routes: Optional[Iterable] = None):
+        """interval 秒ごとにスナップショットを取得し、直前との差分をログに出力"""
+        self.unschedule()
+        self.start()
+        if routes is not None:
+            self.routes = list(routes)
+        self.schedule_interval = interval
+        self._schedule_stop.clear()
+        self._schedule_thread = threading.Thread(target=self._run_schedule, args=(interval,), name="memory-snapshots", daemon=True)
+        self._schedule_thread.start()
+
+    def unschedule(self):
+        self._schedule_stop.set()
+        if self._schedule_thread is not None:
+            self._schedule_thread.join(timeout=5)
+        self._schedule_thread = None
+        self.schedule_interval = None
+
+    def _run_schedule(self, interval: float):
+        previous = self.take_snapshot(label="scheduled")["id"]
+        while not self._schedule_stop.wait(interval):
+            try:
+                current = self.take_snapshot(label="scheduled")["id"]
+                group_by = "route" if self.routes else "module"
+                diff = self.diff(current, previous if previous in self.snapshots else None, group_by=group_by, limit=10)
+            except (KeyError, RuntimeError, ValueError):
+                logger.exception("Scheduled memory snapshot failed")
+                continue
+            self.last_scheduled_diff = diff
+            previous = current
+            logger.info(
+                "Memory growth since previous snapshot: %+d bytes; top: %s",
+                diff["total_size_diff"],
+                ", ".join(f"{entry['key']} {entry['size_diff']:+d}" for entry in diff["top"][:5]),
+            )
+
+
+memory_tracker = MemoryTracker()
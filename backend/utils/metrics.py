@@ -0,0 +1,298 @@
+"""Prometheus テキスト形式のメトリクス
+
+記録はイベントループ上の単純な dict 更新のみで、ロックは取らない
+（PoolMetrics と同様、スレッドから記録した場合の僅かな取りこぼしは許容する）。
+
+複数ワーカー（uvicorn --workers / gunicorn）の場合は METRICS_MULTIPROC_DIR を
+全ワーカー共通のディレクトリに設定する。各ワーカーが定期的に自身の値を
+worker_<pid>.json に書き出し、/metrics は全ワーカー分を合算して返す。
+デプロイ時（全ワーカー起動前）にディレクトリを空にすること。
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", os.getenv("PROMETHEUS_MULTIPROC_DIR", ""))
+# ワーカーごとの値をファイルに書き出す間隔（秒）
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    type = ""
+    mode = "sum"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples: Dict[tuple, object] = {}
+        (registry or REGISTRY).register(self)
+
+    def _snapshot_value(self, value):
+        return value
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "mode": self.mode,
+            "samples": [[list(labels), self._snapshot_value(value)] for labels, value in list(self._samples.items())],
+        }
+
+
+class Counter(_Metric):
+    """単調増加するカウンター（ワーカー間で合算）"""
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        self._samples[labels] = self._samples.get(labels, 0.0) + amount
+
+    def set_total(self, value: float, labels: tuple = ()):
+        """他で集計済みの累積値を反映（コレクター用）"""
+        self._samples[labels] = float(value)
+
+
+class Gauge(_Metric):
+    """現在値
+
+    mode: "sum"（稼働中ワーカーの合計）、"max"（最大値）、"pid"（ワーカーごとに pid ラベルを付与）
+    停止したワーカーの値は合算しない。
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), mode: str = "sum", registry=None):
+        if mode not in ("sum", "max", "pid"):
+            raise ValueError(f"Unknown gauge mode: {mode}")
+        self.mode = mode
+        super().__init__(name, documentation, labelnames, registry)
+
+    def set(self, value: float, labels: tuple = ()):
+        self._samples[labels] = float(value)
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        self._samples[labels] = self._samples.get(labels, 0.0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1.0):
+        self._samples[labels] = self._samples.get(labels, 0.0) - amount
+
+
+class Histogram(_Metric):
+    """固定バケットのヒストグラム（ワーカー間で合算）"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, labels: tuple = ()):
+        state = self._samples.get(labels)
+        if state is None:
+            # [バケットごとの件数（末尾は+Inf）, 合計, 件数]
+            state = self._samples[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _snapshot_value(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    """メトリクスの登録先"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """スナップショット取得時に呼ばれる関数を登録（プール状態など外部の値の反映用）"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """このプロセスの全メトリクスを取得"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+    def write_snapshot(self, snapshot: dict, directory: str = None):
+        """ワーカーの値を共有ディレクトリに書き出す（一時ファイル経由で置き換え）"""
+        directory = directory or METRICS_MULTIPROC_DIR
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"worker_{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pid": os.getpid(), "metrics": snapshot}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def collect(self, directory: str = None, own: Optional[dict] = None) -> dict:
+        """全ワーカー分を合算したメトリクスを取得（own はこのプロセスのスナップショット。省略時はここで取得）"""
+        directory = directory or METRICS_MULTIPROC_DIR
+        own = self.snapshot() if own is None else own
+        workers = [(os.getpid(), True, own)]
+        if directory:
+            self.write_snapshot(own, directory)
+            workers += _read_worker_snapshots(directory, exclude_pid=os.getpid())
+        return merge_snapshots(workers)
+
+    def render(self, directory: str = None) -> str:
+        return render(self.collect(directory))
+
+
+def route_label(scope) -> str:
+    """ルートのパステンプレート（/api/hosts/{host_id} 等）。未マッチは件数が増えないよう固定値にする"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_worker_snapshots(directory: str, exclude_pid: int) -> List[Tuple[int, bool, dict]]:
+    workers = []
+    for path in glob.glob(os.path.join(directory, "worker_*.json")):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        pid = data.get("pid")
+        if pid == exclude_pid:
+            continue
+        workers.append((pid, _pid_alive(pid), data.get("metrics", {})))
+    return workers
+
+
+def merge_snapshots(workers: List[Tuple[int, bool, dict]]) -> dict:
+    """ワーカーごとのスナップショットを合算
+
+    カウンター・ヒストグラムは停止したワーカー分も含めて合計し、
+    ゲージは稼働中のワーカーのみを mode に従って集約する。
+    """
+    merged: Dict[str, dict] = {}
+    for pid, alive, metrics in workers:
+        for name, metric in metrics.items():
+            kind, mode = metric["type"], metric.get("mode", "sum")
+            target = merged.get(name)
+            if target is None:
+                labelnames = list(metric["labelnames"])
+                if kind == "gauge" and mode == "pid":
+                    labelnames.append("pid")
+                target = merged[name] = {
+                    "type": kind,
+                    "help": metric["help"],
+                    "labelnames": labelnames,
+                    "buckets": metric.get("buckets"),
+                    "samples": {},
+                }
+            samples = target["samples"]
+
+            if kind == "gauge" and not alive:
+                continue
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if kind == "histogram":
+                    state = samples.get(key)
+                    if state is None:
+                        samples[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        state[0] = [a + b for a, b in zip(state[0], value[0])]
+                        state[1] += value[1]
+                        state[2] += value[2]
+                elif kind == "gauge" and mode == "pid":
+                    samples[key + (str(pid),)] = value
+                elif kind == "gauge" and mode == "max":
+                    samples[key] = max(samples.get(key, value), value)
+                else:
+                    samples[key] = samples.get(key, 0.0) + value
+    return merged
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(merged: dict) -> str:
+    """Prometheus テキスト形式に変換"""
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] == "histogram":
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                    cumulative += bucket_count
+                    le = _format_value(bound) if bound != float("inf") else "+Inf"
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, ('le', le))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+            else:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+async def flush_periodically(registry: "MetricsRegistry" = None, interval: float = METRICS_FLUSH_INTERVAL):
+    """ワーカーの値を定期的に共有ディレクトリへ書き出す（複数ワーカー時のみ）"""
+    registry = registry or REGISTRY
+    if not METRICS_MULTIPROC_DIR:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        # スナップショットはイベントループ上で取り、書き込みのみスレッドで行う
+        snapshot = registry.snapshot()
+        try:
+            await asyncio.to_thread(registry.write_snapshot, snapshot)
+        except OSError:
+            logger.exception("Failed to write metrics snapshot")
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,177 @@
+"""オンデマンドのサンプリングプロファイラー
+
+停止中はスレッドもフックもなく、ミドルウェアの属性参照1回分のコストのみ。
+実行中は別スレッドが一定間隔で全スレッドのスタック（sys._current_frames）を取得し、
+collapsed stack 形式（flamegraph.pl / speedscope で読み込み可能）で logs/ に書き出す。
+プロファイルはワーカープロセスごと（リクエストを受けたワーカーのみ）。
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+# 出力先・サンプリング間隔（秒）・最大実行秒数
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs")
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "300"))
+
+# 待機中のスレッド（イベントループの select、スレッドプールの待ち行列など）は除外する
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+
+
+class ProfileSession:
+    """1回分のプロファイル（秒数指定、または条件に合うリクエストM件分）"""
+
+    def __init__(self, seconds: Optional[float], requests: Optional[int], route: Optional[str], interval: float):
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + min(seconds or PROFILER_MAX_SECONDS, PROFILER_MAX_SECONDS)
+        self.route = re.compile(route) if route else None
+        # リクエスト数指定の場合は条件に合うリクエストの処理中のみサンプリングする
+        self.request_mode = requests is not None
+        self.remaining = requests
+        self.interval = interval
+        self.active = 0
+        self.requests_profiled = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def matches(self, path: str) -> bool:
+        return self.route is None or self.route.search(path) is not None
+
+    def request_started(self):
+        with self._lock:
+            self.active += 1
+
+    def request_finished(self):
+        with self._lock:
+            self.active -= 1
+            self.requests_profiled += 1
+            if self.remaining is not None:
+                self.remaining -= 1
+                if self.remaining <= 0:
+                    self.stop_event.set()
+
+    def status(self) -> dict:
+        return {
+            "running": True,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 3),
+            "remaining_seconds": round(max(0.0, self.deadline - time.monotonic()), 3),
+            "route": self.route.pattern if self.route else None,
+            "remaining_requests": self.remaining,
+            "requests_profiled": self.requests_profiled,
+            "samples": self.samples,
+        }
+
+
+class SamplingProfiler:
+    """サンプリングプロファイラー（同時に実行できるのは1セッションのみ）"""
+
+    def __init__(self, output_dir: str = PROFILE_DIR):
+        self.output_dir = output_dir
+        self.session: Optional[ProfileSession] = None
+        self.last_result: Optional[dict] = None
+        self._thread: Optional[threading.Thread] = None
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.session is not None
+
+    def start(
+        self,
+        seconds: Optional[float] = None,
+        requests: Optional[int] = None,
+        route: Optional[str] = None,
+        interval: float = PROFILER_INTERVAL,
+    ) -> dict:
+        """プロファイルを開始（既に実行中の場合は RuntimeError）"""
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError("Profiler is already running")
+            session = ProfileSession(seconds, requests, route, interval)
+            self.session = session
+            self._thread = threading.Thread(target=self._run, args=(session,), name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return session.status()
+
+    def stop(self, timeout: float = 5.0) -> Optional[dict]:
+        """実行中のプロファイルを終了して結果を返す"""
+        session, thread = self.session, self._thread
+        if session is None:
+            return self.last_result
+        session.stop_event.set()
+        thread.join(timeout)
+        return self.last_result
+
+    def track_request(self, path: str) -> Optional[ProfileSession]:
+        """リクエスト数指定のプロファイル中で条件に合う場合にセッションを返す（ミドルウェア用）"""
+        session = self.session
+        if session is None or not session.request_mode or not session.matches(path):
+            return None
+        session.request_started()
+        return session
+
+    def _label(self, code, frame) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+            label = self._labels[code] = f"{module}:{code.co_name}"
+        return label
+
+    def _collapse(self, frame) -> Optional[str]:
+        if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+            return None
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code, frame))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self, session: ProfileSession):
+        own_thread = threading.get_ident()
+        try:
+            while not session.stop_event.wait(session.interval):
+                if time.monotonic() >= session.deadline:
+                    break
+                if session.request_mode and session.active == 0:
+                    continue
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    stack = self._collapse(frame)
+                    if stack:
+                        session.stacks[stack] += 1
+                session.samples += 1
+        finally:
+            self.last_result = self._write(session)
+            self.session = None
+
+    def _write(self, session: ProfileSession) -> dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+        path = os.path.join(self.output_dir, filename)
+        with open(path, "w") as f:
+            for stack, count in session.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # 末尾の関数ごとのサンプル数（自己時間）
+        leaf_counts: Counter = Counter()
+        for stack, count in session.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "path": path,
+            "duration_seconds": round(time.monotonic() - session.started_at, 3),
+            "samples": session.samples,
+            "requests_profiled": session.requests_profiled,
+            "top_functions": [{"function": name, "samples": count} for name, count in leaf_counts.most_common(20)],
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,47 @@
+import json
+from functools import lru_cache
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson未導入の環境では標準jsonで代替
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """orjsonでエンコードするJSONレスポンス（アプリ全体のデフォルト）"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+@lru_cache(maxsize=256)
+def get_adapter(schema) -> TypeAdapter:
+    """レスポンススキーマごとのTypeAdapterを取得（初回のみ生成）"""
+    return TypeAdapter(schema)
+
+
+def dump_json(schema, obj) -> bytes:
+    """ORMオブジェクト・行タプルを属性参照で検証し、そのままJSONバイト列にする"""
+    adapter = get_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+
+def model_response(schema, obj, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """response_modelの検証・jsonable_encoderを経由せずにレスポンスを作成"""
+    return Response(
+        content=dump_json(schema, obj),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
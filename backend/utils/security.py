@@ -1,8 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import hmac
+import os
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status
+from fastapi import Header, HTTPException, status
+from utils.cache import TieredCache
 
 # パスワードハッシュ化の設定
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -13,6 +18,22 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# 管理用エンドポイントのトークン（未設定の場合は管理用エンドポイントを無効化）
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# 検証済みトークンのキャッシュ設定
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+
+# 検証済みトークン（SHA-256）→ クレーム
+_token_cache = TieredCache("auth:token", maxsize=TOKEN_CACHE_MAXSIZE, ttl=TOKEN_CACHE_TTL)
+
+def _credentials_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials"
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """パスワードを検証"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -45,19 +66,52 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
-    """トークンを検証"""
+def decode_token(token: str) -> dict:
+    """トークンを検証してクレームを返す（検証結果は有効期限内のみキャッシュ）"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+
+    claims = _token_cache.get(key)
+    if claims is not None:
+        if claims.get("exp", 0) > now:
+            return claims
+        _token_cache.delete(key)
+        raise _credentials_exception()
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-        return user_id
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
\ No newline at end of file
+        raise _credentials_exception()
+
+    if "exp" in claims:
+        _token_cache.set(key, claims, claims["exp"] - now)
+    return claims
+
+def is_valid_token(token: str) -> bool:
+    """トークンが有効かを判定（プロセス内キャッシュと署名の検証のみで、Redis は参照しない。イベントループ上で使用できる）"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+    claims = _token_cache.local.get(key)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return False
+        if claims.get("exp", 0) > now:
+            _token_cache.local.set(key, claims, claims["exp"] - now)
+    return claims.get("exp", 0) > now
+
+def verify_token(token: str):
+    """トークンを検証"""
+    payload = decode_token(token)
+    user_id: int = payload.get("sub")
+    if user_id is None:
+        raise _credentials_exception()
+    return user_id
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """管理用エンドポイントの認証（X-Admin-Token ヘッダー）"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
@@ -0,0 +1,132 @@
+"""同一リクエストの集約（single-flight）
+
+人気の宿主への同時アクセスなど、同じ内容の読み取りが同時に来た場合に、
+ワーカー内では最初の1件の処理（スレッドで実行）の結果を他のリクエストと共有する。
+結果は複数のリクエストで共有されるため、変更されない値（frozen なスナップショット・bytes 等）を返すこと。
+
+SINGLE_FLIGHT_REDIS_LOCK を有効にすると、キャッシュミス時の読み込みを Redis のロックで
+ワーカー間でも1つに絞り、他のワーカーはキャッシュが埋まるのを待つ（キャッシュスタンピード対策）。
+"""
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict
+from urllib.parse import urlencode
+
+import redis
+from fastapi import Request
+
+from utils.cache import TieredCache, get_redis_client, mark_redis_down
+from utils.metrics import Counter
+
+# ワーカー内の集約の有効・無効
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+# キャッシュミス時の Redis ロック（ロックの有効期限・他ワーカーの読み込みを待つ最大時間・確認間隔。ミリ秒）
+SINGLE_FLIGHT_REDIS_LOCK = os.getenv("SINGLE_FLIGHT_REDIS_LOCK", "false").lower() == "true"
+SINGLE_FLIGHT_LOCK_TTL_MS = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_MS", "5000"))
+SINGLE_FLIGHT_LOCK_WAIT_MS = int(os.getenv("SINGLE_FLIGHT_LOCK_WAIT_MS", "500"))
+SINGLE_FLIGHT_LOCK_POLL_MS = int(os.getenv("SINGLE_FLIGHT_LOCK_POLL_MS", "20"))
+
+single_flight_requests_total = Counter(
+    "single_flight_requests_total",
+    "Requests that ran a computation (leader) or shared an in-flight one (coalesced)",
+    ("name", "result"),
+)
+single_flight_lock_waits_total = Counter(
+    "single_flight_lock_waits_total",
+    "Cache fills that waited for another worker holding the Redis lock",
+    ("name", "result"),
+)
+
+# 自分が取得したロックのみを削除する
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def request_key(request: Request, *exclude: str) -> str:
+    """パスと正規化したクエリパラメータ（順序を揃え、exclude のパラメータを除く）からキーを作る"""
+    params = sorted((name, value) for name, value in request.query_params.multi_items() if name not in exclude)
+    return f"{request.url.path.rstrip('/')}?{urlencode(params)}"
+
+
+class SingleFlight:
+    """キーごとに処理中の計算を1つに集約する（イベントループ上で使用）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable, *args) -> Any:
+        """fn(*args) をスレッドで実行（同じキーの処理中の計算があればその結果を待つ）"""
+        if not SINGLE_FLIGHT_ENABLED:
+            return await asyncio.to_thread(fn, *args)
+
+        task = self._calls.get(key)
+        if task is None:
+            # 最初のリクエストが切断されても待っている他のリクエストに影響しないよう、タスクとして実行する
+            task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+            single_flight_requests_total.inc((self.name, "leader"))
+        else:
+            single_flight_requests_total.inc((self.name, "coalesced"))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def cache_fill(cache: TieredCache, key: str, load: Callable[[], Any], name: str) -> Any:
+    """キャッシュミス時に load() を実行（load はキャッシュへの保存まで行う）
+
+    SINGLE_FLIGHT_REDIS_LOCK が有効な場合、他のワーカーがロックを持っていれば
+    SINGLE_FLIGHT_LOCK_WAIT_MS までキャッシュが埋まるのを待ち、埋まらなければ自分で読み込む。
+    待機は time.sleep で行うため、イベントループ上（async のハンドラから直接）の呼び出しではロックを使わない。
+    """
+    client = get_redis_client() if SINGLE_FLIGHT_REDIS_LOCK and not _on_event_loop() else None
+    if client is None:
+        return load()
+
+    lock_key = f"lock:{cache.namespace}:{key}"
+    token = uuid.uuid4().hex
+    try:
+        acquired = client.set(lock_key, token, nx=True, px=SINGLE_FLIGHT_LOCK_TTL_MS)
+    except redis.RedisError:
+        mark_redis_down()
+        return load()
+
+    if not acquired:
+        deadline = time.monotonic() + SINGLE_FLIGHT_LOCK_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_LOCK_POLL_MS / 1000)
+            value = cache.get(key)
+            if value is not None:
+                single_flight_lock_waits_total.inc((name, "filled"))
+                return value
+        single_flight_lock_waits_total.inc((name, "timeout"))
+        return load()
+
+    try:
+        return load()
+    finally:
+        try:
+            client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except redis.RedisError:
+            mark_redis_down()
@@ -0,0 +1,503 @@
+"""軽量な分散トレーシング
+
+W3C Trace Context（traceparent ヘッダー）で上流・下流とトレースIDを引き継ぎ、
+リクエスト・サービス呼び出し・SQL・外部HTTP呼び出しのスパンを記録する。
+サンプリングはリクエストの入口で決定し（上流が traceparent を送ってきた場合はその判定に従う）、
+サンプリング対象外のリクエストではスパンを生成しない。
+
+エクスポーターは差し替え可能で、既定では OTLP 互換のJSON（1行1バッチ）をファイルに書き出す
+（コレクターがなくても動作し、後から OTLP/HTTP の JSON としてそのまま送信できる形式）。
+"""
+import atexit
+import functools
+import importlib
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# 上流からの traceparent がないリクエストのサンプリング率
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+# エクスポーター（"file" / "none" / "パッケージ.モジュール:クラス名"）
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", os.path.join("logs", "traces.jsonl"))
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "5"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "stayconnect-api")
+
+# OTLP の SpanKind
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# SQL文の記録上限（文字数）
+_MAX_STATEMENT_LENGTH = 2000
+
+
+class SpanContext:
+    """トレースID・スパンID・サンプリング有無（記録しないスパンの伝播にも使う）"""
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def recording(self) -> bool:
+        return False
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+class Span(SpanContext):
+    """記録するスパン"""
+    __slots__ = ("parent_span_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], kind: int, attributes: Optional[dict]):
+        super().__init__(trace_id, _new_span_id(), True)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = STATUS_UNSET
+        self.status_message = None
+
+    @property
+    def recording(self) -> bool:
+        return self.end_ns is None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            tracer.processor.on_end(self)
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """traceparent ヘッダーを解析（不正な値・全ゼロのIDは無視）"""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+_current_span: ContextVar[Optional[SpanContext]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[SpanContext]:
+    return _current_span.get()
+
+
+# --- エクスポーター ---
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> List[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp_json(spans: List[Span], service_name: str = TRACE_SERVICE_NAME) -> dict:
+    """OTLP/JSON（ExportTraceServiceRequest）形式に変換"""
+    otlp_spans = []
+    for span in spans:
+        data = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": span.status},
+        }
+        if span.parent_span_id:
+            data["parentSpanId"] = span.parent_span_id
+        if span.status_message:
+            data["status"]["message"] = span.status_message
+        otlp_spans.append(data)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": "stayconnect.tracing"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+class SpanExporter:
+    """エクスポーターの基底クラス（export は処理スレッドから呼ばれる）"""
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """OTLP/JSON をファイルに1行1バッチで追記"""
+
+    def __init__(self, path: str = TRACE_EXPORT_FILE, service_name: str = TRACE_SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+
+    def export(self, spans: List[Span]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(to_otlp_json(spans, self.service_name), ensure_ascii=False, separators=(",", ":"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class InMemorySpanExporter(SpanExporter):
+    """メモリに保持（テスト・デバッグ用）"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+
+# --- スパンプロセッサー ---
+
+class NoopSpanProcessor:
+    def on_end(self, span: Span):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class SimpleSpanProcessor:
+    """終了したスパンをその場でエクスポート（テスト用）"""
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def on_end(self, span: Span):
+        self.exporter.export([span])
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+
+class BatchSpanProcessor:
+    """終了したスパンをキューに積み、別スレッドでまとめてエクスポート（キューが満杯の場合は破棄）"""
+
+    def __init__(self, exporter: SpanExporter, interval: float = TRACE_EXPORT_INTERVAL, max_queue_size: int = TRACE_QUEUE_SIZE, max_batch_size: int = 512):
+        self.exporter = exporter
+        self.interval = interval
+        self.max_batch_size = max_batch_size
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> List[Span]:
+        spans = []
+        while len(spans) < self.max_batch_size:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return spans
+
+    def _export(self):
+        while True:
+            spans = self._drain()
+            if not spans:
+                return
+            try:
+                self.exporter.export(spans)
+            except Exception:
+                logger.exception("Span export failed")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._export()
+        self._export()
+
+    def shutdown(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        self.exporter.shutdown()
+
+
+# --- トレーサー ---
+
+class Tracer:
+    def __init__(self, processor=None, sample_rate: float = TRACE_SAMPLE_RATE, enabled: bool = TRACING_ENABLED):
+        self.processor = processor or NoopSpanProcessor()
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+
+    def set_processor(self, processor):
+        """プロセッサーを差し替え（以前のものは停止する）"""
+        previous, self.processor = self.processor, processor
+        previous.shutdown()
+
+    def should_sample(self) -> bool:
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def start_request(self, traceparent: Optional[str], name: str, attributes: Optional[dict] = None) -> SpanContext:
+        """リクエストの入口でサンプリングを決定し、ルートスパン（対象外の場合は伝播用のコンテキスト）を返す"""
+        parent = parse_traceparent(traceparent) if self.enabled else None
+        if parent is not None:
+            sampled = parent.sampled
+            trace_id, parent_span_id = parent.trace_id, parent.span_id
+        else:
+            sampled = self.should_sample()
+            trace_id, parent_span_id = _new_trace_id(), None
+
+        if not sampled:
+            return SpanContext(trace_id, _new_span_id(), False)
+        return Span(name, trace_id, parent_span_id, SPAN_KIND_SERVER, attributes)
+
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[dict] = None) -> Optional[Span]:
+        """現在のスパンの子スパンを開始（サンプリング対象外の場合はNone）"""
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    @contextmanager
+    def use_span(self, span: Optional[SpanContext], end_on_exit: bool = True):
+        """スパンを現在のスパンとして設定"""
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if isinstance(span, Span):
+                span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            if end_on_exit and isinstance(span, Span):
+                span.end()
+
+    @contextmanager
+    def start_as_current_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[dict] = None):
+        with self.use_span(self.start_span(name, kind, attributes)) as span:
+            yield span
+
+
+tracer = Tracer()
+
+
+def traced(name: Optional[str] = None):
+    """サービス呼び出しのスパンを記録するデコレーター（同期・非同期関数に対応）"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with tracer.start_as_current_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """下流へのリクエストヘッダーに traceparent を付与"""
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent()
+    return headers
+
+
+# --- SQL ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_sql_span(conn, cursor, statement, parameters, context, executemany):
+    span = tracer.start_span("db.query", SPAN_KIND_CLIENT)
+    if span is None:
+        return
+    span.attributes.update({
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:_MAX_STATEMENT_LENGTH],
+    })
+    if executemany:
+        span.attributes["db.executemany"] = True
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_sql_span(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_sql_span(exception_context):
+    connection = exception_context.connection
+    spans = connection.info.get("trace_spans") if connection is not None else None
+    if spans:
+        span = spans.pop()
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+# --- 外部HTTP（httpx） ---
+
+def _start_client_span(request: httpx.Request) -> Optional[Span]:
+    span = tracer.start_span(f"HTTP {request.method}", SPAN_KIND_CLIENT, {
+        "http.request.method": request.method,
+        "url.full": str(request.url.copy_with(query=None)),
+        "server.address": request.url.host,
+    })
+    context = span or _current_span.get()
+    if context is not None:
+        request.headers["traceparent"] = context.traceparent()
+    return span
+
+
+def _end_client_span(span: Optional[Span], response: Optional[httpx.Response], exc: Optional[BaseException]):
+    if span is None:
+        return
+    if response is not None:
+        span.attributes["http.response.status_code"] = response.status_code
+        if response.status_code >= 500:
+            span.status = STATUS_ERROR
+    if exc is not None:
+        span.record_exception(exc)
+    span.end()
+
+
+class TracingAsyncTransport(httpx.AsyncBaseTransport):
+    """外部HTTP呼び出しのスパン記録と traceparent の付与（httpx.AsyncClient(transport=...) で使用）"""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        span = _start_client_span(request)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            _end_client_span(span, None, e)
+            raise
+        _end_client_span(span, response, None)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class TracingTransport(httpx.BaseTransport):
+    """TracingAsyncTransport の同期版（httpx.Client 用）"""
+
+    def __init__(self, transport: Optional[httpx.BaseTransport] = None):
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        span = _start_client_span(request)
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException as e:
+            _end_client_span(span, None, e)
+            raise
+        _end_client_span(span, response, None)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+def traced_async_client(**kwargs) -> httpx.AsyncClient:
+    """トレース付きの httpx.AsyncClient を生成"""
+    return httpx.AsyncClient(transport=TracingAsyncTransport(kwargs.pop("transport", None)), **kwargs)
+
+
+# --- 設定 ---
+
+def _load_exporter(spec: str) -> Optional[SpanExporter]:
+    if spec == "none":
+        return None
+    if spec == "file":
+        return OTLPJsonFileExporter()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def configure_tracing():
+    """環境変数に従ってエクスポーターを設定"""
+    if not TRACING_ENABLED:
+        return
+    exporter = _load_exporter(TRACE_EXPORTER)
+    if exporter is None:
+        tracer.enabled = False
+        return
+    tracer.set_processor(BatchSpanProcessor(exporter))
+    atexit.register(lambda: tracer.processor.shutdown())
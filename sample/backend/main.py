@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
@@ -74,7 +74,7 @@ async def health():
     return {"status": "healthy"}
 
 @app.post("/api/v1/ai/generate", response_model=GenerateResponse)
-async def generate_text(request: GenerateRequest):
+async def generate_text(request: GenerateRequest, traceparent: Optional[str] = Header(None)):
     try:
         logger.info(f"Received request: {request.prompt[:50]}...")
         
@@ -106,13 +106,18 @@ async def generate_text(request: GenerateRequest):
             endpoint = "/v1/completions"
             payload = vllm_request
 
+        # W3C Trace Context を vLLM へ引き継ぐ（呼び出し元のトレースと関連付けるため）
+        upstream_headers = {"Content-Type": "application/json"}
+        if traceparent:
+            upstream_headers["traceparent"] = traceparent
+
         timeout = httpx.Timeout(60.0)
         async with httpx.AsyncClient(timeout=timeout) as client:
             try:
                 response = await client.post(
                     f"{VLLM_URL}{endpoint}",
                     json=payload,
-                    headers={"Content-Type": "application/json"}
+                    headers=upstream_headers
                 )
                 response.raise_for_status()
                 vllm_response = response.json()
@@ -170,7 +175,7 @@ async def generate_text(request: GenerateRequest):
                     # set temperature to 0 for determinism
                     strict_payload['temperature'] = 0.0
                     try:
-                        retry_resp = await client.post(f"{VLLM_URL}{endpoint}", json=strict_payload, headers={"Content-Type": "application/json"})
+                        retry_resp = await client.post(f"{VLLM_URL}{endpoint}", json=strict_payload, headers=upstream_headers)
                         retry_resp.raise_for_status()
                         retry_v = retry_resp.json()
                         logger.debug(f"Retry vLLM response: {retry_v}")
@@ -60,21 +60,11 @@ echo "🗄️ データベースマイグレーションを実行中..."
 if [ "$ENVIRONMENT" = "production" ]; then
     docker-compose -f docker-compose.prod.yml up -d postgres redis
     sleep 10
-    docker-compose -f docker-compose.prod.yml run --rm backend python -c "
-from database import engine, Base
-from models import *
-Base.metadata.create_all(bind=engine)
-print('Database migration completed')
-"
+    docker-compose -f docker-compose.prod.yml run --rm backend alembic upgrade head
 else
     docker-compose up -d postgres redis
     sleep 10
-    docker-compose run --rm backend python -c "
-from database import engine, Base
-from models import *
-Base.metadata.create_all(bind=engine)
-print('Database migration completed')
-"
+    docker-compose run --rm backend alembic upgrade head
 fi
 
 # アプリケーションを起動